@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TpopConfig(AppConfig):
     name = 'TPOP'
+
+    def ready(self):
+        import TPOP.signals
@@ -12,7 +12,13 @@ class Cart(models.Model):
         on_delete=models.SET_NULL,
         related_name="carts"
     )
-    session_id = models.CharField(max_length=255, null=True, blank=True)
+    session_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+
+    # Precios, totales y avisos de stock ya calculados (TPOP/services/cart.py).
+    # None = hay que recalcular: cambió una línea o un producto del carrito.
+    totals = models.JSONField(null=True, blank=True)
+    # Se incrementa al invalidar: un cálculo que empezó antes no pisa la invalidación
+    totals_version = models.PositiveIntegerField(default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
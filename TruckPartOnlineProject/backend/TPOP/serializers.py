@@ -0,0 +1,19 @@
+from rest_framework import serializers
+
+
+class CartItemAddSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class CartItemUpdateSerializer(serializers.Serializer):
+    # 0 elimina la línea
+    quantity = serializers.IntegerField(min_value=0)
+
+
+class CartMergeSerializer(serializers.Serializer):
+    """
+    Carrito de invitado que se pasa al usuario después del login
+    """
+    cart_id = serializers.IntegerField()
+    session_id = serializers.CharField()
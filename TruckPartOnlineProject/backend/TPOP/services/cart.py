@@ -0,0 +1,243 @@
+import secrets
+
+from django.db import transaction
+from django.db.models import F, FilteredRelation, Q
+from django.utils import timezone
+
+from orders.services import available_quantity, price_lines
+from products.models import Product
+from TPOP.models import Cart, CartItem
+
+# Los invitados se identifican con el session_id que devuelve POST /api/cart/
+CART_SESSION_HEADER = "HTTP_X_CART_SESSION"
+
+
+def new_session_id():
+    # Secreto del carrito de invitado: quien lo tiene puede leerlo y modificarlo
+    return secrets.token_urlsafe(24)
+
+
+def cart_session(request):
+    return request.META.get(CART_SESSION_HEADER, "")
+
+
+def can_access(cart, user, session_id):
+    if cart.user_id is not None:
+        return user.is_authenticated and user.id == cart.user_id
+    return bool(session_id) and bool(cart.session_id) and secrets.compare_digest(session_id, cart.session_id)
+
+
+def invalidate_carts(product_ids):
+    """
+    Descarta los totales cacheados de los carritos que tienen alguno de estos
+    productos (cambió su precio, su stock o sus datos).
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return 0
+    return Cart.objects.filter(items__product_id__in=product_ids).update(
+        totals=None, totals_version=F("totals_version") + 1
+    )
+
+
+########################################################################################
+# LECTURA Y PRECIOS
+########################################################################################
+
+def _read_lines(cart_ids, extra_product_ids=()):
+    """
+    Lee en UNA query las líneas de los carritos con su producto e inventario,
+    más los productos que se van a agregar aunque todavía no tengan línea.
+    Retorna (líneas, productos por id).
+    """
+    rows = (
+        Product.objects.select_related("inventory")
+        .annotate(line=FilteredRelation("cartitem", condition=Q(cartitem__cart_id__in=cart_ids)))
+        .filter(Q(line__isnull=False) | Q(id__in=list(extra_product_ids)))
+        .annotate(
+            line_id=F("line__id"),
+            line_cart_id=F("line__cart_id"),
+            line_quantity=F("line__quantity"),
+            line_price=F("line__price_at_time"),
+        )
+        .order_by("line__id")
+    )
+
+    lines, products = [], {}
+    for product in rows:
+        products[product.id] = product
+        if product.line_id is None:
+            continue
+        item = CartItem(
+            id=product.line_id,
+            cart_id=product.line_cart_id,
+            product=product,
+            quantity=product.line_quantity,
+            price_at_time=product.line_price,
+        )
+        item._state.adding = False
+        item._state.db = rows.db
+        lines.append(item)
+    return lines, products
+
+
+def _refresh_prices(lines):
+    # La línea queda con el precio con el que se cotizó
+    stale = [line for line in lines if line.price_at_time != line.product.price]
+    for line in stale:
+        line.price_at_time = line.product.price
+    if stale:
+        CartItem.objects.bulk_update(stale, ["price_at_time"])
+
+
+def cart_totals(cart):
+    """
+    Totales del carrito: los cacheados si siguen vigentes; si no, una lectura
+    de líneas+productos+inventario. Solo se guardan si nadie invalidó el
+    carrito mientras tanto (totals_version).
+    """
+    if cart.totals is not None:
+        return cart.totals
+
+    version = cart.totals_version
+    lines, _ = _read_lines([cart.id])
+    totals = price_lines(lines)
+    _refresh_prices(lines)
+    Cart.objects.filter(pk=cart.pk, totals_version=version).update(totals=totals)
+    cart.totals = totals
+    return totals
+
+
+def _save_totals(cart, lines):
+    """
+    Después de modificar líneas (con el carrito bloqueado): precios y totales
+    calculados con lo ya leído, sin otra query de productos.
+    """
+    totals = price_lines(lines)
+    _refresh_prices(lines)
+    Cart.objects.filter(pk=cart.pk).update(
+        totals=totals, totals_version=F("totals_version") + 1, updated_at=timezone.now()
+    )
+    cart.totals = totals
+    cart.totals_version += 1
+    return totals
+
+
+########################################################################################
+# OPERACIONES
+########################################################################################
+
+def _lock(cart):
+    return Cart.objects.select_for_update().get(pk=cart.pk)
+
+
+def _validate_quantity(product, quantity):
+    if not product.is_active:
+        raise ValueError(f"{product.name} ya no está disponible")
+    available = available_quantity(product)
+    if quantity > available:
+        raise ValueError(f"Stock insuficiente para {product.name}. Disponible: {available}")
+
+
+@transaction.atomic
+def add_item(cart, product_id, quantity):
+    """
+    Agrega `quantity` unidades (suma si el producto ya está en el carrito).
+    """
+    cart = _lock(cart)
+    lines, products = _read_lines([cart.id], [product_id])
+    product = products.get(product_id)
+    if product is None:
+        raise ValueError(f"El producto con ID {product_id} no existe.")
+
+    line = next((line for line in lines if line.product_id == product_id), None)
+    new_quantity = (line.quantity if line else 0) + quantity
+    _validate_quantity(product, new_quantity)
+
+    if line is None:
+        line = CartItem.objects.create(
+            cart=cart, product=product, quantity=new_quantity, price_at_time=product.price
+        )
+        lines.append(line)
+    else:
+        line.quantity = new_quantity
+        line.save(update_fields=["quantity", "updated_at"])
+
+    return cart, _save_totals(cart, lines)
+
+
+@transaction.atomic
+def update_item(cart, product_id, quantity):
+    """
+    Fija la cantidad de una línea; 0 la elimina.
+    """
+    if quantity == 0:
+        return remove_item(cart, product_id)
+
+    cart = _lock(cart)
+    lines, _ = _read_lines([cart.id])
+    line = next((line for line in lines if line.product_id == product_id), None)
+    if line is None:
+        raise CartItem.DoesNotExist(f"El producto con ID {product_id} no está en el carrito.")
+
+    _validate_quantity(line.product, quantity)
+    line.quantity = quantity
+    line.save(update_fields=["quantity", "updated_at"])
+    return cart, _save_totals(cart, lines)
+
+
+@transaction.atomic
+def remove_item(cart, product_id):
+    cart = _lock(cart)
+    lines, _ = _read_lines([cart.id])
+    line = next((line for line in lines if line.product_id == product_id), None)
+    if line is None:
+        raise CartItem.DoesNotExist(f"El producto con ID {product_id} no está en el carrito.")
+
+    CartItem.objects.filter(pk=line.pk).delete()
+    lines.remove(line)
+    return cart, _save_totals(cart, lines)
+
+
+def user_cart(user):
+    return Cart.objects.filter(user_id=user.id).order_by("-updated_at", "-id").first()
+
+
+@transaction.atomic
+def merge_guest_cart(guest, user):
+    """
+    Al iniciar sesión: pasa las líneas del carrito de invitado al carrito del
+    usuario (sumando cantidades del mismo producto) y borra el de invitado.
+    No se recortan cantidades: lo que supere el stock queda como aviso.
+    """
+    target = user_cart(user)
+    if target is None or target.pk == guest.pk:
+        # Sin carrito propio: el de invitado pasa a ser el del usuario
+        Cart.objects.filter(pk=guest.pk).update(user_id=user.id, session_id=None, updated_at=timezone.now())
+        guest.user_id, guest.session_id = user.id, None
+        return guest, cart_totals(guest)
+
+    # Bloqueo en orden de id: dos merges simultáneos no se cruzan
+    locked = {cart.pk: cart for cart in Cart.objects.select_for_update().filter(pk__in=[guest.pk, target.pk]).order_by("pk")}
+    target = locked[target.pk]
+    lines, _ = _read_lines([guest.pk, target.pk])
+
+    merged = {line.product_id: line for line in lines if line.cart_id == target.pk}
+    moved, updated = [], []
+    for line in lines:
+        if line.cart_id != guest.pk:
+            continue
+        existing = merged.get(line.product_id)
+        if existing is None:
+            line.cart_id = target.pk
+            merged[line.product_id] = line
+            moved.append(line.pk)
+        else:
+            existing.quantity += line.quantity
+            updated.append(existing)
+
+    CartItem.objects.filter(pk__in=moved).update(cart=target)
+    CartItem.objects.bulk_update(updated, ["quantity"])
+    Cart.objects.filter(pk=guest.pk).delete()
+
+    return target, _save_totals(target, sorted(merged.values(), key=lambda line: line.pk))
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from inventory.models import Inventory
+from inventory.signals import stock_bulk_updated
+from products.models import Product
+from .services.cart import invalidate_carts
+
+
+# Los carritos con el producto recalculan precios y stock en la próxima lectura.
+@receiver(post_save, sender=Product)
+def invalidate_carts_on_product_change(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_carts([instance.id])
+
+
+@receiver(post_save, sender=Inventory)
+def invalidate_carts_on_stock_change(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_carts([instance.product_id])
+
+
+@receiver(stock_bulk_updated)
+def invalidate_carts_on_bulk_stock_change(sender, product_ids, **kwargs):
+    invalidate_carts(product_ids)
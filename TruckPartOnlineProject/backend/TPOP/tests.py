@@ -1,3 +1,154 @@
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import stripe
+
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from inventory.models import Inventory
+from inventory.services.inventory import bulk_adjust_inventory
+from orders.models import Order
+from products.models import Product
+from .models import Cart, CartItem
+
+User = get_user_model()
+
+
+class CartApiTest(TestCase):
+    """
+    Carrito del servidor: operaciones, cache de totales, merge y checkout.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.filter = Product.objects.create(name="Filtro", price=Decimal("10.00"), sku="SKU-F")
+        self.brake = Product.objects.create(name="Freno", price=Decimal("33.33"), sku="SKU-B")
+        Inventory.objects.filter(product__in=[self.filter, self.brake]).update(quantity=5)
+
+    def guest_cart(self):
+        response = self.client.post("/api/cart/")
+        self.assertEqual(response.status_code, 201)
+        self.client.credentials(HTTP_X_CART_SESSION=response.data["session_id"])
+        return response.data
+
+    def add(self, cart_id, product, quantity):
+        return self.client.post(
+            f"/api/cart/{cart_id}/items/", {"product_id": product.id, "quantity": quantity}, format="json"
+        )
+
+    def test_operations_price_lines_like_checkout(self):
+        cart = self.guest_cart()
+
+        self.add(cart["id"], self.filter, 2)
+        # Una sola lectura (líneas+productos+inventario) valida todo el carrito
+        with CaptureQueriesContext(connection) as queries:
+            response = self.add(cart["id"], self.brake, 3)
+        reads = [q["sql"] for q in queries.captured_queries if 'FROM "products_product"' in q["sql"]]
+        self.assertEqual(len(reads), 1)
+        self.assertIn('"inventory_inventory"', reads[0])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["subtotal"], "119.99")
+        # 7% por línea redondeado al centavo: 1.40 + 7.00
+        self.assertEqual(response.data["tax"], "8.40")
+        self.assertEqual(response.data["total"], "128.39")
+        self.assertTrue(response.data["can_checkout"])
+
+        response = self.add(cart["id"], self.filter, 4)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Disponible: 5", response.data["error"])
+
+        response = self.client.patch(f"/api/cart/{cart['id']}/items/{self.filter.id}/", {"quantity": 0}, format="json")
+        self.assertEqual([line["product_id"] for line in response.data["items"]], [self.brake.id])
+        response = self.client.delete(f"/api/cart/{cart['id']}/items/{self.filter.id}/")
+        self.assertEqual(response.status_code, 404)
+
+        # Sin el session_id del invitado no se puede leer
+        self.client.credentials()
+        self.assertEqual(self.client.get(f"/api/cart/{cart['id']}/").status_code, 403)
+
+    def test_totals_cached_until_product_or_stock_changes(self):
+        cart = self.guest_cart()
+        self.add(cart["id"], self.filter, 2)
+
+        with self.assertNumQueries(1):
+            self.client.get(f"/api/cart/{cart['id']}/")
+
+        self.filter.price = Decimal("12.00")
+        self.filter.save()
+        response = self.client.get(f"/api/cart/{cart['id']}/")
+        self.assertEqual(response.data["subtotal"], "24.00")
+        self.assertEqual(response.data["warnings"][0]["code"], "price_changed")
+        self.assertEqual(CartItem.objects.get().price_at_time, Decimal("12.00"))
+
+        # El ajuste masivo usa bulk_update (sin post_save) e invalida con stock_bulk_updated
+        bulk_adjust_inventory([{"product_id": self.filter.id, "absolute_count": 1}], reason="Conteo", reference="T-1")
+        response = self.client.get(f"/api/cart/{cart['id']}/")
+        self.assertEqual(response.data["warnings"][0]["code"], "insufficient_stock")
+        self.assertFalse(response.data["can_checkout"])
+
+    def test_merge_guest_cart_on_login(self):
+        user = User.objects.create_user(username="cliente", email="c@example.com", password="x", is_active=True)
+        own = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=own, product=self.filter, quantity=1, price_at_time=self.filter.price)
+
+        guest = self.guest_cart()
+        self.add(guest["id"], self.filter, 2)
+        self.add(guest["id"], self.brake, 1)
+
+        self.client.credentials()
+        self.client.force_authenticate(user)
+        response = self.client.post(
+            "/api/cart/merge/", {"cart_id": guest["id"], "session_id": guest["session_id"]}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], own.id)
+        self.assertEqual(
+            {line["product_id"]: line["quantity"] for line in response.data["items"]},
+            {self.filter.id: 3, self.brake.id: 1},
+        )
+        self.assertFalse(Cart.objects.filter(id=guest["id"]).exists())
+
+    def test_checkout_with_cart_id(self):
+        cart = self.guest_cart()
+        self.add(cart["id"], self.filter, 2)
+        self.add(cart["id"], self.brake, 1)
+
+        response = self.client.post("/api/checkout/", {
+            "cart_id": cart["id"],
+            "full_name": "Invitado",
+            "guest_email": "guest@example.com",
+            "payment_method": "cod",
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+
+        order = Order.objects.get(id=response.data["order_id"])
+        self.assertEqual((order.subtotal, order.tax), (Decimal("53.33"), Decimal("3.73")))
+        self.assertEqual(sorted(order.items.values_list("product_id", "quantity")), [(self.filter.id, 2), (self.brake.id, 1)])
+        self.assertFalse(Cart.objects.filter(id=cart["id"]).exists())
+
+    def test_card_checkout_keeps_cart_until_intent_exists(self):
+        cart = self.guest_cart()
+        self.add(cart["id"], self.filter, 2)
+        body = {
+            "cart_id": cart["id"],
+            "full_name": "Invitado",
+            "guest_email": "guest@example.com",
+            "payment_method": "card",
+        }
+
+        with patch("orders.payment_intents.stripe.PaymentIntent.create", side_effect=stripe.APIConnectionError("timeout")):
+            response = self.client.post("/api/checkout/", body, format="json")
+        self.assertEqual(response.status_code, 502)
+        self.assertTrue(Cart.objects.filter(id=cart["id"]).exists())
 
-# Create your tests here.
+        with patch("orders.payment_intents.stripe.PaymentIntent.create") as create:
+            create.return_value = SimpleNamespace(id="pi_1", client_secret="secret_1")
+            response = self.client.post("/api/checkout/", body, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data["client_secret"], "secret_1")
+        self.assertFalse(Cart.objects.filter(id=cart["id"]).exists())
@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+
+urlpatterns = [
+    path("cart/", views.cart_create),
+    path("cart/merge/", views.cart_merge),
+    path("cart/<int:cart_id>/", views.cart_detail),
+    path("cart/<int:cart_id>/items/", views.cart_add_item),
+    path("cart/<int:cart_id>/items/<int:product_id>/", views.cart_item),
+]
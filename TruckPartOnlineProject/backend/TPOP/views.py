@@ -1,3 +1,156 @@
-from django.shortcuts import render
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
 
-# Create your views here.
+from .models import Cart, CartItem
+from .serializers import CartItemAddSerializer, CartItemUpdateSerializer, CartMergeSerializer
+from .services.cart import (
+    add_item,
+    can_access,
+    cart_session,
+    cart_totals,
+    merge_guest_cart,
+    new_session_id,
+    remove_item,
+    update_item,
+    user_cart,
+)
+
+
+def _cart_response(cart, totals, status_code=status.HTTP_200_OK):
+    return Response(
+        {
+            "id": cart.id,
+            "session_id": cart.session_id if cart.user_id is None else None,
+            **totals,
+        },
+        status=status_code
+    )
+
+
+def _get_cart(request, cart_id):
+    """
+    Retorna (cart, error_response)
+    """
+    cart = Cart.objects.filter(id=cart_id).first()
+    if cart is None:
+        return None, Response(
+            {"error": "Carrito no encontrado"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    if not can_access(cart, request.user, cart_session(request)):
+        return None, Response(
+            {"error": "No tienes permiso para ver este carrito"},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    return cart, None
+
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def cart_create(request):
+    """
+    Crear un carrito. Un usuario autenticado recibe su carrito actual si ya
+    tiene uno; un invitado recibe un session_id que debe enviar en el header
+    X-Cart-Session.
+    """
+    if request.user.is_authenticated:
+        cart = user_cart(request.user)
+        if cart is not None:
+            return _cart_response(cart, cart_totals(cart))
+        cart = Cart.objects.create(user_id=request.user.id)
+    else:
+        cart = Cart.objects.create(session_id=new_session_id())
+
+    return _cart_response(cart, cart_totals(cart), status.HTTP_201_CREATED)
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def cart_detail(request, cart_id):
+    """
+    Carrito con precios, totales y avisos de stock (cacheados hasta que
+    cambia una línea o un producto del carrito)
+    """
+    cart, error = _get_cart(request, cart_id)
+    if error:
+        return error
+    return _cart_response(cart, cart_totals(cart))
+
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def cart_add_item(request, cart_id):
+    """
+    Agregar un producto (suma a la cantidad si ya está en el carrito)
+    """
+    cart, error = _get_cart(request, cart_id)
+    if error:
+        return error
+
+    serializer = CartItemAddSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        cart, totals = add_item(cart, serializer.validated_data["product_id"], serializer.validated_data["quantity"])
+    except ValueError as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return _cart_response(cart, totals)
+
+
+@api_view(["PATCH", "DELETE"])
+@permission_classes([AllowAny])
+def cart_item(request, cart_id, product_id):
+    """
+    PATCH: cambiar la cantidad de una línea (0 la elimina). DELETE: eliminarla.
+    """
+    cart, error = _get_cart(request, cart_id)
+    if error:
+        return error
+
+    try:
+        if request.method == "DELETE":
+            cart, totals = remove_item(cart, product_id)
+        else:
+            serializer = CartItemUpdateSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            cart, totals = update_item(cart, product_id, serializer.validated_data["quantity"])
+    except CartItem.DoesNotExist as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    except ValueError as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return _cart_response(cart, totals)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def cart_merge(request):
+    """
+    Después del login: pasa el carrito de invitado (cart_id + session_id) al
+    carrito del usuario, sumando cantidades del mismo producto.
+    """
+    serializer = CartMergeSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    guest = Cart.objects.filter(id=serializer.validated_data["cart_id"], user__isnull=True).first()
+    if guest is None or not can_access(guest, request.user, serializer.validated_data["session_id"]):
+        return Response(
+            {"error": "Carrito de invitado no encontrado"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    cart, totals = merge_guest_cart(guest, request.user)
+    return _cart_response(cart, totals)
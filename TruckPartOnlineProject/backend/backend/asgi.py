@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Antes de cargar settings: sin DB_POOL, CONN_MAX_AGE pasa a 0 por defecto (backend/settings.py)
+os.environ.setdefault('DJANGO_ASGI', '1')
 
 application = get_asgi_application()
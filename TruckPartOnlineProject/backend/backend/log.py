@@ -0,0 +1,140 @@
+# backend/log.py
+"""
+Logging estructurado y no bloqueante.
+
+- Cada request tiene un correlation id (header X-Request-ID o uno nuevo) que
+  se agrega a todos los logs emitidos mientras se atiende.
+- Los handlers de la app solo encolan el record (QueueHandler); un hilo
+  QueueListener hace la escritura a stdout, así el request nunca espera I/O.
+- Usar siempre formato perezoso: logger.info("Orden %s", order.id), nunca
+  f-strings, para que los niveles desactivados no cuesten nada.
+"""
+import atexit
+import json
+import logging
+import queue
+import sys
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+_request_id = ContextVar("request_id", default="-")
+
+# Atributos estándar de LogRecord: todo lo demás vino en extra={...}
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+@contextmanager
+def correlation_id(value=None):
+    """
+    Fija el correlation id para el bloque (ej. el event_id en el worker de Stripe).
+    """
+    token = _request_id.set(value or uuid.uuid4().hex)
+    try:
+        yield _request_id.get()
+    finally:
+        _request_id.reset(token)
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Copia el correlation id al record. Corre en el hilo que loguea,
+    antes de encolar, que es donde vive el ContextVar.
+    """
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Una línea JSON por record, con los campos pasados en extra={...}.
+    """
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    QueueHandler con su propio QueueListener hacia `stream` (stdout por defecto).
+
+    El formatter configurado en este handler se aplica al encolar; el hilo
+    del listener solo escribe la línea ya formateada.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        target = logging.StreamHandler(stream or sys.stdout)
+        self.listener = QueueListener(self.queue, target)
+        self.listener.start()
+        # Al salir se vacía la cola para no perder los últimos logs
+        atexit.register(self.stop_listener)
+
+    def stop_listener(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def close(self):
+        self.stop_listener()
+        super().close()
+
+
+class RequestIdMiddleware:
+    """
+    Asigna el correlation id del request y lo devuelve en X-Request-ID.
+    Funciona en WSGI y en ASGI sin pasar por un hilo.
+    """
+
+    header = "HTTP_X_REQUEST_ID"
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def incoming_id(self, request):
+        # Se respeta el id del proxy/cliente si viene y es razonable
+        incoming = request.META.get(self.header, "")
+        return incoming if incoming and len(incoming) <= 64 else None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with correlation_id(self.incoming_id(request)) as request_id:
+            request.request_id = request_id
+            response = self.get_response(request)
+
+        response["X-Request-ID"] = request_id
+        return response
+
+    async def __acall__(self, request):
+        with correlation_id(self.incoming_id(request)) as request_id:
+            request.request_id = request_id
+            response = await self.get_response(request)
+
+        response["X-Request-ID"] = request_id
+        return response
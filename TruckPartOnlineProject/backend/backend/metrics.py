@@ -0,0 +1,357 @@
+# backend/metrics.py
+"""
+Instrumentación por request.
+
+PerformanceMiddleware mide por endpoint: tiempo total, queries y tiempo de DB,
+queries repetidas (N+1), tiempo de serializers DRF, tiempo de abrir conexiones
+a la base (o tomarlas del pool) y tiempo de HTTP saliente a QuickBooks, Clover
+y Stripe. Devuelve un header Server-Timing y guarda
+ventanas de muestras en memoria (por proceso) que /api/metrics/ expone en
+formato de texto de Prometheus, solo para staff.
+"""
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from urllib.parse import urlsplit
+
+import requests
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+# Muestras por endpoint para los percentiles (ventana deslizante)
+WINDOW = getattr(settings, "METRICS_WINDOW", 1000)
+# Una misma query ejecutada más veces que esto en un request se reporta como N+1
+N_PLUS_ONE_THRESHOLD = getattr(settings, "METRICS_N_PLUS_ONE_THRESHOLD", 5)
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+OUTBOUND_SERVICES = (
+    ("intuit.com", "quickbooks"),
+    ("clover.com", "clover"),
+    ("stripe.com", "stripe"),
+)
+
+_current = ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    """
+    Lo que cuesta un request. Vive en un ContextVar mientras se atiende.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.connect_time = 0.0
+        self.sql = Counter()
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.http_time = defaultdict(float)
+
+    def duplicated_queries(self):
+        return {sql: count for sql, count in self.sql.items() if count > N_PLUS_ONE_THRESHOLD}
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += time.perf_counter() - start
+            # Django usa placeholders: el mismo SQL con distintos params es la misma query
+            stats.sql[sql] += 1
+
+
+def _service_for(url):
+    host = urlsplit(url).hostname or ""
+    for suffix, service in OUTBOUND_SERVICES:
+        if host == suffix or host.endswith("." + suffix):
+            return service
+    return "other"
+
+
+_installed = False
+
+
+def install():
+    """
+    Instrumenta serializers DRF, la apertura de conexiones a la base y requests
+    (lo usan QB, Clover y el SDK de Stripe). Idempotente; lo llama
+    PerformanceMiddleware al arrancar.
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    serializer_data = BaseSerializer.data
+
+    def timed_data(self):
+        stats = _current.get()
+        if stats is None:
+            return serializer_data.fget(self)
+
+        # Solo el serializer más externo: los anidados ya están dentro de su tiempo
+        stats.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return serializer_data.fget(self)
+        finally:
+            stats.serializer_depth -= 1
+            if stats.serializer_depth == 0:
+                stats.serializer_time += time.perf_counter() - start
+
+    BaseSerializer.data = property(timed_data)
+
+    session_request = requests.Session.request
+
+    def timed_request(self, method, url, *args, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            return session_request(self, method, url, *args, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            return session_request(self, method, url, *args, **kwargs)
+        finally:
+            stats.http_time[_service_for(url)] += time.perf_counter() - start
+
+    requests.Session.request = timed_request
+
+    database_connect = BaseDatabaseWrapper.connect
+
+    def timed_connect(self):
+        # Con conexiones persistentes esto pasa una vez por hilo cada CONN_MAX_AGE;
+        # con el pool de psycopg es lo que tarda en entregar una conexión
+        start = time.perf_counter()
+        try:
+            return database_connect(self)
+        finally:
+            seconds = time.perf_counter() - start
+            registry.record_connect(self.alias, seconds)
+            stats = _current.get()
+            if stats is not None:
+                stats.connect_time += seconds
+
+    BaseDatabaseWrapper.connect = timed_connect
+
+
+class MetricsRegistry:
+    """
+    Ventanas de muestras por (método, endpoint) y contadores acumulados.
+    """
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: defaultdict(lambda: deque(maxlen=self.window)))
+        self.totals = defaultdict(lambda: defaultdict(float))
+        self.connects = defaultdict(lambda: {"count": 0, "seconds": 0.0})
+        # Funciones de otras apps que agregan líneas al render (ej. cola de emails)
+        self.collectors = []
+
+    def record(self, key, total, stats):
+        values = {
+            "request_seconds": total,
+            "db_seconds": stats.db_time,
+            "db_queries": stats.queries,
+            "serializer_seconds": stats.serializer_time,
+        }
+        for service, seconds in stats.http_time.items():
+            values[f"http_{service}_seconds"] = seconds
+
+        with self.lock:
+            for name, value in values.items():
+                self.samples[key][name].append(value)
+                self.totals[key][f"{name}_sum"] += value
+                self.totals[key][f"{name}_count"] += 1
+            if stats.duplicated_queries():
+                self.totals[key]["n_plus_one"] += 1
+
+    def record_connect(self, alias, seconds):
+        with self.lock:
+            self.connects[alias]["count"] += 1
+            self.connects[alias]["seconds"] += seconds
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.totals.clear()
+            self.connects.clear()
+
+    def render(self):
+        """
+        Texto de exposición de Prometheus (summaries con cuantiles de la ventana).
+        """
+        with self.lock:
+            snapshot = {
+                key: {name: sorted(values) for name, values in metrics.items()}
+                for key, metrics in self.samples.items()
+            }
+            totals = {key: dict(values) for key, values in self.totals.items()}
+            connects = {alias: dict(values) for alias, values in self.connects.items()}
+
+        by_metric = defaultdict(list)
+        for key, metrics in snapshot.items():
+            for name, values in metrics.items():
+                by_metric[name].append((key, values))
+
+        lines = []
+        for name in sorted(by_metric):
+            metric = f"tpop_{name}"
+            lines.append(f"# TYPE {metric} summary")
+            for (method, endpoint), values in sorted(by_metric[name]):
+                labels = f'method="{_escape(method)}",endpoint="{_escape(endpoint)}"'
+                for q in QUANTILES:
+                    value = values[min(int(q * len(values)), len(values) - 1)]
+                    lines.append(f'{metric}{{{labels},quantile="{q}"}} {value:.6g}')
+                lines.append(f"{metric}_sum{{{labels}}} {totals[method, endpoint][f'{name}_sum']:.6g}")
+                lines.append(f"{metric}_count{{{labels}}} {int(totals[method, endpoint][f'{name}_count'])}")
+
+        lines.append("# TYPE tpop_n_plus_one_requests_total counter")
+        for (method, endpoint), values in sorted(totals.items()):
+            labels = f'method="{_escape(method)}",endpoint="{_escape(endpoint)}"'
+            lines.append(f"tpop_n_plus_one_requests_total{{{labels}}} {int(values.get('n_plus_one', 0))}")
+
+        lines.append("# TYPE tpop_db_connections_opened_total counter")
+        for alias, values in sorted(connects.items()):
+            lines.append(f'tpop_db_connections_opened_total{{alias="{_escape(alias)}"}} {values["count"]}')
+        lines.append("# TYPE tpop_db_connect_seconds_total counter")
+        for alias, values in sorted(connects.items()):
+            lines.append(f'tpop_db_connect_seconds_total{{alias="{_escape(alias)}"}} {values["seconds"]:.6g}')
+
+        lines += _pool_lines()
+        for collector in self.collectors:
+            lines += collector()
+
+        return "\n".join(lines) + "\n"
+
+
+def _pool_lines():
+    """
+    Estado de los pools de psycopg (DB_POOL=True) de este proceso: tamaño,
+    conexiones libres, requests esperando conexión, tiempos de espera, etc.
+    """
+    by_stat = defaultdict(list)
+    for alias in connections:
+        pool = getattr(connections[alias], "pool", None)
+        if pool is None:
+            continue
+        for name, value in pool.get_stats().items():
+            by_stat[name].append((alias, value))
+
+    lines = []
+    for name in sorted(by_stat):
+        metric = f"tpop_db_pool_{name}"
+        lines.append(f"# TYPE {metric} gauge")
+        for alias, value in sorted(by_stat[name]):
+            lines.append(f'{metric}{{alias="{_escape(alias)}"}} {value}')
+    return lines
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+class PerformanceMiddleware:
+    """
+    Mide cada request y agrega Server-Timing con db, serialize, http y total.
+    Funciona en WSGI y en ASGI sin pasar por un hilo.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        install()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_db_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        return self.finish(request, response, stats, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+
+        try:
+            # Las conexiones son locales al contexto: sync_to_async (ORM async)
+            # usa estas mismas, con el wrapper puesto
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_db_wrapper))
+                response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        return self.finish(request, response, stats, time.perf_counter() - start)
+
+    def finish(self, request, response, stats, total):
+        match = request.resolver_match
+        # Las rutas del router de DRF son regex: se quitan las anclas
+        endpoint = match.route.replace("^", "").replace("$", "") if match else "unmatched"
+        registry.record((request.method, endpoint), total, stats)
+
+        duplicated = stats.duplicated_queries()
+        if duplicated:
+            logger.warning(
+                "Posible N+1 en %s %s: %s",
+                request.method, endpoint,
+                "; ".join(f"{count}x {sql[:200]}" for sql, count in duplicated.items()),
+            )
+
+        timings = [f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"']
+        if stats.connect_time:
+            timings.append(f"db-connect;dur={stats.connect_time * 1000:.1f}")
+        timings.append(f"serialize;dur={stats.serializer_time * 1000:.1f}")
+        for service, seconds in stats.http_time.items():
+            timings.append(f"http-{service};dur={seconds * 1000:.1f}")
+        timings.append(f"total;dur={total * 1000:.1f}")
+        response["Server-Timing"] = ", ".join(timings)
+
+        return response
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    """
+    Métricas de este proceso en formato Prometheus (solo staff).
+    """
+    return HttpResponse(
+        registry.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,122 @@
+"""
+Renderer y parser JSON de DRF con orjson.
+
+Producen exactamente los mismos bytes que JSONRenderer/JSONParser de DRF:
+datetime se serializa en C con el mismo formato (UTC como "Z"), y lo que
+orjson no conoce (Decimal de ReadOnlyField, lazy strings, UUID en claves,
+etc.) pasa por el mismo JSONEncoder de DRF. Lo que orjson no puede
+reproducir (indentación, enteros de más de 64 bits, errores) se delega al
+renderer/parser de DRF, con su mismo resultado o error.
+
+orjson escribe NaN/Infinity como null; DRF (STRICT_JSON) lanza ValueError.
+Si la salida tiene algún null se buscan floats/Decimal no finitos en los datos
+y, si hay, se delega a DRF para fallar igual que antes.
+
+Diferencia conocida: floats fuera de [1e-4, 1e16) salen sin el "+"/cero del
+exponente (1e16 en vez de 1e+16), el mismo número en JSON válido; la API
+no los produce (los montos son Decimal o float de precios).
+
+Sin orjson instalado se comportan igual que los de DRF.
+"""
+import io
+import math
+from decimal import Decimal
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+# Para detectar enteros que orjson.loads convertiría a float (19+ dígitos
+# seguidos): translate deja cada dígito como "0" y el resto como espacio,
+# mucho más rápido que un regex sobre cuerpos grandes
+_DIGITS = bytes(ord("0") if chr(i).isdigit() and i < 128 else ord(" ") for i in range(256))
+_LONG_INTEGER = b"0" * 19
+
+
+def _has_non_finite(data):
+    """
+    True si data tiene NaN/Infinity (float o Decimal) en algún nivel. Por tipo
+    exacto primero: la mayoría de los valores son str/int/None.
+    """
+    stack = [data]
+    pop, extend = stack.pop, stack.extend
+    while stack:
+        value = pop()
+        kind = type(value)
+        if kind is str or kind is int or value is None or kind is bool:
+            continue
+        if isinstance(value, dict):
+            extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            extend(value)
+        elif isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, Decimal) and not value.is_finite():
+            return True
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer con orjson para el JSON compacto; con indent (navegador
+    de la API, ?indent=) usa el de DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if (
+            orjson is None
+            or not self.compact
+            or self.ensure_ascii
+            or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except orjson.JSONEncodeError:
+            # Enteros enormes, time con zona horaria, tipos desconocidos:
+            # el renderer de DRF da el mismo resultado o el mismo error
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if b"null" in ret and _has_non_finite(data):
+            # NaN/Infinity salieron como null: DRF lanza el ValueError
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Igual que DRF: U+2028/U+2029 escapados (JSONP/JavaScript)
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser con orjson para cuerpos UTF-8.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if _LONG_INTEGER not in body.translate(_DIGITS):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+        # El parser de DRF da el mismo resultado (enteros grandes, surrogates)
+        # o el mismo mensaje de ParseError
+        return super().parse(io.BytesIO(body), media_type, parser_context)
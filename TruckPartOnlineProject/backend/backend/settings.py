@@ -61,6 +61,8 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-cart-session',
+    'idempotency-key',
 ]
 
 # Métodos HTTP permitidos
@@ -95,14 +97,26 @@ INSTALLED_APPS = [
     "inventory.apps.InventoryConfig",
     "storages",
     "clover",
+    "reports",
     
   
 ]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        # JWT sin leer el User en cada request (users/authentication.py)
+        'users.authentication.ClaimsJWTAuthentication',
+    ),
+    # JSON con orjson, mismos bytes que los de DRF (backend/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'backend.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'backend.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -132,6 +146,8 @@ SIMPLE_JWT = {
 AUTH_USER_MODEL = "users.User"
 
 MIDDLEWARE = [
+    'backend.log.RequestIdMiddleware',  # correlation id para los logs
+    'backend.metrics.PerformanceMiddleware',  # Server-Timing y /api/metrics/
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # 👈 CLAVE
@@ -167,12 +183,44 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+#
+# Conexiones persistentes: cada hilo reutiliza su conexión hasta DB_CONN_MAX_AGE
+# segundos (0 = abrir y cerrar una por request) y antes de reutilizarla verifica
+# que siga viva (DB_CONN_HEALTH_CHECKS), así un reinicio de Postgres no termina
+# en un 500.
+#
+# DB_POOL=True usa el pool de psycopg 3 (solo Postgres, requiere
+# `pip install "psycopg[binary,pool]"`): un pool por proceso compartido entre
+# hilos. Es la opción para ASGI (uvicorn), donde Django recomienda
+# CONN_MAX_AGE=0; con el pool activo CONN_MAX_AGE se fuerza a 0.
+#
+# Bajo ASGI sin pool las vistas sync corren en hilos que no se reutilizan por
+# request: una conexión persistente por hilo se acumula hasta agotar
+# max_connections de Postgres. backend/asgi.py marca el proceso (DJANGO_ASGI)
+# y ahí DB_CONN_MAX_AGE vale 0 por defecto; un valor explícito se respeta.
+
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+SERVED_BY_ASGI = config('DJANGO_ASGI', default=False, cast=bool)
+
 DATABASES = {
     'default': dj_database_url.parse(
-        config('DATABASE_URL')
+        config('DATABASE_URL'),
+        conn_max_age=0 if DB_POOL else config(
+            'DB_CONN_MAX_AGE', default=0 if SERVED_BY_ASGI else 60, cast=int
+        ),
+        conn_health_checks=config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
     )
 }
 
+if DB_POOL and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'name': 'default',
+        'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        # Segundos que un request espera una conexión libre antes de fallar
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -290,6 +338,46 @@ STRIPE_PUBLIC_KEY = config("STRIPE_PUBLIC_KEY")
 STRIPE_WEBHOOK_SECRET = config("STRIPE_WEBHOOK_SECRET")
 
 
+########################################## LOGGING ##########################################
+# Logs a stdout vía cola (backend/log.py): el request no espera la escritura.
+# LOG_LEVEL controla la app; LOG_FORMAT=json para producción, text para desarrollo.
+
+LOG_LEVEL = config("LOG_LEVEL", default="INFO")
+LOG_FORMAT = config("LOG_FORMAT", default="text")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "request_id": {"()": "backend.log.RequestIdFilter"},
+    },
+    "formatters": {
+        "text": {
+            "format": "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s",
+        },
+        "json": {"()": "backend.log.JsonFormatter"},
+    },
+    "handlers": {
+        "queue": {
+            "()": "backend.log.QueueLogHandler",
+            "filters": ["request_id"],
+            "formatter": LOG_FORMAT,
+        },
+    },
+    "root": {
+        "handlers": ["queue"],
+        "level": "WARNING",
+    },
+    "loggers": {
+        "django": {"level": "INFO"},
+        **{
+            app: {"level": LOG_LEVEL}
+            for app in ("backend", "orders", "inventory", "products", "users", "qb", "clover", "reports")
+        },
+    },
+}
+
+
 
 ######################################## Configuración para usar S3 como almacenamiento por defecto ##########################
 """
@@ -16,13 +16,20 @@ from .schema import schema_view
 # Decoradores para agrupar endpoints
 from drf_yasg.utils import swagger_auto_schema
 from functools import wraps
+from asgiref.sync import iscoroutinefunction
 
 # Decorador personalizado para etiquetar vistas
 def tag_view(tag_name):
     def decorator(view_func):
-        @wraps(view_func)
-        def _wrapped_view(*args, **kwargs):
-            return view_func(*args, **kwargs)
+        if iscoroutinefunction(view_func):
+            # Las vistas async (catálogo ASGI) deben seguir siendo async
+            @wraps(view_func)
+            async def _wrapped_view(*args, **kwargs):
+                return await view_func(*args, **kwargs)
+        else:
+            @wraps(view_func)
+            def _wrapped_view(*args, **kwargs):
+                return view_func(*args, **kwargs)
         _wrapped_view.__swagger_auto_schema = getattr(
             view_func, '__swagger_auto_schema', {})
         if not hasattr(_wrapped_view.__swagger_auto_schema, 'get'):
@@ -56,6 +63,8 @@ from qb import urls as qb_urls
 from inventory import urls as inventory_urls
 from products import urls as products_urls
 from clover import urls as clover_urls
+from reports import urls as reports_urls
+from TPOP import urls as cart_urls
 
 # Aplicar etiquetas a los patrones de URL
 users_urls.urlpatterns = apply_tag('Usuarios', users_urls.urlpatterns)
@@ -64,8 +73,11 @@ qb_urls.urlpatterns = apply_tag('QuickBooks', qb_urls.urlpatterns)
 inventory_urls.urlpatterns = apply_tag('Inventario', inventory_urls.urlpatterns)
 products_urls.urlpatterns = apply_tag('Productos', products_urls.urlpatterns)
 clover_urls.urlpatterns = apply_tag('Clover', clover_urls.urlpatterns)
+reports_urls.urlpatterns = apply_tag('Reportes', reports_urls.urlpatterns)
+cart_urls.urlpatterns = apply_tag('Carrito', cart_urls.urlpatterns)
 
 import users.views as views
+from .metrics import metrics_view
 urlpatterns = [
     # URLs de administración
     path('admin/', admin.site.urls),
@@ -89,6 +101,11 @@ urlpatterns = [
     path('api/', include(inventory_urls)),
     path('api/', include(products_urls)),
     path('api/clover/', include(clover_urls)),
+    path('api/reports/', include(reports_urls)),
+    path('api/', include(cart_urls)),
+
+    # Métricas de rendimiento (Prometheus, solo staff)
+    path('api/metrics/', metrics_view, name='metrics'),
 ]
 
 # Servir archivos de medios en desarrollo
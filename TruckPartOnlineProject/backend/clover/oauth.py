@@ -1,6 +1,10 @@
+import logging
+
 import requests
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
 
 def get_clover_tokens(code):
     """
@@ -18,13 +22,10 @@ def get_clover_tokens(code):
         "redirect_uri": settings.CLOVER["REDIRECT_URI"],
     }
 
-    print("🔵 URL:", url)
-    print("🔵 DATA ENVIADA:", data)
-
     response = requests.post(url, data=data)
 
-    print("🔴 STATUS:", response.status_code)
-    print("🔴 RESPONSE:", response.text)
+    # Sin loguear el body: contiene client_secret y tokens
+    logger.info("Clover oauth token: %s", response.status_code)
 
     response.raise_for_status()
 
@@ -46,13 +47,9 @@ def refresh_clover_token(refresh_token):
         "grant_type": "refresh_token",
     }
 
-    print("🔵 REFRESH URL:", url)
-    print("🔵 REFRESH DATA:", data)
-
     response = requests.post(url, data=data)
 
-    print("🔴 REFRESH STATUS:", response.status_code)
-    print("🔴 REFRESH RESPONSE:", response.text)
+    logger.info("Clover oauth refresh: %s", response.status_code)
 
     response.raise_for_status()
 
@@ -1,11 +1,14 @@
 
 ##################################################################################################
+import logging
 import requests
 from decimal import Decimal
 from django.conf import settings
 from products.models import Product
 from clover.oauth import refresh_clover_token
 
+logger = logging.getLogger(__name__)
+
 
 def sync_clover_prices(merchant):
     """
@@ -26,7 +29,7 @@ def sync_clover_prices(merchant):
 
     # 🔄 Si token expiró, intentar refresh automáticamente
     if response.status_code == 401 and merchant.refresh_token:
-        print("🔄 Token expirado, renovando...")
+        logger.info("Token de Clover expirado para merchant %s, renovando", merchant.merchant_id)
 
         token_data = refresh_clover_token(merchant.refresh_token)
 
@@ -43,7 +46,7 @@ def sync_clover_prices(merchant):
     response.raise_for_status()
 
     items = response.json().get("elements", [])
-    print("✅ TOTAL ITEMS RECIBIDOS:", len(items))
+    logger.info("Clover sync: %s items recibidos", len(items))
 
     for item in items:
         clover_item_id = item.get("id")
@@ -63,7 +66,7 @@ def sync_clover_prices(merchant):
             }
         )
 
-        print(
-            f"{'🆕 Creado' if created else '♻️ Actualizado'}: "
-            f"{name} → {price}"
+        logger.debug(
+            "%s producto %s: %s -> %s",
+            "Creado" if created else "Actualizado", product.id, name, price,
         )
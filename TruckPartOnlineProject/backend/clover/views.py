@@ -1,12 +1,15 @@
 
+import logging
+
 from django.shortcuts import redirect
 from django.http import JsonResponse
 from clover.models import CloverMerchant
 from .oauth import get_clover_tokens
 
+logger = logging.getLogger(__name__)
+
 
 def clover_oauth_callback(request):
-    print("🔥 CALLBACK EJECUTADO")
     code = request.GET.get("code")
     merchant_id = request.GET.get("merchant_id")
 
@@ -19,6 +22,7 @@ def clover_oauth_callback(request):
     try:
         token_data = get_clover_tokens(code)
     except Exception as e:
+        logger.exception("Error obteniendo tokens de Clover para merchant %s", merchant_id)
         return JsonResponse({"error": str(e)}, status=400)
 
     access_token = token_data.get("access_token")
@@ -2,7 +2,12 @@ from django.contrib import admin
 
 # Register your models here.
 
-from .models import Inventory, InventoryMovement
+from .models import (
+    ArchivedInventoryMovement,
+    Inventory,
+    InventoryMovement,
+    InventorySnapshot,
+)
 
 class InventoryMovementInline(admin.TabularInline):
     model = InventoryMovement
@@ -41,3 +46,36 @@ class InventoryMovementAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at',)
     list_filter = ('reason',)
     search_fields = ('inventory__product__name', 'reference')
+
+
+@admin.register(InventorySnapshot)
+class InventorySnapshotAdmin(admin.ModelAdmin):
+    list_display = (
+        'inventory',
+        'quantity',
+        'taken_at'
+    )
+
+    readonly_fields = ('inventory', 'quantity', 'taken_at', 'created_at')
+    search_fields = ('inventory__product__name',)
+    date_hierarchy = 'taken_at'
+
+
+@admin.register(ArchivedInventoryMovement)
+class ArchivedInventoryMovementAdmin(admin.ModelAdmin):
+    list_display = (
+        'inventory',
+        'change',
+        'reason',
+        'reference',
+        'created_at',
+        'archived_at'
+    )
+
+    readonly_fields = ('inventory', 'change', 'reason', 'reference', 'created_at', 'archived_at')
+    list_filter = ('reason',)
+    search_fields = ('inventory__product__name', 'reference')
+
+    def has_add_permission(self, request):
+        # Solo se llena compactando el ledger
+        return False
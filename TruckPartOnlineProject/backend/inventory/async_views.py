@@ -0,0 +1,107 @@
+"""
+Feed de cambios por Server-Sent Events, como vista async para servir bajo ASGI:
+
+    uvicorn backend.asgi:application --workers 4
+
+Cada conexión abierta es una corrutina que espera con asyncio.sleep y lee el
+feed con el ORM async: no ocupa un worker ni un hilo mientras espera. Bajo
+WSGI (gunicorn con workers sync) cada EventSource bloquearía un worker entero
+durante CHANGE_FEED_STREAM_SECONDS, así que ahí responde 503 y el cliente usa
+/api/inventory/changes/?since=, que sigue siendo el camino por defecto.
+
+CHANGE_FEED_MAX_STREAMS limita las conexiones abiertas por proceso.
+"""
+import asyncio
+import json
+import time
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from backend.renderers import FastJSONRenderer
+from .renderers import EventStreamRenderer
+from .services.changefeed import achanges_since, alatest_cursor, parse_feed_params
+
+# Streams abiertos en este proceso (un solo event loop: no necesita lock)
+_open_streams = 0
+
+
+def _error(request, message, status, retry_after=None):
+    # EventSource pide text/event-stream: el error va como evento, igual que antes en DRF
+    if "text/event-stream" in request.headers.get("Accept", ""):
+        renderer = EventStreamRenderer()
+    else:
+        renderer = FastJSONRenderer()
+    response = HttpResponse(
+        renderer.render({"error": message}), status=status, content_type=renderer.media_type
+    )
+    if retry_after:
+        response["Retry-After"] = str(retry_after)
+    return response
+
+
+async def _stream(cursor, limit, product_ids):
+    global _open_streams
+    poll = getattr(settings, "CHANGE_FEED_POLL_SECONDS", 2)
+    duration = getattr(settings, "CHANGE_FEED_STREAM_SECONDS", 300)
+
+    _open_streams += 1
+    try:
+        if cursor is None:
+            cursor = await alatest_cursor()
+        deadline = time.monotonic() + duration
+        idle = 0.0
+        yield "retry: 3000\n\n"
+        while True:
+            results, cursor, has_more = await achanges_since(cursor, limit, product_ids)
+            for change in results:
+                yield f"id: {change['cursor']}\nevent: {change['kind']}\ndata: {json.dumps(change)}\n\n"
+            if results:
+                idle = 0.0
+            elif idle >= 15:
+                # Comentario SSE: mantiene viva la conexión detrás de proxies
+                yield ": keepalive\n\n"
+                idle = 0.0
+
+            if time.monotonic() >= deadline:
+                break
+            if not has_more:
+                await asyncio.sleep(poll)
+                idle += poll
+    finally:
+        # También cuando el cliente se desconecta (Django cancela la corrutina)
+        _open_streams -= 1
+
+
+@require_GET
+async def changes_stream(request):
+    """
+    Feed de cambios por SSE: consulta el feed cada pocos segundos y envía lo nuevo.
+    Cada evento lleva id = cursor, así EventSource reconecta con Last-Event-ID.
+    """
+    if not isinstance(request, ASGIRequest):
+        return _error(
+            request,
+            "El stream solo está disponible bajo ASGI; use /api/inventory/changes/?since=",
+            503,
+        )
+    if _open_streams >= getattr(settings, "CHANGE_FEED_MAX_STREAMS", 200):
+        return _error(
+            request,
+            "Demasiadas conexiones al stream; use /api/inventory/changes/?since=",
+            503,
+            retry_after=30,
+        )
+
+    try:
+        since, limit, product_ids = parse_feed_params(request.GET, request.headers.get("Last-Event-ID"))
+    except ValueError as e:
+        return _error(request, str(e), 400)
+
+    response = StreamingHttpResponse(_stream(since, limit, product_ids), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Nginx no debe acumular el stream
+    response["X-Accel-Buffering"] = "no"
+    return response
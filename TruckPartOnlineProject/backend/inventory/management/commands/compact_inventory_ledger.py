@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventory.services.snapshots import compact_ledger
+
+
+class Command(BaseCommand):
+    help = (
+        "Archiva los movimientos de inventario anteriores a N días, "
+        "dejando un snapshot en la fecha de corte"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=90,
+            help="Se archivan los movimientos con más de estos días",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        # Corte a medianoche: los snapshots de compactación quedan alineados por día
+        before = (timezone.now() - timedelta(days=options["days"])).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+
+        archived = compact_ledger(before, batch_size=options["batch_size"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {archived} movimiento(s) anteriores a {before:%Y-%m-%d} archivados"
+        ))
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventory.models import ChangeFeedEntry
+
+
+class Command(BaseCommand):
+    help = "Borra del feed de cambios las entradas más antiguas que N días"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=7,
+            help="Un cliente con un cursor más viejo que esto debe recargar el catálogo",
+        )
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        deleted = 0
+
+        # Por lotes de ids para no tener una transacción larga sobre la tabla
+        while True:
+            ids = list(
+                ChangeFeedEntry.objects.filter(created_at__lt=cutoff)
+                .order_by("id")
+                .values_list("id", flat=True)[:options["batch_size"]]
+            )
+            if not ids:
+                break
+            ChangeFeedEntry.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {deleted} entrada(s) del feed borradas"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from inventory.services.snapshots import take_snapshots
+
+
+class Command(BaseCommand):
+    help = "Guarda un snapshot del stock de cada inventario (correr periódicamente, ej. diario)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--at",
+            help="Instante del snapshot en ISO 8601 (default: ahora menos 5 minutos)",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        at = None
+        if options["at"]:
+            at = parse_datetime(options["at"])
+            if at is None:
+                raise CommandError("--at debe tener formato ISO 8601, ej. 2026-01-31T00:00:00")
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        count = take_snapshots(at=at, chunk_size=options["chunk_size"])
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {count} snapshot(s) guardados"))
@@ -0,0 +1,441 @@
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection, connections
+from django.db.models import Count, Sum
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from inventory.models import ArchivedInventoryMovement, Inventory, InventoryMovement
+from inventory.services.inventory import move_inventory
+from orders.models import Order, StripeEvent
+from orders.stripe_events import process_pending_events
+from products.models import Product
+
+User = get_user_model()
+
+PREFIX = "STRESS"
+
+
+class Stats:
+    """
+    Contadores compartidos entre los hilos.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(int)
+        self.lock_wait = 0.0
+        self.lock_waits = 0
+        self.deadlocks = 0
+        self.db_locked = 0
+
+    def record(self, op, outcome, seconds):
+        with self.lock:
+            self.latencies[op].append(seconds)
+            self.outcomes[op, outcome] += 1
+
+    def add_lock_wait(self, seconds):
+        with self.lock:
+            self.lock_wait += seconds
+            self.lock_waits += 1
+
+    def add_error(self, error):
+        message = str(error).lower()
+        with self.lock:
+            if "deadlock" in message:
+                self.deadlocks += 1
+            elif "locked" in message:
+                # SQLite serializa las escrituras: "database is locked"
+                self.db_locked += 1
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress test de checkout, webhooks de Stripe y ajustes de inventario "
+        "concurrentes sobre pocos SKUs; verifica stock == suma de movimientos y >= 0"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16, help="Clientes concurrentes")
+        parser.add_argument("--workers", type=int, default=2, help="Workers de la cola de Stripe")
+        parser.add_argument("--operations", type=int, default=50, help="Operaciones por cliente")
+        parser.add_argument("--skus", type=int, default=3, help="SKUs calientes")
+        parser.add_argument("--initial-stock", type=int, default=300)
+        parser.add_argument("--seed", type=int, default=7)
+        parser.add_argument(
+            "--stripe-latency",
+            type=float,
+            default=0,
+            help="ms que tarda el PaymentIntent simulado (round trip a Stripe)",
+        )
+        parser.add_argument("--output", help="Guarda el reporte en este JSON")
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            self.stdout.write(self.style.WARNING(
+                "⚠️ SQLite no soporta SELECT ... FOR UPDATE y serializa las escrituras: "
+                "las métricas de locks solo son representativas en PostgreSQL"
+            ))
+
+        try:
+            setup_test_environment()
+            own_environment = True
+        except RuntimeError:
+            own_environment = False
+
+        # Solo los errores: los INFO de cada evento procesado tapan el reporte
+        logging.disable(logging.WARNING)
+        try:
+            report = self.run(options)
+        finally:
+            logging.disable(logging.NOTSET)
+            if own_environment:
+                teardown_test_environment()
+
+        self.print_report(report)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+
+        if report["violations"]:
+            raise CommandError(f"{len(report['violations'])} violación(es) del invariante de inventario")
+
+    ########################################################################################
+    # PREPARACIÓN
+    ########################################################################################
+
+    def setup_data(self, options):
+        # Datos de una corrida anterior (OrderItem protege a los productos)
+        Order.objects.filter(full_name=PREFIX).delete()
+        StripeEvent.objects.filter(event_id__contains=PREFIX).delete()
+        Product.objects.filter(sku__startswith=f"{PREFIX}-").delete()
+
+        products = []
+        for i in range(options["skus"]):
+            product = Product.objects.create(
+                name=f"{PREFIX} SKU caliente {i}",
+                price=10 + i,
+                sku=f"{PREFIX}-{i}",
+            )
+            move_inventory(
+                product=product,
+                quantity_change=options["initial_stock"],
+                reason="Stock inicial",
+                reference=PREFIX,
+            )
+            products.append(product)
+
+        admin, _ = User.objects.get_or_create(
+            username="stress-admin",
+            defaults={"email": "stress-admin@example.com", "is_staff": True, "is_active": True},
+        )
+        return products, admin
+
+    ########################################################################################
+    # OPERACIONES (cada una corre en el hilo de un cliente)
+    ########################################################################################
+
+    def timed(self, stats, op, func):
+        start = time.perf_counter()
+        try:
+            outcome = func()
+        except OperationalError as e:
+            stats.add_error(e)
+            outcome = "db_error"
+        except Exception as e:
+            stats.add_error(e)
+            outcome = type(e).__name__
+        stats.record(op, outcome, time.perf_counter() - start)
+
+    def checkout(self, client, rng, products, payment_method):
+        items = [
+            {"product_id": product.id, "quantity": rng.randint(1, 3)}
+            for product in rng.sample(products, rng.randint(1, len(products)))
+        ]
+        response = client.post("/api/checkout/", {
+            "full_name": PREFIX,
+            "guest_email": "stress@example.com",
+            "payment_method": payment_method,
+            "items": items,
+        }, format="json")
+        if response.status_code != 201:
+            return None
+        return response.json()
+
+    def card_checkout(self, client, rng, products):
+        """
+        Checkout con tarjeta y entrega de sus webhooks: duplicados y fuera de orden.
+        """
+        order = self.checkout(client, rng, products, "card")
+        if order is None:
+            return "rejected"
+
+        order_id = order["order_id"]
+        intent_id = f"pi_{PREFIX}_{order_id}"
+        created = int(time.time())
+        intent = {
+            "id": intent_id,
+            "amount": int(round(order["total"] * 100)),
+            "currency": "usd",
+            "metadata": {"order_id": str(order_id)},
+        }
+        events = [{
+            "id": f"evt_{PREFIX}_{order_id}_ok",
+            "type": "payment_intent.succeeded",
+            "created": created + 1,
+            "data": {"object": intent},
+        }]
+        if rng.random() < 0.3:
+            # Stripe reintenta la entrega
+            events.append(events[0])
+        if rng.random() < 0.2:
+            # Un intento fallido anterior que llega después del éxito
+            events.append({
+                "id": f"evt_{PREFIX}_{order_id}_failed",
+                "type": "payment_intent.payment_failed",
+                "created": created,
+                "data": {"object": intent},
+            })
+        if rng.random() < 0.1:
+            # Reembolso que llega antes que el pago
+            events.insert(0, {
+                "id": f"evt_{PREFIX}_{order_id}_refund",
+                "type": "charge.refunded",
+                "created": created + 2,
+                "data": {"object": {"id": f"ch_{order_id}", "payment_intent": intent_id, "amount_refunded": intent["amount"]}},
+            })
+
+        for event in events:
+            client.post(
+                "/api/stripe/webhook/", json.dumps(event),
+                content_type="application/json", HTTP_STRIPE_SIGNATURE=PREFIX,
+            )
+        return "ok"
+
+    def cod_checkout(self, client, rng, products):
+        """
+        Checkout contra entrega y pago, a veces con doble click en "pagar".
+        """
+        order = self.checkout(client, rng, products, "cod")
+        if order is None:
+            return "rejected"
+
+        attempts = 2 if rng.random() < 0.3 else 1
+        paid = [
+            client.post(f"/api/{order['order_id']}/pay/", {}, format="json").status_code == 200
+            for _ in range(attempts)
+        ]
+        return "ok" if any(paid) else "pay_failed"
+
+    def adjustment(self, client, rng, inventories):
+        inventory = rng.choice(inventories)
+        change = rng.choice((-5, -2, -1, 1, 5, 10))
+        response = client.post(
+            f"/api/inventory/{inventory.id}/adjust/",
+            {"change": change, "reason": "Ajuste stress", "reference": PREFIX},
+            format="json",
+        )
+        return "ok" if response.status_code == 200 else "rejected"
+
+    ########################################################################################
+    # EJECUCIÓN
+    ########################################################################################
+
+    def instrument(self, stats):
+        """
+        Mide el tiempo de los SELECT ... FOR UPDATE: casi todo es espera del lock.
+        """
+        def wrapper(execute, sql, params, many, context):
+            if "FOR UPDATE" not in sql:
+                return execute(sql, params, many, context)
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                stats.add_lock_wait(time.perf_counter() - start)
+        return wrapper
+
+    def client_thread(self, index, options, products, inventories, admin, stats):
+        rng = random.Random(options["seed"] + index)
+        client = APIClient()
+        staff = APIClient()
+        staff.force_authenticate(admin)
+
+        with connection.execute_wrapper(self.instrument(stats)):
+            for _ in range(options["operations"]):
+                roll = rng.random()
+                if roll < 0.5:
+                    self.timed(stats, "checkout_card", lambda: self.card_checkout(client, rng, products))
+                elif roll < 0.8:
+                    self.timed(stats, "checkout_cod", lambda: self.cod_checkout(client, rng, products))
+                else:
+                    self.timed(stats, "adjustment", lambda: self.adjustment(staff, rng, inventories))
+        connections.close_all()
+
+    def worker_thread(self, done, stats):
+        with connection.execute_wrapper(self.instrument(stats)):
+            while True:
+                try:
+                    processed = process_pending_events()
+                except OperationalError as e:
+                    stats.add_error(e)
+                    processed = 0
+                if not processed:
+                    if done.is_set():
+                        break
+                    time.sleep(0.05)
+        connections.close_all()
+
+    def run(self, options):
+        products, admin = self.setup_data(options)
+        inventories = list(Inventory.objects.filter(product__in=products))
+        stats = Stats()
+        done = threading.Event()
+
+        def fake_intent(**kwargs):
+            time.sleep(options["stripe_latency"] / 1000)
+            return SimpleNamespace(
+                id=f"pi_{PREFIX}_{kwargs['metadata']['order_id']}",
+                client_secret=f"{PREFIX}_secret",
+            )
+
+        # Sin red: QuickBooks responde al instante y Stripe tarda --stripe-latency
+        with patch("orders.views.stripe.PaymentIntent.create", side_effect=fake_intent), \
+                patch("orders.views.stripe.Webhook.construct_event", side_effect=lambda payload, *a: json.loads(payload)), \
+                patch("orders.views.create_invoice", return_value=None), \
+                patch("orders.stripe_events.create_sales_receipt", return_value=None):
+            close_old_connections()
+            clients = [
+                threading.Thread(
+                    target=self.client_thread,
+                    args=(i, options, products, inventories, admin, stats),
+                )
+                for i in range(options["threads"])
+            ]
+            workers = [
+                threading.Thread(target=self.worker_thread, args=(done, stats))
+                for _ in range(options["workers"])
+            ]
+
+            start = time.perf_counter()
+            for thread in clients + workers:
+                thread.start()
+            for thread in clients:
+                thread.join()
+            done.set()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+        return self.build_report(options, products, stats, elapsed)
+
+    ########################################################################################
+    # INVARIANTES Y REPORTE
+    ########################################################################################
+
+    def check_invariants(self, products):
+        violations = []
+
+        # El ledger completo son los movimientos vivos más los ya archivados por compactación
+        ledger = defaultdict(int)
+        for model in (InventoryMovement, ArchivedInventoryMovement):
+            totals = (
+                model.objects.filter(inventory__product__in=products)
+                .values("inventory_id")
+                .annotate(total=Sum("change"))
+            )
+            for row in totals:
+                ledger[row["inventory_id"]] += row["total"]
+
+        for inventory in Inventory.objects.filter(product__in=products):
+            if inventory.quantity != ledger[inventory.id]:
+                violations.append(
+                    f"Inventario {inventory.id}: stock {inventory.quantity} != suma de movimientos {ledger[inventory.id]}"
+                )
+            if inventory.quantity < 0:
+                violations.append(f"Inventario {inventory.id}: stock negativo {inventory.quantity}")
+
+        # Ninguna orden descuenta su stock más de una vez
+        sales = (
+            InventoryMovement.objects.filter(inventory__product__in=products, change__lt=0)
+            .exclude(reference=PREFIX)
+            .values("inventory_id", "reference")
+            .annotate(n=Count("id"))
+            .filter(n__gt=1)
+        )
+        for sale in sales:
+            violations.append(f"Descuento duplicado: {sale['reference']} ({sale['n']} movimientos)")
+
+        return violations
+
+    def build_report(self, options, products, stats, elapsed):
+        operations = {}
+        total = 0
+        for op, latencies in stats.latencies.items():
+            latencies.sort()
+            total += len(latencies)
+            operations[op] = {
+                "count": len(latencies),
+                "p50_ms": round(statistics.median(latencies) * 1000, 2),
+                "p95_ms": round(latencies[min(int(0.95 * len(latencies)), len(latencies) - 1)] * 1000, 2),
+                "outcomes": {
+                    outcome: count for (name, outcome), count in stats.outcomes.items() if name == op
+                },
+            }
+
+        orders = Order.objects.filter(full_name=PREFIX)
+        return {
+            "database": connection.vendor,
+            "threads": options["threads"],
+            "stripe_latency_ms": options["stripe_latency"],
+            "elapsed_s": round(elapsed, 2),
+            "throughput_ops_s": round(total / elapsed, 1) if elapsed else 0,
+            "operations": operations,
+            "lock_wait_s": round(stats.lock_wait, 3),
+            "lock_waits": stats.lock_waits,
+            "deadlocks": stats.deadlocks,
+            "database_locked_errors": stats.db_locked,
+            "orders": dict(orders.values_list("status").annotate(n=Count("id"))),
+            "stripe_events": dict(
+                StripeEvent.objects.filter(event_id__contains=PREFIX)
+                .values_list("status").annotate(n=Count("id"))
+            ),
+            "final_stock": dict(
+                Inventory.objects.filter(product__in=products).values_list("product__sku", "quantity")
+            ),
+            "violations": self.check_invariants(products),
+        }
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"\n{report['database']} · {report['threads']} clientes · {report['elapsed_s']} s · "
+            f"{report['throughput_ops_s']} ops/s"
+        )
+        for op, data in sorted(report["operations"].items()):
+            self.stdout.write(
+                f"   {op:15} {data['count']:6} ops  p50 {data['p50_ms']:8.2f} ms  "
+                f"p95 {data['p95_ms']:8.2f} ms  {data['outcomes']}"
+            )
+        self.stdout.write(
+            f"   espera de locks: {report['lock_wait_s']} s en {report['lock_waits']} SELECT FOR UPDATE · "
+            f"deadlocks: {report['deadlocks']} · database locked: {report['database_locked_errors']}"
+        )
+        self.stdout.write(f"   órdenes: {report['orders']} · eventos Stripe: {report['stripe_events']}")
+        self.stdout.write(f"   stock final: {report['final_stock']}")
+
+        if report["violations"]:
+            for violation in report["violations"]:
+                self.stdout.write(self.style.ERROR(f"   ❌ {violation}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("   ✅ stock == suma de movimientos, sin negativos ni descuentos duplicados"))
@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-19 15:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedInventoryMovement',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('change', models.IntegerField()),
+                ('reason', models.CharField(max_length=100)),
+                ('reference', models.CharField(blank=True, max_length=100, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('inventory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_movements', to='inventory.inventory')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['inventory', '-created_at'], name='invarchive_inv_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('taken_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('inventory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='inventory.inventory')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['inventory', '-taken_at'], name='invsnapshot_inv_taken_idx')],
+                'constraints': [models.UniqueConstraint(fields=('inventory', 'taken_at'), name='invsnapshot_inventory_taken_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 6.0 on 2026-10-19 15:46
+
+from django.db import migrations, models
+
+
+def backfill_movement_type(apps, schema_editor):
+    """
+    Los movimientos existentes toman el tipo de su signo; los ajustes
+    manuales del endpoint /adjust/ quedan como AJUSTE.
+    """
+    for name in ("InventoryMovement", "ArchivedInventoryMovement"):
+        model = apps.get_model("inventory", name)
+        model.objects.filter(change__gt=0).update(movement_type="ENTRADA")
+        model.objects.filter(reason__startswith="Ajuste").update(movement_type="AJUSTE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_inventory_snapshots_archive'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='inventorymovement',
+            name='invmovement_inv_created_idx',
+        ),
+        migrations.AddField(
+            model_name='archivedinventorymovement',
+            name='movement_type',
+            field=models.CharField(choices=[('ENTRADA', 'Entrada'), ('SALIDA', 'Salida'), ('TRANSFERENCIA', 'Transferencia'), ('AJUSTE', 'Ajuste')], default='SALIDA', max_length=20),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='movement_type',
+            field=models.CharField(choices=[('ENTRADA', 'Entrada'), ('SALIDA', 'Salida'), ('TRANSFERENCIA', 'Transferencia'), ('AJUSTE', 'Ajuste')], default='SALIDA', max_length=20),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_movement_type, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['inventory', '-created_at', '-id'], name='invmovement_inv_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['inventory', 'movement_type', '-created_at', '-id'], name='invmovement_inv_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['reference'], name='invmovement_reference_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-19 17:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedinventorymovement',
+            index=models.Index(fields=['reference'], name='invarchive_reference_idx'),
+        ),
+    ]
@@ -10,16 +10,40 @@ class Inventory(models.Model):
     quantity = models.PositiveIntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Filtros in_stock / min_quantity / max_quantity
+            models.Index(fields=["quantity"], name="inventory_quantity_idx"),
+        ]
+
     def __str__(self):
         return f"{self.product.name} - {self.quantity}"
 
+MOVEMENT_TYPES = (
+    ("ENTRADA", "Entrada"),
+    ("SALIDA", "Salida"),
+    ("TRANSFERENCIA", "Transferencia"),
+    ("AJUSTE", "Ajuste"),
+)
+
+
+def movement_type_for(change):
+    """
+    Tipo por defecto según el signo del cambio (ventas salen, reposiciones entran).
+    """
+    return "ENTRADA" if change > 0 else "SALIDA"
+
+
 class InventoryMovement(models.Model):
+    MOVEMENT_TYPES = MOVEMENT_TYPES
+
     inventory = models.ForeignKey(
         Inventory,
         on_delete=models.CASCADE,
         related_name="movements"
     )
     change = models.IntegerField()  # +10, -2
+    movement_type = models.CharField(max_length=20, choices=MOVEMENT_TYPES)
     reason = models.CharField(max_length=100)
     reference = models.CharField(
         max_length=100,
@@ -28,5 +52,128 @@ class InventoryMovement(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # GET /api/inventory/{id}/movements/ ordenado por fecha; el id
+            # desempata la paginación por cursor
+            models.Index(
+                fields=["inventory", "-created_at", "-id"],
+                name="invmovement_inv_created_idx",
+            ),
+            # ?movement_type= dentro del mismo orden
+            models.Index(
+                fields=["inventory", "movement_type", "-created_at", "-id"],
+                name="invmovement_inv_type_idx",
+            ),
+            # ?reference= (ej. todos los movimientos de una orden)
+            models.Index(fields=["reference"], name="invmovement_reference_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.movement_type:
+            self.movement_type = movement_type_for(self.change)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.change} ({self.reason})" 
+
+class InventorySnapshot(models.Model):
+    """
+    Stock de un inventario al instante `taken_at`: incluye todos los
+    movimientos con created_at < taken_at. Permite responder el stock en
+    una fecha con snapshot + delta acotado, sin recorrer todo el historial.
+    """
+    inventory = models.ForeignKey(
+        Inventory,
+        on_delete=models.CASCADE,
+        related_name="snapshots"
+    )
+    quantity = models.IntegerField()
+    taken_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["inventory", "taken_at"],
+                name="invsnapshot_inventory_taken_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["inventory", "-taken_at"],
+                name="invsnapshot_inv_taken_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.inventory_id} @ {self.taken_at}: {self.quantity}"
+
+
+class ArchivedInventoryMovement(models.Model):
+    """
+    Movimientos compactados (compact_inventory_ledger). Conservan su id y
+    fecha originales; la tabla viva solo guarda los posteriores al corte.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    inventory = models.ForeignKey(
+        Inventory,
+        on_delete=models.CASCADE,
+        related_name="archived_movements"
+    )
+    change = models.IntegerField()
+    movement_type = models.CharField(max_length=20, choices=MOVEMENT_TYPES)
+    reason = models.CharField(max_length=100)
+    reference = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["inventory", "-created_at"],
+                name="invarchive_inv_created_idx",
+            ),
+            # Movimientos de una orden (webhook de Stripe)
+            models.Index(fields=["reference"], name="invarchive_reference_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.change} ({self.reason})"
+
+
+class ChangeFeedEntry(models.Model):
+    """
+    Feed de cambios de stock y precio, solo de inserción. El id es el cursor
+    que usan los clientes (?since= y Last-Event-ID del stream SSE).
+    """
+    KINDS = (
+        ("stock", "Stock"),
+        ("price", "Price"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="feed_entries"
+    )
+    kind = models.CharField(max_length=10, choices=KINDS)
+    quantity = models.IntegerField(null=True, blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # ?products= dentro de un rango de cursor
+            models.Index(fields=["product", "id"], name="changefeed_product_id_idx"),
+            # Limpieza por antigüedad (prune_change_feed)
+            models.Index(fields=["created_at"], name="changefeed_created_idx"),
+        ]
+
     def __str__(self):
-        return f"{self.change} ({self.reason})" 
\ No newline at end of file
+        return f"#{self.id} {self.kind} producto {self.product_id}"
@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+class MovementCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) para el historial de movimientos: cada
+    página es un rango sobre el índice (inventory, -created_at, -id) y no
+    se hace OFFSET ni COUNT sobre todo el historial.
+    """
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering = ("-created_at", "-id")
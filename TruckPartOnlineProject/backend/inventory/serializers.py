@@ -24,6 +24,7 @@ class InventoryMovementSerializer(serializers.ModelSerializer):
         fields = [
             "id",
             "change",
+            "movement_type",
             "reason",
             "reference",
             "created_at",
@@ -1,7 +1,15 @@
-from django.db import transaction
+import logging
+
+from django.db import DatabaseError, transaction
+from django.db.models import Q
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from inventory.models import Inventory, InventoryMovement, movement_type_for
+from inventory.services.changefeed import record_stock_changes
+from inventory.signals import stock_bulk_updated
 
-from inventory.models import Inventory, InventoryMovement
+logger = logging.getLogger(__name__)
 
 def get_inventory(product):
     return Inventory.objects.select_for_update().get(product=product)
@@ -46,12 +54,14 @@ def move_inventory(
     product,
     quantity_change,
     reason,
-    reference=None
+    reference=None,
+    movement_type=None
 ):
     """
     quantity_change:
         +n -> entrada
         -n -> salida
+    movement_type: si no se indica, ENTRADA o SALIDA según el signo
     """
     inventory = get_inventory(product)
 
@@ -66,6 +76,7 @@ def move_inventory(
     movement = InventoryMovement.objects.create(
         inventory=inventory,
         change=quantity_change,
+        movement_type=movement_type or movement_type_for(quantity_change),
         reason=reason,
         reference=reference
     )
@@ -82,3 +93,160 @@ def validate_stock(product, quantity):
         product=product
     )
     return inventory.quantity >= quantity
+
+
+################################################
+# AJUSTE MASIVO (conteos cíclicos)
+################################################
+
+# Inventarios bloqueados por transacción: lotes chicos para no frenar
+# por mucho tiempo a los checkouts que esperan esas mismas filas
+BULK_CHUNK_SIZE = 200
+
+
+def _parse_adjustment(raw):
+    """
+    Valida una línea {product_id | sku, change | absolute_count}.
+    Retorna (product_id, sku, tipo, valor) o lanza ValueError con el motivo.
+    """
+    def value(name):
+        v = raw.get(name)
+        return None if v is None or str(v).strip() == "" else v
+
+    product_id, sku = value("product_id"), value("sku")
+    change, absolute_count = value("change"), value("absolute_count")
+
+    if (product_id is None) == (sku is None):
+        raise ValueError("Indique product_id o sku (solo uno)")
+    if (change is None) == (absolute_count is None):
+        raise ValueError("Indique change o absolute_count (solo uno)")
+
+    try:
+        product_id = int(product_id) if product_id is not None else None
+        kind, amount = ("change", int(change)) if change is not None else ("absolute_count", int(absolute_count))
+    except (TypeError, ValueError):
+        raise ValueError("product_id, change y absolute_count deben ser números enteros")
+
+    if kind == "absolute_count" and amount < 0:
+        raise ValueError("absolute_count no puede ser negativo")
+
+    return product_id, (str(sku).strip() if sku is not None else None), kind, amount
+
+
+def bulk_adjust_inventory(lines, *, reason, reference, chunk_size=None):
+    """
+    Aplica un conteo o ajuste masivo y retorna un reporte por línea.
+
+    1. Valida las líneas y resuelve product_id / sku en una sola query.
+    2. Por lotes de `chunk_size` inventarios (en orden de id, para no
+       provocar deadlocks): bloquea, calcula el delta contra el stock
+       bloqueado, crea los movimientos con bulk_create y actualiza las
+       cantidades con bulk_update. Un lote que falla no deshace los demás.
+
+    Todos los movimientos llevan la misma `reference`.
+    """
+    chunk_size = chunk_size or BULK_CHUNK_SIZE
+    report = []
+    parsed = []
+    for number, raw in enumerate(lines, start=1):
+        result = {"line": number, "product_id": None, "sku": None, "status": "error"}
+        report.append(result)
+        try:
+            product_id, sku, kind, amount = _parse_adjustment(raw)
+        except ValueError as e:
+            result["error"] = str(e)
+            continue
+        result["product_id"], result["sku"] = product_id, sku
+        parsed.append((result, kind, amount))
+
+    # 1️⃣ Resolver productos → inventarios en una query
+    ids = {r["product_id"] for r, _, _ in parsed if r["product_id"] is not None}
+    skus = {r["sku"] for r, _, _ in parsed if r["sku"] is not None}
+    by_product, by_sku = {}, {}
+    if parsed:
+        for inventory_id, product_id, sku in Inventory.objects.filter(
+            Q(product_id__in=ids) | Q(product__sku__in=skus)
+        ).values_list("id", "product_id", "product__sku"):
+            by_product[product_id] = (inventory_id, product_id, sku)
+            if sku:
+                by_sku[sku] = (inventory_id, product_id, sku)
+
+    entries = {}
+    for result, kind, amount in parsed:
+        found = by_product.get(result["product_id"]) if result["product_id"] is not None else by_sku.get(result["sku"])
+        if found is None:
+            result["error"] = "Producto no encontrado"
+            continue
+        inventory_id, result["product_id"], result["sku"] = found
+        if inventory_id in entries:
+            result["error"] = f"Producto repetido (ya viene en la línea {entries[inventory_id][0]['line']})"
+            continue
+        entries[inventory_id] = (result, kind, amount)
+
+    # 2️⃣ Aplicar por lotes
+    inventory_ids = sorted(entries)
+    for start in range(0, len(inventory_ids), chunk_size):
+        chunk = inventory_ids[start:start + chunk_size]
+        try:
+            _apply_adjustments(chunk, entries, reason, reference)
+        except DatabaseError:
+            logger.exception("Falló un lote del ajuste masivo %s", reference)
+            for inventory_id in chunk:
+                result = entries[inventory_id][0]
+                result.update(status="error", error="Error al guardar este lote; vuelva a enviar la línea")
+                for key in ("previous_quantity", "new_quantity", "change"):
+                    result.pop(key, None)
+
+    return report
+
+
+@transaction.atomic
+def _apply_adjustments(chunk, entries, reason, reference):
+    locked = {
+        inventory_id: (product_id, quantity)
+        for inventory_id, product_id, quantity in Inventory.objects.select_for_update()
+        .filter(id__in=chunk)
+        .order_by("id")
+        .values_list("id", "product_id", "quantity")
+    }
+    now = timezone.now()
+    movements, inventories = [], []
+
+    for inventory_id in chunk:
+        result, kind, amount = entries[inventory_id]
+        if inventory_id not in locked:
+            # El producto se borró entre la resolución y el bloqueo
+            result["error"] = "Producto no encontrado"
+            continue
+        product_id, current = locked[inventory_id]
+        change = amount if kind == "change" else amount - current
+        new_quantity = current + change
+
+        if new_quantity < 0:
+            result["error"] = f"Stock insuficiente: hay {current}, el ajuste es {change}"
+            continue
+
+        result.update(previous_quantity=current, new_quantity=new_quantity, change=change)
+        if change == 0:
+            result["status"] = "unchanged"
+            continue
+
+        result["status"] = "applied"
+        movements.append(InventoryMovement(
+            inventory_id=inventory_id,
+            change=change,
+            movement_type="AJUSTE",
+            reason=reason,
+            reference=reference,
+        ))
+        inventories.append(Inventory(id=inventory_id, product_id=product_id, quantity=new_quantity, updated_at=now))
+
+    # bulk_create/bulk_update no disparan post_save: la cantidad y el feed se
+    # actualizan aquí mismo, y carritos y documentos del catálogo con stock_bulk_updated
+    InventoryMovement.objects.bulk_create(movements)
+    Inventory.objects.bulk_update(inventories, ["quantity", "updated_at"])
+    record_stock_changes((inventory.product_id, inventory.quantity) for inventory in inventories)
+    if inventories:
+        stock_bulk_updated.send(
+            sender=Inventory, product_ids=[inventory.product_id for inventory in inventories]
+        )
@@ -0,0 +1,210 @@
+import heapq
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from inventory.models import (
+    ArchivedInventoryMovement,
+    Inventory,
+    InventoryMovement,
+    InventorySnapshot,
+)
+
+# Inicio del historial: sin snapshot previo se suma desde aquí
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Un snapshot "de ahora" se toma con este atraso, para no dejar afuera
+# movimientos de transacciones que todavía no hicieron commit
+SNAPSHOT_LAG = timedelta(minutes=5)
+
+LEDGERS = (InventoryMovement, ArchivedInventoryMovement)
+
+
+class MovementHistory:
+    """
+    Historial de un inventario como si fuera una sola tabla: movimientos vivos
+    más los archivados por compact_inventory_ledger (conservan id y fecha).
+
+    Soporta lo que usan /movements/ (MovementCursorPagination) y el export CSV:
+    filter y order_by se aplican a cada tabla; un slice [a:b] trae hasta b
+    filas ordenadas de cada una y las mezcla, e iterator()/aiterator() mezclan
+    los dos cursores sin cargar el historial en memoria.
+    """
+
+    def __init__(self, querysets, ordering=()):
+        self.querysets = list(querysets)
+        self.ordering = tuple(ordering)
+
+    def filter(self, *args, **kwargs):
+        return MovementHistory((qs.filter(*args, **kwargs) for qs in self.querysets), self.ordering)
+
+    def order_by(self, *fields):
+        return MovementHistory((qs.order_by(*fields) for qs in self.querysets), fields)
+
+    def _sort_key(self):
+        # Todas las columnas en el mismo sentido: ("-created_at", "-id") o al revés
+        if len({field.startswith("-") for field in self.ordering}) != 1:
+            raise ValueError("MovementHistory necesita un order_by en un solo sentido")
+        attrs = [field.lstrip("-") for field in self.ordering]
+        return lambda movement: tuple(getattr(movement, attr) for attr in attrs), self.ordering[0].startswith("-")
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None or index.stop is None:
+            raise TypeError("MovementHistory solo admite slices [a:b]")
+        key, reverse = self._sort_key()
+        rows = [row for qs in self.querysets for row in qs[:index.stop]]
+        return sorted(rows, key=key, reverse=reverse)[index.start or 0:index.stop]
+
+    def iterator(self, chunk_size=2000):
+        key, reverse = self._sort_key()
+        return heapq.merge(
+            *(qs.iterator(chunk_size=chunk_size) for qs in self.querysets), key=key, reverse=reverse
+        )
+
+    async def aiterator(self, chunk_size=2000):
+        """
+        iterator() con el ORM async: mezcla los cursores de las dos tablas.
+        """
+        key, reverse = self._sort_key()
+        pick = max if reverse else min
+        iterators = [qs.aiterator(chunk_size=chunk_size) for qs in self.querysets]
+        heads = [await anext(iterator, None) for iterator in iterators]
+        while any(head is not None for head in heads):
+            index = pick((i for i, head in enumerate(heads) if head is not None), key=lambda i: key(heads[i]))
+            yield heads[index]
+            heads[index] = await anext(iterators[index], None)
+
+
+def movement_history(inventory):
+    return MovementHistory(model.objects.filter(inventory=inventory) for model in LEDGERS)
+
+
+def _delta(model, start, end):
+    """
+    Subquery: suma de cambios de `model` para el inventario externo en [start, end).
+    """
+    movements = (
+        model.objects.filter(
+            inventory=OuterRef("pk"),
+            created_at__gte=start,
+            created_at__lt=end,
+        )
+        .values("inventory")
+        .annotate(total=Sum("change"))
+        .values("total")
+    )
+    return Coalesce(Subquery(movements[:1]), Value(0))
+
+
+def take_snapshots(at=None, inventories=None, chunk_size=2000):
+    """
+    Guarda el stock de cada inventario al instante `at` como
+    snapshot anterior + movimientos desde entonces (vivos y archivados).
+    Retorna cuántos snapshots creó.
+    """
+    at = at or timezone.now() - SNAPSHOT_LAG
+    inventories = Inventory.objects.all() if inventories is None else inventories
+
+    previous = InventorySnapshot.objects.filter(
+        inventory=OuterRef("pk"),
+        taken_at__lte=at,
+    ).order_by("-taken_at")
+
+    rows = (
+        inventories.annotate(
+            previous_at=Subquery(previous.values("taken_at")[:1]),
+            previous_quantity=Subquery(previous.values("quantity")[:1]),
+        )
+        .annotate(base_at=Coalesce("previous_at", Value(EPOCH)))
+        .annotate(
+            live_delta=_delta(InventoryMovement, OuterRef("base_at"), at),
+            archived_delta=_delta(ArchivedInventoryMovement, OuterRef("base_at"), at),
+        )
+        .order_by("pk")
+        .values_list("pk", "previous_at", "previous_quantity", "live_delta", "archived_delta")
+    )
+
+    created = 0
+    batch = []
+    for pk, previous_at, previous_quantity, live_delta, archived_delta in rows.iterator(chunk_size=chunk_size):
+        if previous_at == at:
+            continue
+        batch.append(InventorySnapshot(
+            inventory_id=pk,
+            quantity=(previous_quantity or 0) + live_delta + archived_delta,
+            taken_at=at,
+        ))
+        if len(batch) >= chunk_size:
+            created += len(InventorySnapshot.objects.bulk_create(batch, ignore_conflicts=True))
+            batch = []
+
+    created += len(InventorySnapshot.objects.bulk_create(batch, ignore_conflicts=True))
+    return created
+
+
+def stock_at(inventory, when):
+    """
+    Stock de `inventory` al instante `when`: el último snapshot anterior
+    más los movimientos entre ese snapshot y `when`.
+    """
+    snapshot = (
+        InventorySnapshot.objects.filter(inventory=inventory, taken_at__lte=when)
+        .order_by("-taken_at")
+        .first()
+    )
+    base_at = snapshot.taken_at if snapshot else EPOCH
+    quantity = snapshot.quantity if snapshot else 0
+
+    replayed = 0
+    for model in LEDGERS:
+        delta = model.objects.filter(
+            inventory=inventory,
+            created_at__gte=base_at,
+            created_at__lt=when,
+        ).aggregate(total=Sum("change"), count=Count("id"))
+        quantity += delta["total"] or 0
+        replayed += delta["count"]
+
+    return {
+        "quantity": quantity,
+        "at": when,
+        "snapshot_at": snapshot.taken_at if snapshot else None,
+        "movements_replayed": replayed,
+    }
+
+
+def compact_ledger(before, batch_size=5000):
+    """
+    Mueve los movimientos anteriores a `before` a ArchivedInventoryMovement.
+    Antes deja un snapshot en `before` para cada inventario afectado, así
+    las consultas de stock posteriores no necesitan el archivo.
+    Retorna cuántos movimientos archivó.
+    """
+    affected = Inventory.objects.filter(
+        pk__in=InventoryMovement.objects.filter(created_at__lt=before).values("inventory_id")
+    )
+    take_snapshots(at=before, inventories=affected)
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            movements = list(
+                InventoryMovement.objects.filter(created_at__lt=before)
+                .order_by("id")
+                .values("id", "inventory_id", "change", "movement_type", "reason", "reference", "created_at")[:batch_size]
+            )
+            if not movements:
+                break
+
+            ArchivedInventoryMovement.objects.bulk_create(
+                [ArchivedInventoryMovement(**movement) for movement in movements],
+                ignore_conflicts=True,
+            )
+            InventoryMovement.objects.filter(id__in=[m["id"] for m in movements]).delete()
+
+        archived += len(movements)
+
+    return archived
@@ -1,13 +1,28 @@
 from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.dispatch import Signal, receiver
 from products.models import Product
 from .models import Inventory
+from .services.changefeed import record_price_change, record_stock_changes
+
+# bulk_update no dispara post_save: el ajuste masivo envía esta señal (dentro
+# de su transacción) con los product_ids cuyo stock cambió. Los receptores
+# hacen lo mismo que con el post_save de Inventory.
+stock_bulk_updated = Signal()
 
 @receiver(post_save, sender=Product)
 def create_inventory_for_product(sender, instance, created, **kwargs):
     if created:
         Inventory.objects.create(product=instance)
 
+
+@receiver(post_save, sender=Product)
+def publish_price_change(sender, instance, created, **kwargs):
+    # Incluye la sincronización de Clover (update_or_create guarda con save()).
+    # Los .update() sobre querysets no pasan por aquí.
+    if created or instance.price != getattr(instance, "_loaded_price", None):
+        record_price_change(instance.id, instance.price)
+        instance._loaded_price = instance.price
+
 from .models import InventoryMovement
 
 @receiver(post_save, sender=InventoryMovement)
@@ -15,4 +30,5 @@ def update_inventory_quantity(sender, instance, created, **kwargs):
     if created:
         inventory = instance.inventory
         inventory.quantity += instance.change
-        inventory.save()
\ No newline at end of file
+        inventory.save()
+        record_stock_changes([(inventory.product_id, inventory.quantity)])
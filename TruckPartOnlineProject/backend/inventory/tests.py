@@ -1,3 +1,443 @@
-from django.test import TestCase
+import csv
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from clover.services.clover_sync import sync_clover_prices
+from inventory.models import ArchivedInventoryMovement, ChangeFeedEntry, InventoryMovement, InventorySnapshot
+from inventory.services.inventory import _apply_adjustments, move_inventory
+from inventory.services.snapshots import compact_ledger, stock_at, take_snapshots
+from products.models import Product, ProductListing
+
+
+class InventorySnapshotTest(TestCase):
+    """
+    Stock histórico con snapshots y compactación del ledger.
+    """
+
+    def setUp(self):
+        self.product = Product.objects.create(name="Filtro", price=Decimal("10.00"), sku="SNAP-1")
+        self.inventory = self.product.inventory
+        self.start = timezone.make_aware(datetime(2025, 1, 1))
+
+        # Un movimiento por día durante 30 días: +10 los pares, -3 los impares
+        for day in range(30):
+            movement = InventoryMovement.objects.create(
+                inventory=self.inventory,
+                change=10 if day % 2 == 0 else -3,
+                reason="Prueba",
+                reference=f"D{day}",
+            )
+            InventoryMovement.objects.filter(id=movement.id).update(
+                created_at=self.start + timedelta(days=day, hours=12)
+            )
+
+    def replay(self, when):
+        """Stock recorriendo todo el historial, como referencia."""
+        return sum(
+            10 if day % 2 == 0 else -3
+            for day in range(30)
+            if self.start + timedelta(days=day, hours=12) < when
+        )
+
+    def test_stock_at_matches_full_replay(self):
+        take_snapshots(at=self.start + timedelta(days=10))
+
+        for day in (0, 5, 10, 11, 20, 31):
+            when = self.start + timedelta(days=day)
+            self.assertEqual(stock_at(self.inventory, when)["quantity"], self.replay(when))
+
+        result = stock_at(self.inventory, self.start + timedelta(days=15))
+        self.assertEqual(result["snapshot_at"], self.start + timedelta(days=10))
+        self.assertEqual(result["movements_replayed"], 5)
+
+    def test_snapshots_are_idempotent(self):
+        at = self.start + timedelta(days=10)
+        take_snapshots(at=at)
+        take_snapshots(at=at)
+
+        self.assertEqual(InventorySnapshot.objects.filter(inventory=self.inventory).count(), 1)
+
+    def test_compaction_keeps_history_and_current_stock(self):
+        cutoff = self.start + timedelta(days=20)
+        expected = {day: self.replay(self.start + timedelta(days=day)) for day in (3, 20, 25, 31)}
+
+        archived = compact_ledger(cutoff, batch_size=7)
+
+        self.assertEqual(archived, 20)
+        self.assertFalse(InventoryMovement.objects.filter(created_at__lt=cutoff).exists())
+        self.assertEqual(ArchivedInventoryMovement.objects.count(), 20)
+
+        for day, quantity in expected.items():
+            self.assertEqual(stock_at(self.inventory, self.start + timedelta(days=day))["quantity"], quantity)
+
+        # Después del corte ya no hace falta leer el archivo
+        result = stock_at(self.inventory, self.start + timedelta(days=25))
+        self.assertEqual(result["snapshot_at"], cutoff)
+        self.assertEqual(result["movements_replayed"], 5)
+
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, self.replay(self.start + timedelta(days=31)))
+
+    def test_compact_command(self):
+        out = StringIO()
+        call_command("compact_inventory_ledger", days=0, stdout=out)
+
+        self.assertEqual(InventoryMovement.objects.count(), 0)
+        self.assertIn("30 movimiento(s)", out.getvalue())
+
+    def test_stock_at_endpoint(self):
+        client = APIClient()
+        url = f"/api/inventory/{self.inventory.id}/stock-at/"
+
+        # Una fecha sola es el cierre del día: incluye el movimiento de las 12:00
+        response = client.get(url, {"at": "2025-01-05"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["quantity"], self.replay(self.start + timedelta(days=5)))
+
+        response = client.get(url, {"at": "2025-01-05T06:00:00"})
+        self.assertEqual(response.data["quantity"], self.replay(self.start + timedelta(days=4, hours=6)))
+
+        response = client.get(url, {"at": "ayer"})
+        self.assertEqual(response.status_code, 400)
+
+
+class InventoryMovementFilterTest(TestCase):
+    """
+    Filtros, paginación por cursor y exportación CSV de /movements/.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Bomba", price=Decimal("10.00"), sku="MOV-1")
+        self.inventory = self.product.inventory
+        self.url = f"/api/inventory/{self.inventory.id}/movements/"
+        start = timezone.make_aware(datetime(2025, 3, 1, 12))
+
+        for day in range(10):
+            move_inventory(product=self.product, quantity_change=5, reason="Reabastecimiento", reference=f"OC-{day}")
+            move_inventory(product=self.product, quantity_change=-1, reason="Venta COD", reference=f"Orden #{day}")
+        move_inventory(
+            product=self.product, quantity_change=-2, reason="Ajuste manual", movement_type="AJUSTE",
+        )
+
+        # Dos movimientos por día (mismo instante, desempata el id) y el ajuste al final
+        for i, movement in enumerate(self.inventory.movements.order_by("id")):
+            InventoryMovement.objects.filter(id=movement.id).update(created_at=start + timedelta(days=i // 2))
+
+    def test_movement_type_is_structured(self):
+        types = dict(
+            self.inventory.movements.values_list("reference", "movement_type").exclude(reference=None)
+        )
+        self.assertEqual(types["OC-0"], "ENTRADA")
+        self.assertEqual(types["Orden #0"], "SALIDA")
+        self.assertTrue(self.inventory.movements.filter(reference=None, movement_type="AJUSTE").exists())
+
+    def test_filters(self):
+        response = self.client.get(self.url, {"start_date": "2025-03-03", "end_date": "2025-03-04"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 4)
+
+        response = self.client.get(self.url, {"movement_type": "salida"})
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertTrue(all(m["movement_type"] == "SALIDA" for m in response.data["results"]))
+
+        response = self.client.get(self.url, {"reference": "Orden #3"})
+        self.assertEqual([m["change"] for m in response.data["results"]], [-1])
+
+        self.assertEqual(self.client.get(self.url, {"start_date": "03/03/2025"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"movement_type": "ROBO"}).status_code, 400)
+
+    def test_cursor_pagination_walks_every_movement_once(self):
+        seen = []
+        response = self.client.get(self.url, {"page_size": 3})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(m["id"] for m in response.data["results"])
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+
+        expected = list(self.inventory.movements.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_csv_export_streams_filtered_rows(self):
+        response = self.client.get(f"{self.url}export/", {"movement_type": "ENTRADA", "end_date": "2025-03-05"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+
+        rows = list(csv.reader(b"".join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0], ["id", "created_at", "movement_type", "change", "reason", "reference"])
+        self.assertEqual(len(rows) - 1, 5)
+        self.assertEqual({row[2] for row in rows[1:]}, {"ENTRADA"})
+
+    async def test_csv_export_streams_asynchronously_under_asgi(self):
+        response = await AsyncClient().get(f"{self.url}export/", {"movement_type": "ENTRADA"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+
+        body = b"".join([part async for part in response.streaming_content]).decode()
+        rows = list(csv.reader(body.splitlines()))
+        self.assertEqual(len(rows) - 1, 10)
+        self.assertEqual({row[2] for row in rows[1:]}, {"ENTRADA"})
+
+    def test_archived_movements_stay_in_history_and_export(self):
+        expected = list(self.inventory.movements.order_by("-created_at", "-id").values_list("id", flat=True))
+        # Archiva los primeros 4 días (8 movimientos) de 21
+        compact_ledger(timezone.make_aware(datetime(2025, 3, 5)))
+        self.assertEqual(self.inventory.movements.count(), 13)
+
+        seen = []
+        response = self.client.get(self.url, {"page_size": 5})
+        while True:
+            seen.extend(m["id"] for m in response.data["results"])
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(seen, expected)
+
+        # Un rango anterior al corte sale del archivo
+        response = self.client.get(self.url, {"end_date": "2025-03-02", "reference": "Orden #1"})
+        self.assertEqual([m["change"] for m in response.data["results"]], [-1])
+
+        response = self.client.get(f"{self.url}export/")
+        rows = list(csv.reader(b"".join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([int(row[0]) for row in rows[1:]], expected)
+
+
+class BulkAdjustTest(TestCase):
+    """
+    POST /api/inventory/bulk-adjust/ para conteos cíclicos.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(username="almacen", password="x", is_staff=True)
+        )
+        self.url = "/api/inventory/bulk-adjust/"
+        self.products = []
+        for i in range(5):
+            product = Product.objects.create(name=f"Pieza {i}", price=Decimal("10.00"), sku=f"BULK-{i}")
+            move_inventory(product=product, quantity_change=10, reason="Stock inicial")
+            self.products.append(product)
+
+    def quantity(self, product):
+        product.inventory.refresh_from_db()
+        return product.inventory.quantity
+
+    def test_mixed_lines_report(self):
+        p = self.products
+        self.client.get("/api/products/")
+        response = self.client.post(self.url, {
+            "reference": "Conteo pasillo 3",
+            "items": [
+                {"product_id": p[0].id, "change": 5},
+                {"sku": "BULK-1", "absolute_count": 7},
+                {"sku": "BULK-2", "absolute_count": 10},
+                {"product_id": p[3].id, "change": -11},
+                {"sku": "NO-EXISTE", "change": 1},
+                {"product_id": p[0].id, "change": 1},
+                {"product_id": p[4].id},
+            ],
+        }, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["summary"], {"applied": 2, "unchanged": 1, "errors": 4})
+        results = response.data["results"]
+        self.assertEqual(results[0]["status"], "applied")
+        self.assertEqual(
+            (results[1]["previous_quantity"], results[1]["new_quantity"], results[1]["change"]), (10, 7, -3)
+        )
+        self.assertEqual(results[2]["status"], "unchanged")
+        self.assertIn("Stock insuficiente", results[3]["error"])
+        self.assertEqual(results[4]["error"], "Producto no encontrado")
+        self.assertIn("repetido", results[5]["error"])
+        self.assertEqual(results[6]["status"], "error")
+
+        self.assertEqual([self.quantity(product) for product in p], [15, 7, 10, 10, 10])
+        # bulk_update no dispara post_save: stock_bulk_updated vacía los documentos del catálogo
+        self.assertEqual(
+            set(ProductListing.objects.filter(card__isnull=True).values_list("product_id", flat=True)),
+            {p[0].id, p[1].id},
+        )
+        # Un movimiento por línea aplicada, todos con la misma referencia y cuadrando con el stock
+        adjustments = InventoryMovement.objects.filter(reference="Conteo pasillo 3")
+        self.assertEqual(adjustments.count(), 2)
+        self.assertEqual(set(adjustments.values_list("movement_type", flat=True)), {"AJUSTE"})
+        for product in p:
+            ledger = sum(product.inventory.movements.values_list("change", flat=True))
+            self.assertEqual(ledger, self.quantity(product))
+
+    def test_csv_upload_in_chunks(self):
+        content = "product_id,sku,change,absolute_count\n" + "".join(
+            f",BULK-{i},,{i}\n" for i in range(5)
+        )
+        with patch("inventory.services.inventory.BULK_CHUNK_SIZE", 2), \
+                patch("inventory.services.inventory._apply_adjustments", wraps=_apply_adjustments) as apply:
+            response = self.client.post(self.url, {
+                "file": SimpleUploadedFile("conteo.csv", content.encode(), content_type="text/csv"),
+            }, format="multipart")
+
+        self.assertEqual(apply.call_count, 3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["summary"]["applied"], 5)
+        self.assertEqual([self.quantity(product) for product in self.products], [0, 1, 2, 3, 4])
+        self.assertTrue(response.data["reference"].startswith("Conteo "))
+
+    def test_product_deleted_before_lock_is_a_line_error(self):
+        p = self.products
+
+        def delete_then_apply(chunk, *args):
+            # Otro request borra el producto después de resolver las líneas
+            Product.objects.filter(id=p[1].id).delete()
+            return _apply_adjustments(chunk, *args)
+
+        with patch("inventory.services.inventory._apply_adjustments", side_effect=delete_then_apply):
+            response = self.client.post(self.url, {
+                "items": [{"product_id": p[0].id, "change": 2}, {"product_id": p[1].id, "change": 2}],
+            }, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["summary"], {"applied": 1, "unchanged": 0, "errors": 1})
+        self.assertEqual(response.data["results"][1]["error"], "Producto no encontrado")
+        self.assertEqual(self.quantity(p[0]), 12)
+
+    def test_staff_only(self):
+        self.assertEqual(APIClient().post(self.url, {"items": []}, format="json").status_code, 401)
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+class ChangeFeedTest(TestCase):
+    """
+    Feed de cambios de stock y precio (?since= y SSE).
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(name="Turbo", price=Decimal("100.00"), sku="FEED-1")
+        self.cursor = self.client.get("/api/inventory/changes/").data["cursor"]
+
+    def changes(self, **params):
+        return self.client.get("/api/inventory/changes/", {"since": self.cursor, **params}).data
+
+    def test_movements_and_price_changes_are_published(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            move_inventory(product=self.product, quantity_change=8, reason="Reabastecimiento")
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.get(id=self.product.id)
+            product.name = "Turbo HD"
+            product.save()  # sin cambio de precio: no publica
+            product.price = Decimal("120.00")
+            product.save()
+
+        data = self.changes()
+        self.assertEqual(
+            [(c["kind"], c["quantity"], c["price"]) for c in data["results"]],
+            [("stock", 8, None), ("price", None, "120.00")],
+        )
+        self.assertEqual(data["cursor"], data["results"][-1]["cursor"])
+
+        # Con el nuevo cursor ya no hay nada
+        self.cursor = data["cursor"]
+        self.assertEqual(self.changes()["results"], [])
+
+    def test_rolled_back_changes_are_not_published(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            move_inventory(product=self.product, quantity_change=3, reason="Reabastecimiento")
+        # Solo el feed de cambios (el documento de ProductListing se borra, no se renderiza)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.changes()["results"], [])
+
+    def test_bulk_adjust_and_clover_sync_publish(self):
+        self.product.clover_item_id = "CLV-1"
+        self.product.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            _apply_adjustments([self.product.inventory.id], {
+                self.product.inventory.id: ({"status": "error"}, "absolute_count", 4),
+            }, "Conteo", "Conteo prueba")
+
+        merchant = SimpleNamespace(merchant_id="M1", access_token="t", refresh_token=None)
+        clover = Mock(status_code=200)
+        clover.json.return_value = {"elements": [{"id": "CLV-1", "name": "Turbo", "price": 9999}]}
+        with self.captureOnCommitCallbacks(execute=True), \
+                patch("clover.services.clover_sync.requests.get", return_value=clover):
+            sync_clover_prices(merchant)
+
+        results = self.changes(products=str(self.product.id))["results"]
+        self.assertEqual([(c["kind"], c["quantity"], c["price"]) for c in results], [
+            ("stock", 4, None), ("price", None, "99.99"),
+        ])
+
+    def test_pagination_and_validation(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(5):
+                move_inventory(product=self.product, quantity_change=1, reason="Reabastecimiento")
+
+        first = self.changes(limit=3)
+        self.assertTrue(first["has_more"])
+        self.cursor = first["cursor"]
+        second = self.changes(limit=3)
+        self.assertFalse(second["has_more"])
+        self.assertEqual([c["quantity"] for c in first["results"] + second["results"]], [1, 2, 3, 4, 5])
+
+        self.assertEqual(self.client.get("/api/inventory/changes/", {"since": "x"}).status_code, 400)
+
+    def test_recent_entries_wait_for_the_settle_margin(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            move_inventory(product=self.product, quantity_change=1, reason="Reabastecimiento")
+        with self.captureOnCommitCallbacks(execute=True):
+            move_inventory(product=self.product, quantity_change=2, reason="Reabastecimiento")
+        older, newer = ChangeFeedEntry.objects.filter(id__gt=self.cursor).order_by("id")
+        ChangeFeedEntry.objects.filter(id=older.id).update(created_at=timezone.now() - timedelta(seconds=10))
+
+        with self.settings(CHANGE_FEED_SETTLE_SECONDS=5):
+            data = self.changes()
+            # Se corta en la primera entrada reciente: el cursor no pasa de ahí
+            self.assertEqual([c["quantity"] for c in data["results"]], [1])
+            self.assertEqual(data["cursor"], older.id)
+            self.assertEqual(self.client.get("/api/inventory/changes/").data["cursor"], older.id)
+
+            ChangeFeedEntry.objects.filter(id=newer.id).update(created_at=timezone.now() - timedelta(seconds=10))
+            self.cursor = data["cursor"]
+            self.assertEqual([c["quantity"] for c in self.changes()["results"]], [3])
+
+    async def test_sse_stream_resumes_from_last_event_id(self):
+        def publish():
+            with self.captureOnCommitCallbacks(execute=True):
+                move_inventory(product=self.product, quantity_change=2, reason="Reabastecimiento")
+                move_inventory(product=self.product, quantity_change=2, reason="Reabastecimiento")
+            return self.changes()["results"][0]["cursor"]
+        first = await sync_to_async(publish)()
+
+        with self.settings(CHANGE_FEED_STREAM_SECONDS=0):
+            response = await AsyncClient().get(
+                "/api/inventory/changes/stream/",
+                headers={"accept": "text/event-stream", "last-event-id": str(first)},
+            )
+            body = b"".join([part async for part in response.streaming_content]).decode()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertNotIn(f"id: {first}\n", body)
+        self.assertIn(f"id: {first + 1}\nevent: stock\n", body)
+        self.assertIn('"quantity": 4', body)
+
+    def test_sse_stream_is_not_served_under_wsgi(self):
+        # Bajo WSGI cada conexión ocuparía un worker: el cliente usa ?since=
+        response = self.client.get("/api/inventory/changes/stream/", HTTP_ACCEPT="text/event-stream")
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.streaming)
+        self.assertTrue(response.content.startswith(b"event: error\n"))
@@ -1,10 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import InventoryViewSet
+from . import async_views
 
 router = DefaultRouter()
 router.register(r"inventory", InventoryViewSet, basename="inventory")
 
 urlpatterns = [
+    # Stream SSE del feed de cambios (vista async, para servir bajo ASGI)
+    path("inventory/changes/stream/", async_views.changes_stream, name="inventory-changes-stream"),
     path("", include(router.urls)),
-]
\ No newline at end of file
+]
@@ -4,17 +4,36 @@ from drf_yasg import openapi
 
 # Create your views here.
 from rest_framework.viewsets import ReadOnlyModelViewSet
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
+import codecs
+import csv
+from datetime import datetime, time, timedelta
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
-from .models import Inventory
+from .models import Inventory, InventoryMovement
+from .pagination import MovementCursorPagination
 from .serializers import (
     InventorySerializer,
     InventoryMovementSerializer,
 )
-from .services.inventory import move_inventory
+from .services.inventory import bulk_adjust_inventory, move_inventory
+from .services.changefeed import changes_since, latest_cursor, parse_feed_params
+from .services.snapshots import movement_history, stock_at
+
+class _Echo:
+    """
+    Pseudo-buffer para csv.writer: devuelve cada línea en vez de guardarla.
+    """
+    def write(self, value):
+        return value
+
 
 class InventoryViewSet(ReadOnlyModelViewSet):
     """
@@ -29,6 +48,10 @@ class InventoryViewSet(ReadOnlyModelViewSet):
     - `retrieve`: Cualquier usuario autenticado puede ver el detalle de un ítem
     - `movements`: Requiere permiso 'inventory.view_inventorymovement' para ver movimientos
     - `adjust`: Requiere permiso 'inventory.change_inventory' para realizar ajustes
+    - `stock-at`: Stock histórico a una fecha (snapshot + movimientos)
+    - `bulk-adjust`: Solo staff, ajuste masivo por conteo cíclico
+    - `changes`: Feed de cambios de stock y precio por cursor (el stream SSE
+      `changes/stream` es una vista async, inventory/async_views.py, solo bajo ASGI)
     
     ## Filtros disponibles
     - `product_id`: Filtrar inventario por ID de producto
@@ -204,13 +227,53 @@ class InventoryViewSet(ReadOnlyModelViewSet):
                 
         return queryset
     
+    def filter_movements(self, inventory):
+        """
+        Aplica start_date, end_date, movement_type y reference al historial
+        (vivo y archivado por compact_inventory_ledger).
+        Lanza ValueError con el mensaje para el cliente si un filtro es inválido.
+        """
+        params = self.request.query_params
+        movements = movement_history(inventory)
+
+        for param, lookup, offset in (
+            ("start_date", "created_at__gte", timedelta(0)),
+            ("end_date", "created_at__lt", timedelta(days=1)),  # end_date incluye todo ese día
+        ):
+            if not params.get(param):
+                continue
+            try:
+                day = parse_date(params[param])
+            except ValueError:
+                day = None
+            if day is None:
+                raise ValueError(f"'{param}' debe tener formato YYYY-MM-DD")
+            bound = timezone.make_aware(datetime.combine(day + offset, time.min))
+            movements = movements.filter(**{lookup: bound})
+
+        movement_type = params.get("movement_type")
+        if movement_type:
+            movement_type = movement_type.upper()
+            if movement_type not in dict(InventoryMovement.MOVEMENT_TYPES):
+                raise ValueError(
+                    "'movement_type' debe ser uno de: "
+                    + ", ".join(code for code, _ in InventoryMovement.MOVEMENT_TYPES)
+                )
+            movements = movements.filter(movement_type=movement_type)
+
+        if params.get("reference"):
+            movements = movements.filter(reference=params["reference"])
+
+        return movements
+
     @swagger_auto_schema(
         operation_id='inventory_movements',
         operation_description="""
-        Obtiene el historial completo de movimientos para un ítem de inventario específico.
+        Obtiene el historial de movimientos para un ítem de inventario específico.
         
         Los movimientos incluyen entradas, salidas, ajustes y transferencias de inventario,
-        ordenados cronológicamente del más reciente al más antiguo.
+        ordenados cronológicamente del más reciente al más antiguo. Incluye los
+        movimientos archivados por la compactación del ledger.
         
         ## Tipos de movimiento
         - `ENTRADA`: Ingreso de productos al inventario (compra, devolución, ajuste positivo)
@@ -220,41 +283,40 @@ class InventoryViewSet(ReadOnlyModelViewSet):
         
         ## Filtros disponibles
         - `start_date`: Fecha de inicio (formato: YYYY-MM-DD)
-        - `end_date`: Fecha de fin (formato: YYYY-MM-DD)
+        - `end_date`: Fecha de fin, inclusive (formato: YYYY-MM-DD)
         - `movement_type`: Tipo de movimiento (ENTRADA, SALIDA, TRANSFERENCIA, AJUSTE)
-        - `reference`: Número de referencia u orden relacionada
+        - `reference`: Número de referencia u orden relacionada (coincidencia exacta)
+        
+        ## Paginación
+        Por cursor: seguir los links `next` / `previous` de la respuesta.
         """,
         responses={
             200: openapi.Response(
                 description='Historial de movimientos',
                 schema=InventoryMovementSerializer(many=True),
                 examples={
-                    'application/json': [
-                        {
-                            'id': 1,
-                            'inventory': 123,
-                            'movement_type': 'ENTRADA',
-                            'quantity': 10,
-                            'previous_quantity': 5,
-                            'new_quantity': 15,
-                            'reference': 'OC-2023-001',
-                            'notes': 'Ingreso por orden de compra',
-                            'created_by': 'usuario1',
-                            'created_at': '2023-10-15T14:30:00Z'
-                        },
-                        {
-                            'id': 2,
-                            'inventory': 123,
-                            'movement_type': 'SALIDA',
-                            'quantity': -2,
-                            'previous_quantity': 15,
-                            'new_quantity': 13,
-                            'reference': 'VTA-2023-456',
-                            'notes': 'Venta a cliente',
-                            'created_by': 'usuario2',
-                            'created_at': '2023-10-14T10:15:00Z'
-                        }
-                    ]
+                    'application/json': {
+                        'next': 'http://api.example.com/api/inventory/123/movements/?cursor=cD0yMDIz',
+                        'previous': None,
+                        'results': [
+                            {
+                                'id': 2,
+                                'change': -2,
+                                'movement_type': 'SALIDA',
+                                'reason': 'Venta COD',
+                                'reference': 'Orden #456',
+                                'created_at': '2023-10-15T14:30:00Z'
+                            },
+                            {
+                                'id': 1,
+                                'change': 10,
+                                'movement_type': 'ENTRADA',
+                                'reason': 'Reabastecimiento',
+                                'reference': 'OC-2023-001',
+                                'created_at': '2023-10-14T10:15:00Z'
+                            }
+                        ]
+                    }
                 }
             ),
             400: 'Parámetros de consulta inválidos',
@@ -273,7 +335,7 @@ class InventoryViewSet(ReadOnlyModelViewSet):
             openapi.Parameter(
                 'end_date',
                 openapi.IN_QUERY,
-                description='Fecha de fin para filtrar movimientos (YYYY-MM-DD)',
+                description='Fecha de fin para filtrar movimientos, inclusive (YYYY-MM-DD)',
                 type=openapi.TYPE_STRING,
                 format=openapi.FORMAT_DATE
             ),
@@ -291,39 +353,172 @@ class InventoryViewSet(ReadOnlyModelViewSet):
                 type=openapi.TYPE_STRING
             ),
             openapi.Parameter(
-                'page', 
+                'cursor', 
                 openapi.IN_QUERY, 
-                description="Número de página para la paginación", 
-                type=openapi.TYPE_INTEGER
+                description="Cursor de la página (tomado de los links next/previous)", 
+                type=openapi.TYPE_STRING
             ),
             openapi.Parameter(
                 'page_size', 
                 openapi.IN_QUERY, 
-                description="Número de elementos por página", 
+                description="Número de elementos por página (máximo 500)", 
                 type=openapi.TYPE_INTEGER
             )
         ]
     )
-    @action(detail=True, methods=["get"], url_path="movements")
+    @action(
+        detail=True,
+        methods=["get"],
+        url_path="movements",
+        pagination_class=MovementCursorPagination,
+    )
     def movements(self, request, pk=None):
         """
-        Obtiene el historial completo de movimientos para un producto específico en el inventario.
+        Obtiene el historial de movimientos para un producto específico en el inventario.
         Los movimientos se ordenan por fecha de creación en orden descendente.
         """
         inventory = self.get_object()
-        movements = inventory.movements.all().order_by("-created_at")
+        try:
+            movements = self.filter_movements(inventory)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Aplicar paginación
+        # Aplicar paginación (el paginador ordena por -created_at, -id)
         page = self.paginate_queryset(movements)
-        if page is not None:
-            serializer = InventoryMovementSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = InventoryMovementSerializer(movements, many=True)
-        return Response(serializer.data)
+        serializer = InventoryMovementSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     #GET /api/inventory/{id}/movements/
     #----------------------------------------------------------------
 
+    @swagger_auto_schema(
+        operation_description=(
+            "Exporta a CSV los movimientos de un ítem de inventario. Acepta los mismos "
+            "filtros que /movements/; el archivo se genera por partes, sin cargar "
+            "todo el rango en memoria."
+        ),
+        manual_parameters=[
+            openapi.Parameter('start_date', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('end_date', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter(
+                'movement_type',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=['ENTRADA', 'SALIDA', 'TRANSFERENCIA', 'AJUSTE']
+            ),
+            openapi.Parameter('reference', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+        ],
+        responses={
+            200: 'Archivo CSV (text/csv)',
+            400: 'Parámetros de consulta inválidos',
+            404: 'Ítem de inventario no encontrado'
+        }
+    )
+    @action(detail=True, methods=["get"], url_path="movements/export")
+    def export_movements(self, request, pk=None):
+        """
+        Descarga CSV del historial filtrado, fila por fila. Bajo ASGI el stream
+        es un generador async (aiterator): Django consumiría uno sync entero
+        en memoria antes de enviarlo.
+        """
+        inventory = self.get_object()
+        try:
+            movements = self.filter_movements(inventory).order_by("-created_at", "-id")
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        writer = csv.writer(_Echo())
+        header = writer.writerow(["id", "created_at", "movement_type", "change", "reason", "reference"])
+
+        def line(movement):
+            return writer.writerow([
+                movement.id, movement.created_at.isoformat(), movement.movement_type,
+                movement.change, movement.reason, movement.reference or "",
+            ])
+
+        if isinstance(request._request, ASGIRequest):
+            async def stream():
+                yield header
+                async for movement in movements.aiterator(chunk_size=2000):
+                    yield line(movement)
+        else:
+            def stream():
+                yield header
+                for movement in movements.iterator(chunk_size=2000):
+                    yield line(movement)
+
+        response = StreamingHttpResponse(stream(), content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = (
+            f'attachment; filename="inventario-{inventory.id}-movimientos.csv"'
+        )
+        return response
+    #GET /api/inventory/{id}/movements/export/
+    #----------------------------------------------------------------
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Stock de un producto en una fecha u hora pasada. Se calcula desde el "
+            "último snapshot anterior más los movimientos posteriores, sin recorrer "
+            "todo el historial."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                'at',
+                openapi.IN_QUERY,
+                description=(
+                    "Fecha (YYYY-MM-DD, stock al cierre de ese día) "
+                    "o fecha y hora ISO 8601"
+                ),
+                type=openapi.TYPE_STRING,
+                required=True
+            )
+        ],
+        responses={
+            200: openapi.Response(
+                description='Stock a esa fecha',
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'quantity': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+                        'snapshot_at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME, nullable=True),
+                        'movements_replayed': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    }
+                )
+            ),
+            400: 'Parámetro at faltante o con formato inválido',
+            404: 'Inventario no encontrado'
+        }
+    )
+    @action(detail=True, methods=["get"], url_path="stock-at")
+    def stock_at(self, request, pk=None):
+        """
+        Stock del inventario en un instante pasado (snapshot + movimientos).
+        """
+        inventory = self.get_object()
+        raw = request.query_params.get("at", "")
+
+        try:
+            day = parse_date(raw)
+            if day is not None:
+                # Una fecha sola es el stock al cierre de ese día
+                when = datetime.combine(day + timedelta(days=1), time.min)
+            else:
+                when = parse_datetime(raw)
+                if when is None:
+                    raise ValueError
+        except ValueError:
+            return Response(
+                {"error": "El parámetro 'at' debe ser una fecha (YYYY-MM-DD) o fecha y hora ISO 8601"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if timezone.is_naive(when):
+            when = timezone.make_aware(when)
+
+        return Response(stock_at(inventory, when))
+    #GET /api/inventory/{id}/stock-at/?at=2026-01-31
+    #----------------------------------------------------------------
+
     @swagger_auto_schema(
         operation_description="Realiza un ajuste manual en el inventario de un producto.",
         request_body=openapi.Schema(
@@ -382,6 +577,7 @@ class InventoryViewSet(ReadOnlyModelViewSet):
                 quantity_change=change,
                 reason=reason,
                 reference=reference,
+                movement_type="AJUSTE",
             )
 
             return Response(
@@ -400,4 +596,182 @@ class InventoryViewSet(ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
     #POST /api/inventory/{id}/adjust/
+    #----------------------------------------------------------------
+
+    @swagger_auto_schema(
+        operation_description="""
+        Ajuste masivo de inventario (conteo cíclico de almacén). Solo staff.
+
+        Cada línea indica el producto (`product_id` o `sku`) y el ajuste
+        (`change` relativo o `absolute_count` contado). Los deltas se calculan
+        contra el stock actual y se aplican en lotes; todos los movimientos
+        quedan con la misma `reference`.
+
+        Acepta JSON (`{"items": [...], "reference": ..., "reason": ...}` o una
+        lista) o un CSV en el campo `file` (multipart) con columnas
+        `product_id,sku,change,absolute_count`.
+        """,
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['items'],
+            properties={
+                'items': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'product_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                            'sku': openapi.Schema(type=openapi.TYPE_STRING),
+                            'change': openapi.Schema(type=openapi.TYPE_INTEGER),
+                            'absolute_count': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        }
+                    )
+                ),
+                'reference': openapi.Schema(
+                    type=openapi.TYPE_STRING,
+                    description='Referencia común (default: Conteo <fecha y hora>)'
+                ),
+                'reason': openapi.Schema(type=openapi.TYPE_STRING, default='Conteo cíclico'),
+            }
+        ),
+        responses={
+            200: openapi.Response(
+                description='Reporte por línea',
+                examples={
+                    'application/json': {
+                        'reference': 'Conteo 2026-01-31 18:00:00',
+                        'summary': {'applied': 1, 'unchanged': 0, 'errors': 1},
+                        'results': [
+                            {'line': 1, 'product_id': 12, 'sku': 'FLT-01', 'status': 'applied',
+                             'previous_quantity': 8, 'new_quantity': 10, 'change': 2},
+                            {'line': 2, 'product_id': None, 'sku': 'XXX', 'status': 'error',
+                             'error': 'Producto no encontrado'},
+                        ]
+                    }
+                }
+            ),
+            400: 'Carga vacía o con formato inválido',
+            401: 'No autenticado',
+            403: 'Solo staff'
+        }
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk-adjust",
+        permission_classes=[IsAdminUser],
+        parser_classes=[JSONParser, MultiPartParser, FormParser],
+    )
+    def bulk_adjust(self, request):
+        """
+        Ajuste masivo: una referencia, lotes transaccionales y reporte por línea.
+        """
+        data = request.data
+        upload = request.FILES.get("file")
+
+        if upload is not None:
+            # El CSV se lee línea a línea desde el archivo subido
+            lines = csv.DictReader(codecs.iterdecode(upload, "utf-8-sig"))
+        elif isinstance(data, list):
+            lines, data = data, {}
+        else:
+            lines = data.get("items")
+
+        if not isinstance(lines, (list, csv.DictReader)):
+            return Response(
+                {"error": "Envíe 'items' (lista) o un archivo CSV en 'file'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        reference = data.get("reference") or f"Conteo {timezone.localtime():%Y-%m-%d %H:%M:%S}"
+        try:
+            report = bulk_adjust_inventory(
+                (line if isinstance(line, dict) else {} for line in lines),
+                reason=data.get("reason") or "Conteo cíclico",
+                reference=reference,
+            )
+        except (UnicodeDecodeError, csv.Error):
+            return Response(
+                {"error": "El archivo debe ser un CSV en UTF-8"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not report:
+            return Response(
+                {"error": "La carga no tiene líneas"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        statuses = [result["status"] for result in report]
+        return Response({
+            "reference": reference,
+            "summary": {
+                "applied": statuses.count("applied"),
+                "unchanged": statuses.count("unchanged"),
+                "errors": statuses.count("error"),
+            },
+            "results": report,
+        })
+    #POST /api/inventory/bulk-adjust/
+    #----------------------------------------------------------------
+
+    @swagger_auto_schema(
+        operation_description="""
+        Cambios de stock y precio posteriores a un cursor.
+
+        Sin `since` devuelve solo el cursor actual: el cliente carga el catálogo
+        una vez y desde ahí pide únicamente lo que cambió. Si `has_more` es
+        verdadero hay que volver a pedir con el nuevo `cursor`.
+
+        Un cambio aparece después de CHANGE_FEED_SETTLE_SECONDS (2 s por
+        defecto): así un commit que llega fuera de orden no queda detrás del
+        cursor. El feed es best-effort; conviene recargar el catálogo completo
+        cada tanto.
+
+        Es el camino por defecto para los clientes. Bajo ASGI también están
+        los mismos cambios como Server-Sent Events en `changes/stream/`
+        (bajo WSGI responde 503).
+        """,
+        manual_parameters=[
+            openapi.Parameter('since', openapi.IN_QUERY, description='Último cursor recibido', type=openapi.TYPE_INTEGER),
+            openapi.Parameter('products', openapi.IN_QUERY, description='IDs de producto separados por coma', type=openapi.TYPE_STRING),
+            openapi.Parameter('limit', openapi.IN_QUERY, description='Máximo de cambios (hasta 1000)', type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: openapi.Response(
+                description='Cambios desde el cursor',
+                examples={
+                    'application/json': {
+                        'cursor': 1042,
+                        'has_more': False,
+                        'results': [
+                            {'cursor': 1041, 'product_id': 12, 'kind': 'stock', 'quantity': 7,
+                             'price': None, 'at': '2026-01-31T18:00:00+00:00'},
+                            {'cursor': 1042, 'product_id': 12, 'kind': 'price', 'quantity': None,
+                             'price': '129.90', 'at': '2026-01-31T18:00:05+00:00'},
+                        ]
+                    }
+                }
+            ),
+            400: 'Parámetros inválidos'
+        }
+    )
+    @action(detail=False, methods=["get"], url_path="changes")
+    def changes(self, request):
+        """
+        Feed de cambios por cursor (?since=).
+        """
+        try:
+            since, limit, product_ids = parse_feed_params(
+                request.query_params, request.headers.get("Last-Event-ID")
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if since is None:
+            return Response({"cursor": latest_cursor(), "has_more": False, "results": []})
+
+        results, cursor, has_more = changes_since(since, limit, product_ids)
+        return Response({"cursor": cursor, "has_more": has_more, "results": results})
+    #GET /api/inventory/changes/?since=1040
     #----------------------------------------------------------------
\ No newline at end of file
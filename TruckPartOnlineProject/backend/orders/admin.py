@@ -1,6 +1,8 @@
 from django.contrib import admin, messages
-from .models import Order, OrderItem
+from .models import Order, OrderItem, StripeEvent
 from qb.services import create_sales_receipt, create_invoice
+from reports.services import record_order_sale
+from .stripe_events import replay_events
 
 
 # =========================
@@ -38,6 +40,7 @@ def send_to_quickbooks(modeladmin, request, queryset):
                 order.status = "invoiced"
 
             order.save()
+            record_order_sale(order)
 
             messages.success(
                 request,
@@ -164,3 +167,34 @@ class OrderItemAdmin(admin.ModelAdmin):
         "quantity",
         "price",
     )
+
+
+#########################################################################################
+# =========================
+# STRIPE EVENTS (cola del webhook)
+# =========================
+def replay_stripe_events(modeladmin, request, queryset):
+    count = replay_events(queryset)
+    messages.success(request, f"{count} evento(s) re-encolado(s)")
+
+
+replay_stripe_events.short_description = "🔁 Re-procesar eventos"
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = (
+        "event_id",
+        "type",
+        "status",
+        "attempts",
+        "result",
+        "created_at",
+        "processed_at",
+    )
+
+    list_filter = ("status", "type")
+    search_fields = ("event_id", "order_key")
+    actions = [replay_stripe_events]
+    readonly_fields = ("payload", "last_error", "created_at", "processed_at")
+
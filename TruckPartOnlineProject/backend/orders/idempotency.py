@@ -0,0 +1,214 @@
+# orders/idempotency.py
+"""
+Header Idempotency-Key para los POST que no deben repetirse (checkout, pay_order).
+
+La primera vez se reserva la key (fila en "processing") y corre la vista; su
+respuesta, salvo un 5xx o una marcada con release() (un pago que Stripe
+rechazó), queda guardada hasta IDEMPOTENCY_KEY_TTL_HOURS y los
+reintentos la reciben tal cual (con el header Idempotent-Replayed) sin volver
+a validar stock, crear órdenes ni llamar a Stripe/QuickBooks. Un duplicado que
+llega mientras el primero sigue en curso espera su resultado en lugar de
+correr en paralelo: en el mismo proceso con un Event, entre procesos
+releyendo la fila. manage.py prune_idempotency_keys borra las vencidas.
+"""
+import hashlib
+import json
+import threading
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+# Cuánto espera un duplicado al request original antes de responder 409
+WAIT_SECONDS = 15
+# Una key en "processing" más vieja que esto es de un proceso caído: se puede retomar
+STALE_AFTER = timedelta(minutes=5)
+
+# (scope, key) -> Event de los requests en curso en este proceso
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def ttl():
+    return timedelta(hours=getattr(settings, "IDEMPOTENCY_KEY_TTL_HOURS", 24))
+
+
+def _scope(request):
+    user = request.user.id if request.user.is_authenticated else "-"
+    return f"{request.method} {request.path} {user}"[:255]
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _claim(scope, key, fingerprint):
+    """
+    Reserva la key. Retorna (registro, reservada); registro None si la fila
+    desapareció entre medio (el request original falló y la liberó).
+    """
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                scope=scope, key=key, fingerprint=fingerprint, locked_at=now, expires_at=now + ttl()
+            )
+            return record, True
+    except IntegrityError:
+        pass
+
+    record = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+    if record is None:
+        return None, False
+
+    abandoned = record.status == "processing" and record.locked_at < now - STALE_AFTER
+    if record.expires_at <= now or abandoned:
+        # Vencida (todavía sin limpiar) o de un proceso caído: se usa como nueva.
+        # El update condicional evita que dos requests la retomen a la vez.
+        if IdempotencyKey.objects.filter(pk=record.pk, locked_at=record.locked_at).update(
+            status="processing", fingerprint=fingerprint, response_status=None,
+            response_body=None, locked_at=now, expires_at=now + ttl(),
+        ):
+            record.status, record.fingerprint, record.locked_at = "processing", fingerprint, now
+            return record, True
+
+    return record, False
+
+
+def _wait(scope, key, record, deadline):
+    """
+    Espera a que el request original termine. Retorna el registro releído
+    (None si el original falló y liberó la key).
+    """
+    with _inflight_lock:
+        event = _inflight.get((scope, key))
+
+    delay = 0.05
+    while record is not None and record.status == "processing":
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        if event is not None:
+            # Mismo proceso: se despierta apenas termina el original
+            event.wait(remaining)
+            event = None
+        else:
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.5)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+    return record
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_status)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def release(response):
+    """
+    Marca la respuesta para no guardarla: un reintento con la misma key vuelve
+    a ejecutar la vista en lugar de recibir este error.
+    """
+    response.idempotency_release = True
+    return response
+
+
+def idempotent(view):
+    """
+    Decorador para vistas @api_view. Sin header Idempotency-Key la vista corre
+    como siempre. La key vale por método + ruta + usuario.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"{HEADER} no puede superar {MAX_KEY_LENGTH} caracteres"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        scope, fingerprint = _scope(request), _fingerprint(request)
+        deadline = time.monotonic() + WAIT_SECONDS
+
+        # 1️⃣ Reservar la key, o devolver / esperar el resultado del original
+        while True:
+            record, claimed = _claim(scope, key, fingerprint)
+            if claimed:
+                break
+            if record is not None:
+                if record.fingerprint != fingerprint:
+                    return Response(
+                        {"error": f"{HEADER} ya se usó con otro cuerpo"},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                    )
+                record = _wait(scope, key, record, deadline)
+            if record is not None:
+                if record.status == "completed":
+                    return _replay(record)
+                return Response(
+                    {"error": f"Hay un request en curso con esta {HEADER}; reintente más tarde"},
+                    status=status.HTTP_409_CONFLICT
+                )
+            if time.monotonic() >= deadline:
+                return Response(
+                    {"error": f"Hay un request en curso con esta {HEADER}; reintente más tarde"},
+                    status=status.HTTP_409_CONFLICT
+                )
+            # El original falló y liberó la key: este request la toma
+
+        # 2️⃣ Ejecutar la vista y guardar su respuesta
+        event = threading.Event()
+        with _inflight_lock:
+            _inflight[scope, key] = event
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+            raise
+        else:
+            if response.status_code >= 500 or getattr(response, "idempotency_release", False):
+                # Error nuestro o de Stripe: el reintento debe poder ejecutarse de nuevo
+                IdempotencyKey.objects.filter(pk=record.pk).delete()
+            else:
+                IdempotencyKey.objects.filter(pk=record.pk).update(
+                    status="completed",
+                    response_status=response.status_code,
+                    response_body=response.data,
+                )
+            return response
+        finally:
+            with _inflight_lock:
+                _inflight.pop((scope, key), None)
+            event.set()
+
+    return wrapper
+
+
+def prune_expired_keys(batch_size=1000):
+    """
+    Borra las keys vencidas por lotes de ids (sin una transacción larga sobre la tabla).
+    """
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lt=timezone.now())
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        IdempotencyKey.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
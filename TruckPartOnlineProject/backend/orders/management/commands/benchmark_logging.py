@@ -0,0 +1,96 @@
+import logging
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from backend.log import QueueLogHandler, RequestIdFilter, correlation_id
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark: costo por pago del logging anterior (print síncrono) "
+        "contra el logger con cola y niveles"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument(
+            "--items",
+            type=int,
+            default=5,
+            help="Items por orden (el webhook anterior imprimía ~12 líneas por item)",
+        )
+        parser.add_argument(
+            "--output",
+            default=os.devnull,
+            help="Destino de las líneas (default /dev/null: mide solo el costo en el request)",
+        )
+
+    def handle(self, *args, **options):
+        n = options["requests"]
+        items = [
+            {"id": i, "name": f"Producto {i}", "quantity": 2, "price": "10.00"}
+            for i in range(options["items"])
+        ]
+
+        # Como stdout de un contenedor: line-buffered, un write por línea
+        with open(options["output"], "w", buffering=1) as stream:
+            old = self.run_print(stream, n, items)
+
+        logger = logging.getLogger("benchmark.logging")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        stream = open(options["output"], "w", buffering=1)
+        handler = QueueLogHandler(stream=stream)
+        handler.addFilter(RequestIdFilter())
+        handler.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+        ))
+        logger.addHandler(handler)
+
+        try:
+            new = self.run_logger(logger, n, items)
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+            stream.close()
+
+        self.stdout.write(f"print() síncrono:   {old / n * 1e6:8.1f} µs/pago")
+        self.stdout.write(f"logger con cola:    {new / n * 1e6:8.1f} µs/pago")
+        self.stdout.write(self.style.SUCCESS(f"Ahorro: {(old - new) / n * 1e6:.1f} µs/pago"))
+
+    def run_print(self, stream, n, items):
+        start = time.perf_counter()
+        for order_id in range(n):
+            print(f"\n📋 ITEMS DE LA ORDEN:", file=stream)
+            print(f"   Total items en orden: {len(items)}", file=stream)
+            for idx, item in enumerate(items, 1):
+                print(f"\n   Item {idx}:", file=stream)
+                print(f"      - ID: {item['id']}", file=stream)
+                print(f"      - Producto: {item['name']}", file=stream)
+                print(f"      - Cantidad: {item['quantity']}", file=stream)
+                print(f"      - Precio: ${item['price']}", file=stream)
+                print(f"\n--- Procesando Item {idx}/{len(items)} ---", file=stream)
+                print(f"   Producto: {item['name']}", file=stream)
+                print(f"   Cantidad a descontar: {item['quantity']}", file=stream)
+                print(f"   Stock ANTES: 10", file=stream)
+                print(f"   Stock DESPUÉS: 8", file=stream)
+                print(f"   ✅ Descontado: 2 unidades", file=stream)
+            print(f"\n{'='*80}", file=stream)
+            print(f"🎉 ORDEN #{order_id} COMPLETADA EXITOSAMENTE", file=stream)
+            print(f"{'='*80}", file=stream)
+        return time.perf_counter() - start
+
+    def run_logger(self, logger, n, items):
+        start = time.perf_counter()
+        for order_id in range(n):
+            with correlation_id(f"evt_{order_id}"):
+                for item in items:
+                    # Nivel desactivado en producción: no formatea ni encola
+                    logger.debug("Producto %s: stock %s -> %s", item["id"], 10, 8)
+                logger.info(
+                    "Orden #%s completada: total %s, %s items",
+                    order_id, "21.40", len(items),
+                )
+        return time.perf_counter() - start
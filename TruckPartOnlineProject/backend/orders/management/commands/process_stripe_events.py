@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.stripe_events import process_pending_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de eventos de Stripe: procesa los eventos guardados "
+        "por el webhook, con reintentos y orden por PaymentIntent"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Vacía la cola una vez y termina (útil en cron)",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Segundos de espera cuando la cola está vacía",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_events()
+
+            if processed:
+                self.stdout.write(f"{processed} evento(s) procesado(s)")
+
+            if options["once"]:
+                break
+
+            if not processed:
+                time.sleep(options["sleep"])
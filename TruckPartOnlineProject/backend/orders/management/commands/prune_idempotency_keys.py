@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from orders.idempotency import prune_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Borra las Idempotency-Key vencidas (IDEMPOTENCY_KEY_TTL_HOURS) por lotes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        deleted = prune_expired_keys(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"✅ {deleted} key(s) vencidas borradas"))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.payment_intents import recover_payment_intents
+
+
+class Command(BaseCommand):
+    help = (
+        "Sweep de órdenes con tarjeta que quedaron sin PaymentIntent (el proceso "
+        "cayó después de crear la orden): lo vuelve a pedir con la misma "
+        "idempotency key. Solo reintenta errores transitorios de Stripe"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Revisa una vez y termina (útil en cron)",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=60.0,
+            help="Segundos entre revisiones",
+        )
+        parser.add_argument("--limit", type=int, default=100, help="Órdenes por revisión")
+
+    def handle(self, *args, **options):
+        while True:
+            recovered, errors, expired, failed = recover_payment_intents(limit=options["limit"])
+
+            if recovered or errors or expired or failed:
+                self.stdout.write(
+                    f"{recovered} recuperada(s), {errors} con error transitorio, "
+                    f"{expired} expirada(s), {failed} fallida(s)"
+                )
+
+            if options["once"]:
+                break
+
+            time.sleep(options["sleep"])
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.models import StripeEvent
+from orders.stripe_events import replay_events
+
+
+class Command(BaseCommand):
+    help = "Vuelve a encolar eventos de Stripe para que el worker los procese de nuevo"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "event_ids",
+            nargs="*",
+            help="IDs de eventos de Stripe (evt_...)",
+        )
+        parser.add_argument(
+            "--failed",
+            action="store_true",
+            help="Re-encola todos los eventos en estado failed",
+        )
+
+    def handle(self, *args, **options):
+        if not options["event_ids"] and not options["failed"]:
+            raise CommandError("Indica event_ids o --failed")
+
+        events = StripeEvent.objects.all()
+        if options["event_ids"]:
+            events = events.filter(event_id__in=options["event_ids"])
+        if options["failed"]:
+            events = events.filter(status="failed")
+
+        count = replay_events(events)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ {count} evento(s) re-encolado(s)")
+        )
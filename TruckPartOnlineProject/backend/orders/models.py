@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import User
 from products.models import Product
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 from decimal import Decimal, ROUND_HALF_UP
 
 
@@ -73,8 +75,27 @@ class Order(models.Model):
     stripe_payment_intent = models.CharField(max_length=255, null=True, blank=True)
     stripe_client_secret = models.CharField(max_length=255, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # my_orders: filter(user=...).order_by("-created_at")
+            models.Index(fields=["user", "-created_at"], name="order_user_created_idx"),
+            # admin_orders_list: filtros por status/payment_status ordenados por fecha
+            models.Index(
+                fields=["status", "payment_status", "-created_at"],
+                name="order_status_created_idx",
+            ),
+            models.Index(fields=["-created_at"], name="order_created_idx"),
+            # Webhook charge.refunded busca la orden por PaymentIntent
+            models.Index(
+                fields=["stripe_payment_intent"],
+                name="order_stripe_intent_idx",
+                condition=models.Q(stripe_payment_intent__isnull=False),
+            ),
+        ]
+
     def is_guest(self):
-        return self.user is None
+        # user_id evita cargar el usuario solo para saber si existe
+        return self.user_id is None
 
     def __str__(self):
         return f"Order #{self.id}"
@@ -109,13 +130,91 @@ class OrderItem(models.Model):
 
 class StripeEvent(models.Model):
     """
-    Modelo simple para idempotencia de webhooks de Stripe
+    Cola durable de eventos de Stripe.
+
+    El webhook solo verifica la firma, guarda el evento aquí y responde 200;
+    el worker (manage.py process_stripe_events) lo procesa después.
+    event_id único también sirve de idempotencia ante reenvíos de Stripe.
     """
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("processed", "Processed"),
+        ("failed", "Failed"),
+    )
+
     event_id = models.CharField(max_length=255, unique=True, db_index=True)
+    type = models.CharField(max_length=100, blank=True, default="")
+    payload = models.JSONField(null=True, blank=True)
+
+    # PaymentIntent del evento: serializa el procesamiento por orden
+    order_key = models.CharField(max_length=255, null=True, blank=True)
+    # Campo "created" de Stripe (epoch), define el orden de procesamiento
+    stripe_created = models.BigIntegerField(default=0)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    result = models.CharField(max_length=100, blank=True, default="")
+    last_error = models.TextField(blank=True, default="")
+
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Reclamo de eventos por el worker
+            models.Index(
+                fields=["status", "available_at"],
+                name="stripeevent_queue_idx",
+            ),
+            models.Index(
+                fields=["order_key", "stripe_created"],
+                name="stripeevent_order_idx",
+            ),
+        ]
     
     def __str__(self):
-        return self.event_id
\ No newline at end of file
+        return self.event_id
+
+
+class IdempotencyKey(models.Model):
+    """
+    Respuesta guardada de un POST con header Idempotency-Key (checkout, pay_order).
+
+    Un reintento con la misma key recibe la respuesta guardada en vez de
+    repetir el request; mientras el primero sigue en curso (processing) los
+    duplicados esperan su resultado (orders/idempotency.py).
+    """
+    STATUS_CHOICES = (
+        ("processing", "Processing"),
+        ("completed", "Completed"),
+    )
+
+    key = models.CharField(max_length=255)
+    # Método, ruta y usuario: la misma key en otro endpoint es otro request
+    scope = models.CharField(max_length=255)
+    # sha256 del cuerpo: una key reutilizada con otro cuerpo se rechaza
+    fingerprint = models.CharField(max_length=64)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="processing")
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+
+    locked_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["scope", "key"], name="idempotency_scope_key_uniq"),
+        ]
+        indexes = [
+            # Limpieza por lotes (prune_idempotency_keys)
+            models.Index(fields=["expires_at"], name="idempotency_expires_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
@@ -0,0 +1,111 @@
+# orders/payment_intents.py
+"""
+PaymentIntent de Stripe para órdenes con tarjeta, fuera de la transacción de checkout.
+
+checkout crea la orden en una transacción corta (la que toma los locks de
+stock) y recién después, sin locks, pide el PaymentIntent con una idempotency
+key derivada del id de la orden; el intent se guarda con un UPDATE corto.
+Si el proceso cae entre las fases, la orden queda pendiente sin intent y
+recover_payment_intents (manage.py recover_payment_intents) lo vuelve a pedir
+con la misma key: Stripe devuelve el mismo intent, nunca uno duplicado. Si
+Stripe responde con error, checkout se lo devuelve al cliente (400 si es del
+pago, 502 si no) y cierra la orden; el carrito sigue para reintentar.
+"""
+import logging
+from datetime import timedelta
+
+import stripe
+from django.utils import timezone
+
+from .models import Order
+
+logger = logging.getLogger(__name__)
+
+# Un checkout en curso termina mucho antes (timeout de Stripe: 80 s): pasado
+# esto la orden sin intent se considera abandonada entre las fases
+RECOVER_AFTER = timedelta(minutes=5)
+# Stripe guarda las idempotency keys 24 h; una orden sin intent después de
+# esto ya no se reintenta y pasa a failed
+EXPIRE_AFTER = timedelta(hours=24)
+
+
+# Fallas de red o de Stripe: reintentar con la misma key puede funcionar.
+# El resto (CardError, InvalidRequestError, AuthenticationError...) se repite igual.
+TRANSIENT_ERRORS = (stripe.APIConnectionError, stripe.RateLimitError, stripe.APIError)
+# Errores del pago o de los datos del request: los corrige el cliente
+CLIENT_ERRORS = (stripe.CardError, stripe.InvalidRequestError)
+
+
+def payment_error_status(error):
+    """
+    Status HTTP para un error de Stripe en checkout: 400 si es del pago o del
+    request, 502 si no (transitorio o de configuración: el cliente no puede corregirlo).
+    """
+    if isinstance(error, CLIENT_ERRORS):
+        return 400
+    return 502
+
+
+def idempotency_key(order):
+    return f"tpop-order-{order.id}-payment-intent"
+
+
+def create_payment_intent(order):
+    """
+    Crea (o recupera, si ya se pidió con la misma key) el PaymentIntent de la
+    orden y lo guarda. Lanza stripe.StripeError.
+    """
+    intent = stripe.PaymentIntent.create(
+        amount=int(order.total * 100),
+        currency="usd",
+        metadata={"order_id": order.id},
+        automatic_payment_methods={"enabled": True},
+        idempotency_key=idempotency_key(order),
+    )
+    Order.objects.filter(pk=order.pk).update(
+        stripe_payment_intent=intent.id,
+        stripe_client_secret=intent.client_secret,
+    )
+    order.stripe_payment_intent = intent.id
+    order.stripe_client_secret = intent.client_secret
+    return intent
+
+
+def orders_without_intent():
+    return Order.objects.filter(
+        payment_method="card",
+        status="pending",
+        payment_status="pending",
+        stripe_payment_intent__isnull=True,
+    )
+
+
+def recover_payment_intents(limit=100):
+    """
+    Pide el PaymentIntent de las órdenes con tarjeta que quedaron sin él y
+    marca como failed las que ya expiraron o cuyo error no es transitorio
+    (reintentar devolvería lo mismo). Retorna (recuperadas, con error
+    transitorio, expiradas, fallidas).
+    """
+    now = timezone.now()
+    expired = orders_without_intent().filter(created_at__lt=now - EXPIRE_AFTER).update(
+        status="failed", payment_status="failed"
+    )
+
+    recovered = errors = failed = 0
+    for order in orders_without_intent().filter(created_at__lt=now - RECOVER_AFTER).order_by("id")[:limit]:
+        try:
+            create_payment_intent(order)
+        except TRANSIENT_ERRORS as e:
+            # Se reintenta en la próxima pasada, hasta EXPIRE_AFTER
+            errors += 1
+            logger.warning("No se pudo crear el PaymentIntent de la orden %s: %s", order.id, e)
+        except stripe.StripeError as e:
+            failed += 1
+            orders_without_intent().filter(pk=order.pk).update(status="failed", payment_status="failed")
+            logger.error("PaymentIntent rechazado para la orden %s; se marca failed: %s", order.id, e)
+        else:
+            recovered += 1
+            logger.info("PaymentIntent recuperado para la orden %s", order.id)
+
+    return recovered, errors, expired, failed
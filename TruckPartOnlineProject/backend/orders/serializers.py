@@ -1,6 +1,7 @@
 # orders/serializers.py
 from .models import Order, OrderItem
 from rest_framework import serializers
+from django.db.models import Count, Prefetch
 from products.models import Product
 from products.serializers import ProductSerializer  # Si tienes un serializer de producto
 
@@ -31,7 +32,56 @@ class OrderItemSerializer(serializers.ModelSerializer):
         return float(obj.price * obj.quantity)
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """
+    Permite limitar los campos de un serializer: Serializer(obj, fields=["id", "status"]).
+    Los campos no pedidos ni se serializan ni se calculan.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+class OrderListMixin(SparseFieldsetMixin):
+    """
+    Comportamiento común de los serializers de listados de órdenes:
+    sparse fieldsets y construcción del queryset según los campos pedidos.
+    """
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        """
+        Carga en bloque solo lo que los campos pedidos necesitan, para que listar
+        N órdenes cueste un número constante de queries y las relaciones no
+        pedidas nunca se unan ni se prefetcheen:
+        user_email -> select_related, items -> prefetch (con product),
+        items_count -> annotate.
+        """
+        fields = set(cls.Meta.fields if fields is None else fields)
+
+        if "user_email" in fields:
+            queryset = queryset.select_related("user")
+        if "items" in fields:
+            queryset = queryset.prefetch_related(
+                Prefetch("items", queryset=OrderItem.objects.select_related("product"))
+            )
+        if "items_count" in fields:
+            queryset = queryset.annotate(items_count=Count("items"))
+
+        return queryset
+
+    def get_items_count(self, obj):
+        # Usa la anotación de setup_eager_loading si existe
+        if hasattr(obj, "items_count"):
+            return obj.items_count
+        return len(obj.items.all())
+
+
+class OrderSerializer(OrderListMixin, serializers.ModelSerializer):
     """
     Serializer principal para órdenes con información detallada
     """
@@ -94,14 +144,50 @@ class OrderSerializer(serializers.ModelSerializer):
             'qb_invoice_id', 'qb_sales_receipt_id', 'stripe_payment_intent',
             'stripe_client_secret', 'created_at'
         ]
-    
-    def get_items_count(self, obj):
-        return obj.items.count()
-    
+
     def get_created_at_formatted(self, obj):
         return obj.created_at.strftime("%Y-%m-%d %H:%M:%S")
 
 
+class OrderSummarySerializer(OrderListMixin, serializers.ModelSerializer):
+    """
+    Representación compacta para listados: sin items, direcciones
+    ni datos de Stripe/QuickBooks.
+    """
+    user_email = serializers.EmailField(source='user.email', read_only=True)
+    items_count = serializers.SerializerMethodField()
+
+    subtotal = serializers.ReadOnlyField()
+    tax = serializers.ReadOnlyField()
+    total = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Order
+        fields = [
+            "id",
+            "full_name",
+            "guest_email",
+            "user_email",
+            "status",
+            "payment_method",
+            "payment_status",
+            "subtotal",
+            "tax",
+            "total",
+            "items_count",
+            "created_at",
+        ]
+
+
+def reject_duplicate_products(items):
+    """
+    Cada producto va una sola vez en checkout y en la cotización.
+    """
+    product_ids = [str(item['product_id']).strip() for item in items]
+    if len(set(product_ids)) != len(product_ids):
+        raise serializers.ValidationError("Cada producto debe aparecer una sola vez")
+
+
 class OrderCreateSerializer(serializers.Serializer):
     """
     Serializer para crear una nueva orden (checkout)
@@ -109,8 +195,10 @@ class OrderCreateSerializer(serializers.Serializer):
     items = serializers.ListField(
         child=serializers.DictField(),
         write_only=True,
-        required=True
+        required=False
     )
+    # Alternativa a items: carrito del servidor ya validado (TPOP)
+    cart_id = serializers.IntegerField(required=False)
     full_name = serializers.CharField(max_length=255, required=True)
     guest_email = serializers.EmailField(required=False, allow_null=True)
     phone = serializers.CharField(max_length=20, required=False, allow_blank=True)
@@ -145,7 +233,8 @@ class OrderCreateSerializer(serializers.Serializer):
                     raise serializers.ValidationError("La cantidad debe ser mayor a 0")
             except (TypeError, ValueError):
                 raise serializers.ValidationError("'quantity' debe ser un número entero")
-        
+
+        reject_duplicate_products(value)
         return value
     
     def validate_payment_method(self, value):
@@ -160,6 +249,11 @@ class OrderCreateSerializer(serializers.Serializer):
         """
         Validaciones cruzadas
         """
+        if not data.get('items') and not data.get('cart_id'):
+            raise serializers.ValidationError({
+                'items': "Se requiere al menos un producto o un cart_id"
+            })
+
         # Si no hay usuario autenticado, guest_email es requerido
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
@@ -171,6 +265,40 @@ class OrderCreateSerializer(serializers.Serializer):
         return data
 
 
+class OrderQuoteSerializer(serializers.Serializer):
+    """
+    Items a cotizar (mismo formato que checkout). Se normalizan a enteros.
+    """
+    items = serializers.ListField(
+        child=serializers.DictField(),
+        max_length=200,
+        required=True
+    )
+
+    def validate_items(self, value):
+        if not value:
+            raise serializers.ValidationError("Se requiere al menos un producto")
+
+        items = []
+        for item in value:
+            if 'product_id' not in item:
+                raise serializers.ValidationError("Cada item debe tener 'product_id'")
+            if 'quantity' not in item:
+                raise serializers.ValidationError("Cada item debe tener 'quantity'")
+            try:
+                product_id = int(item['product_id'])
+                quantity = int(item['quantity'])
+            except (TypeError, ValueError):
+                raise serializers.ValidationError("'product_id' y 'quantity' deben ser números enteros")
+            if quantity <= 0:
+                raise serializers.ValidationError("La cantidad debe ser mayor a 0")
+            items.append({"product_id": product_id, "quantity": quantity})
+
+        # Igual que checkout: un producto repetido no se suma, se rechaza
+        reject_duplicate_products(items)
+        return items
+
+
 class OrderUpdateSerializer(serializers.ModelSerializer):
     """
     Serializer para actualizar órdenes (admin)
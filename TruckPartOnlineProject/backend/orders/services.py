@@ -1,10 +1,127 @@
 
 # orders/services.py
 
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
 from products.models import Product
 from inventory.models import Inventory
 from django.db import transaction
 
+TAX_RATE = Decimal('0.07')
+CENT = Decimal('0.01')
+
+
+def line_amounts(price, quantity):
+    """
+    Subtotal e impuesto de una línea, redondeados al centavo como en checkout
+    (el impuesto se calcula por línea, no sobre el total).
+    """
+    subtotal = (price * quantity).quantize(CENT, rounding=ROUND_HALF_UP)
+    tax = (subtotal * TAX_RATE).quantize(CENT, rounding=ROUND_HALF_UP)
+    return subtotal, tax
+
+
+# Avisos que no impiden pagar (el cliente ya ve el precio nuevo)
+INFORMATIVE_WARNINGS = {"price_changed"}
+
+
+def available_quantity(product):
+    try:
+        return product.inventory.quantity
+    except Inventory.DoesNotExist:
+        return 0
+
+
+def price_lines(lines):
+    """
+    Precios actuales, totales (mismo redondeo que checkout) y avisos de stock.
+    lines: objetos con product (con inventory ya cargado), quantity y
+    price_at_time (None si no hay precio anterior). No hace queries.
+    """
+    items, warnings = [], []
+    subtotal = tax = Decimal("0.00")
+
+    for line in lines:
+        product = line.product
+        available = available_quantity(product)
+        line_subtotal, line_tax = line_amounts(product.price, line.quantity)
+        subtotal += line_subtotal
+        tax += line_tax
+
+        items.append({
+            "product_id": product.id,
+            "name": product.name,
+            "sku": product.sku,
+            "quantity": line.quantity,
+            "unit_price": str(product.price),
+            "subtotal": str(line_subtotal),
+            "tax": str(line_tax),
+            "total": str(line_subtotal + line_tax),
+            "available": available,
+        })
+
+        if not product.is_active:
+            warnings.append({
+                "product_id": product.id,
+                "code": "inactive",
+                "message": f"{product.name} ya no está disponible",
+            })
+        elif line.quantity > available:
+            warnings.append({
+                "product_id": product.id,
+                "code": "insufficient_stock",
+                "message": f"Stock insuficiente para {product.name}. Disponible: {available}",
+                "available": available,
+            })
+        if line.price_at_time is not None and line.price_at_time != product.price:
+            warnings.append({
+                "product_id": product.id,
+                "code": "price_changed",
+                "message": f"El precio de {product.name} cambió",
+                "previous_price": str(line.price_at_time),
+            })
+
+    return {
+        "items": items,
+        "subtotal": str(subtotal),
+        "tax": str(tax),
+        "total": str((subtotal + tax).quantize(CENT, rounding=ROUND_HALF_UP)),
+        "warnings": warnings,
+        "can_checkout": bool(items) and all(w["code"] in INFORMATIVE_WARNINGS for w in warnings),
+    }
+
+
+# Línea para price_lines sin carrito (no hay precio anterior)
+QuoteLine = namedtuple("QuoteLine", ["product", "quantity", "price_at_time"])
+
+
+def quote_order(items):
+    """
+    Cotiza items de checkout sin crear la orden: una sola lectura de productos
+    con su inventario, sin locks ni escrituras. Los items ya vienen sin
+    productos repetidos (OrderQuoteSerializer), igual que en checkout.
+    """
+    quantities = {item["product_id"]: item["quantity"] for item in items}
+
+    products = Product.objects.select_related("inventory").in_bulk(list(quantities))
+    quote = price_lines([
+        QuoteLine(products[product_id], quantity, None)
+        for product_id, quantity in quantities.items()
+        if product_id in products
+    ])
+
+    for product_id in quantities:
+        if product_id not in products:
+            quote["warnings"].append({
+                "product_id": product_id,
+                "code": "not_found",
+                "message": f"El producto con ID {product_id} no existe.",
+            })
+            quote["can_checkout"] = False
+    return quote
+
+
 def validate_order_stock(items):
     """
     Verifica si hay suficiente cantidad en el modelo Inventory para cada producto del pedido.
@@ -0,0 +1,384 @@
+# orders/stripe_events.py
+"""
+Cola durable de eventos de Stripe.
+
+El webhook (views.stripe_webhook) solo verifica la firma y llama a enqueue_event;
+el worker (manage.py process_stripe_events) reclama los eventos pendientes y los
+procesa con reintentos. Los eventos de una misma orden se procesan en el orden
+de Stripe: no se reclama un evento mientras haya uno anterior pendiente para
+el mismo PaymentIntent, y los handlers bloquean la orden con select_for_update.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from backend.log import correlation_id
+from inventory.models import Inventory
+from inventory.services.inventory import move_inventory
+from inventory.services.snapshots import LEDGERS
+from qb.services import create_sales_receipt
+from reports.services import record_order_refund, record_order_sale
+from .models import Order, StripeEvent
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 8
+# Un evento en "processing" más tiempo que esto se considera abandonado (worker caído)
+STALE_AFTER = timedelta(minutes=10)
+
+
+class NonRetryableEventError(Exception):
+    """
+    El evento es inválido para la orden (monto, moneda...): reintentar no cambia nada.
+    """
+
+
+def _order_key(event):
+    obj = event.get("data", {}).get("object", {})
+    if event.get("type", "").startswith("payment_intent."):
+        return obj.get("id")
+    return obj.get("payment_intent")
+
+
+def enqueue_event(event):
+    """
+    Guarda el evento verificado. Retorna (stripe_event, created);
+    created=False si Stripe lo reenvió y ya lo teníamos.
+    """
+    try:
+        return StripeEvent.objects.get_or_create(
+            event_id=event["id"],
+            defaults={
+                "type": event.get("type", ""),
+                "payload": event,
+                "order_key": _order_key(event),
+                "stripe_created": event.get("created") or 0,
+            },
+        )
+    except IntegrityError:
+        # Dos entregas simultáneas del mismo evento
+        return StripeEvent.objects.get(event_id=event["id"]), False
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(30 * 2 ** (attempts - 1), 3600))
+
+
+def requeue_stale_events():
+    """
+    Devuelve a la cola los eventos que quedaron en "processing" por un worker caído.
+    """
+    return StripeEvent.objects.filter(
+        status="processing",
+        locked_at__lt=timezone.now() - STALE_AFTER,
+    ).update(status="pending", locked_at=None)
+
+
+def claim_next_event():
+    """
+    Reclama el siguiente evento listo para procesar, o None si no hay.
+    """
+    earlier_for_same_order = StripeEvent.objects.filter(
+        order_key=OuterRef("order_key"),
+        status__in=["pending", "processing"],
+        stripe_created__lt=OuterRef("stripe_created"),
+    )
+
+    with transaction.atomic():
+        event = (
+            StripeEvent.objects.select_for_update(skip_locked=True)
+            .filter(status="pending", available_at__lte=timezone.now())
+            .filter(~Exists(earlier_for_same_order))
+            .order_by("stripe_created", "id")
+            .first()
+        )
+        if event is None:
+            return None
+
+        event.status = "processing"
+        event.attempts += 1
+        event.locked_at = timezone.now()
+        event.save(update_fields=["status", "attempts", "locked_at"])
+
+    return event
+
+
+def process_event(stripe_event):
+    """
+    Procesa un evento reclamado y registra el resultado (processed, reintento o failed).
+    """
+    with correlation_id(stripe_event.event_id):
+        try:
+            result = handle_event(stripe_event.payload)
+        except NonRetryableEventError as e:
+            logger.error("Evento %s rechazado: %s", stripe_event.type, e)
+            stripe_event.status = "failed"
+            stripe_event.result = "rejected"
+            stripe_event.last_error = str(e)
+        except Exception:
+            logger.exception(
+                "Error procesando %s (intento %s/%s)",
+                stripe_event.type, stripe_event.attempts, MAX_ATTEMPTS,
+            )
+            stripe_event.last_error = traceback.format_exc()
+            if stripe_event.attempts >= MAX_ATTEMPTS:
+                stripe_event.status = "failed"
+            else:
+                stripe_event.status = "pending"
+                stripe_event.available_at = timezone.now() + backoff(stripe_event.attempts)
+        else:
+            logger.info("Evento %s procesado: %s", stripe_event.type, result)
+            stripe_event.status = "processed"
+            stripe_event.result = result
+            stripe_event.last_error = ""
+            stripe_event.processed_at = timezone.now()
+
+    stripe_event.locked_at = None
+    stripe_event.save(update_fields=[
+        "status", "result", "last_error", "available_at", "processed_at", "locked_at",
+    ])
+    return stripe_event
+
+
+def process_pending_events(limit=None):
+    """
+    Procesa eventos hasta vaciar la cola (o hasta `limit`). Retorna cuántos procesó.
+    """
+    requeue_stale_events()
+
+    processed = 0
+    while limit is None or processed < limit:
+        stripe_event = claim_next_event()
+        if stripe_event is None:
+            break
+        process_event(stripe_event)
+        processed += 1
+    return processed
+
+
+def replay_events(queryset):
+    """
+    Vuelve a encolar eventos (ej. fallidos) para que el worker los procese de nuevo.
+    """
+    return queryset.update(
+        status="pending",
+        attempts=0,
+        available_at=timezone.now(),
+        locked_at=None,
+        last_error="",
+    )
+
+
+###############################handlers por tipo de evento#################################################################
+
+
+def handle_event(event):
+    event_type = event.get("type")
+
+    if event_type == "payment_intent.succeeded":
+        return handle_payment_intent_succeeded(event)
+    if event_type == "payment_intent.payment_failed":
+        return handle_payment_intent_failed(event)
+    if event_type == "charge.refunded":
+        return handle_charge_refunded(event)
+
+    logger.debug("Evento no manejado: %s", event_type)
+    return "unhandled"
+
+
+def _inventory_already_deducted(order, intent_id):
+    """
+    Busca los movimientos de la orden por sus references exactas (COD, este
+    webhook y el reembolso), en el ledger vivo y en el archivado: usa los
+    índices de reference y "Orden #1" no coincide con "Orden #12".
+    """
+    prefix = f"Orden #{order.id}"
+    intents = {intent_id, order.stripe_payment_intent} - {None, ""}
+    references = [prefix, f"{prefix} - Refund", *(f"{prefix} - PaymentIntent {pi}" for pi in intents)]
+    return any(model.objects.filter(reference__in=references).exists() for model in LEDGERS)
+
+
+def handle_payment_intent_succeeded(event):
+    intent = event["data"]["object"]
+    metadata = intent.get("metadata", {})
+    order_id = metadata.get("order_id")
+
+    if not order_id:
+        return "ignored"
+
+    with transaction.atomic():
+        try:
+            order = Order.objects.select_for_update().get(id=order_id)
+        except Order.DoesNotExist:
+            return "ignored"
+
+        # 🔴 VALIDACIÓN 1: Solo tarjeta
+        if order.payment_method != "card":
+            return "ignored"
+
+        # 🔴 VALIDACIÓN 2: No procesar si ya está pagada
+        if order.payment_status == "paid":
+            return "already_processed"
+
+        # 🔴 VALIDACIÓN 3: Verificar si ya tiene inventario descontado
+        if _inventory_already_deducted(order, intent.get("id")):
+            logger.warning(
+                "Orden #%s ya tiene movimientos de inventario; se omite el descuento",
+                order.id,
+            )
+
+            # Solo actualizar estado si es necesario
+            if order.status != "completed":
+                order.status = "completed"
+                order.payment_status = "paid"
+                order.stripe_payment_intent = intent.get("id")
+                order.save()
+                record_order_sale(order)
+                logger.info("Orden #%s actualizada a completed", order.id)
+
+            return "inventory_already_deducted"
+
+        # 💰 Validar monto
+        stripe_amount = intent.get("amount")
+        expected_amount = int(order.total * 100)
+
+        if stripe_amount != expected_amount:
+            raise NonRetryableEventError(
+                f"amount_mismatch: Stripe {stripe_amount}, orden {expected_amount}"
+            )
+
+        # 💱 Validar moneda
+        if intent.get("currency") != "usd":
+            raise NonRetryableEventError(f"currency_error: {intent.get('currency')}")
+
+        # 📋 Obtener items de la orden
+        items_list = list(order.items.select_related("product"))
+
+        # 📦 DESCONTAR INVENTARIO
+        for item in items_list:
+            # Verificar stock actual antes de descontar
+            inventory = Inventory.objects.select_for_update().get(product=item.product)
+            stock_before = inventory.quantity
+
+            if stock_before < item.quantity:
+                logger.warning(
+                    "Stock insuficiente para producto %s: disponible %s, solicitado %s",
+                    item.product_id, stock_before, item.quantity,
+                )
+                raise ValidationError(f"Stock insuficiente para {item.product.name}")
+
+            new_quantity = move_inventory(
+                product=item.product,
+                quantity_change=-item.quantity,
+                reason="Venta Stripe",
+                reference=f"Orden #{order.id} - PaymentIntent {intent.get('id')}"
+            )
+            logger.debug(
+                "Producto %s: stock %s -> %s", item.product_id, stock_before, new_quantity
+            )
+
+            # Verificar que se descontó la cantidad correcta
+            if (stock_before - new_quantity) != item.quantity:
+                logger.warning(
+                    "Producto %s: se descontaron %s pero deberían ser %s",
+                    item.product_id, stock_before - new_quantity, item.quantity,
+                )
+
+        # 🧾 Integración con QuickBooks
+        try:
+            receipt_id = create_sales_receipt(order)
+        except Exception:
+            logger.exception("Error en QuickBooks para orden #%s", order.id)
+            receipt_id = None
+            # Si QuickBooks es crítico, descomenta la siguiente línea:
+            # raise e
+
+        # 🧾 Actualizar orden
+        order.qb_sales_receipt_id = receipt_id
+        order.status = "completed"
+        order.payment_status = "paid"
+        order.stripe_payment_intent = intent.get("id")
+        order.save()
+
+        # 📈 Sumar la venta a los rollups de reportes
+        record_order_sale(order)
+
+        logger.info(
+            "Orden #%s completada: total %s, %s items, sales receipt %s",
+            order.id, order.total, len(items_list), receipt_id,
+        )
+
+    return "ok"
+
+
+def handle_payment_intent_failed(event):
+    intent = event["data"]["object"]
+    metadata = intent.get("metadata", {})
+    order_id = metadata.get("order_id")
+
+    logger.info(
+        "Pago fallido para orden %s: %s",
+        order_id, (intent.get("last_payment_error") or {}).get("message", "Unknown error"),
+    )
+
+    if not order_id:
+        return "ignored"
+
+    try:
+        with transaction.atomic():
+            order = Order.objects.select_for_update().get(id=order_id)
+
+            if order.payment_status != "paid":
+                order.status = "failed"
+                order.payment_status = "failed"
+                order.save()
+            else:
+                logger.warning("Orden #%s ya estaba pagada, no se modifica", order.id)
+    except Order.DoesNotExist:
+        logger.warning("Orden #%s no encontrada", order_id)
+        return "ignored"
+
+    return "ok"
+
+
+def handle_charge_refunded(event):
+    charge = event["data"]["object"]
+    payment_intent_id = charge.get("payment_intent")
+
+    logger.info(
+        "Reembolso de %s centavos para PaymentIntent %s",
+        charge.get("amount_refunded", 0), payment_intent_id,
+    )
+
+    try:
+        with transaction.atomic():
+            order = Order.objects.select_for_update().get(
+                stripe_payment_intent=payment_intent_id
+            )
+            if order.payment_status != "refunded":
+                # Reponer inventario
+                for item in order.items.select_related("product"):
+                    move_inventory(
+                        product=item.product,
+                        quantity_change=item.quantity,
+                        reason="Reembolso Stripe",
+                        reference=f"Orden #{order.id} - Refund"
+                    )
+
+                order.status = "refunded"
+                order.payment_status = "refunded"
+                order.save()
+                record_order_refund(order)
+                logger.info("Orden #%s marcada como reembolsada", order.id)
+            else:
+                logger.warning("Orden #%s ya estaba reembolsada", order.id)
+    except Order.DoesNotExist:
+        logger.warning("Orden con payment_intent %s no encontrada", payment_intent_id)
+        return "ignored"
+
+    return "ok"
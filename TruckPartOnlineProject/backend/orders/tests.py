@@ -1,3 +1,584 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import patch
 
-# Create your tests here.
+import stripe
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend.log import get_request_id
+from inventory.models import Inventory, InventoryMovement
+from inventory.services.inventory import move_inventory
+from inventory.services.snapshots import compact_ledger
+from products.models import Product
+from orders.idempotency import prune_expired_keys
+from orders.models import IdempotencyKey, Order, OrderItem, StripeEvent
+from orders.payment_intents import EXPIRE_AFTER, RECOVER_AFTER, recover_payment_intents
+from orders import views as orders_views
+from orders.stripe_events import handle_event, process_pending_events
+
+User = get_user_model()
+
+
+class OrderListTestCase(TestCase):
+    """
+    Datos comunes: un cliente con órdenes de 3 items y un admin.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="fleet",
+            email="fleet@example.com",
+            password="password",
+            is_active=True,
+        )
+        self.admin = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="password",
+            is_active=True,
+            is_staff=True,
+        )
+        self.products = [
+            Product.objects.create(name=f"Filtro {i}", price=Decimal("10.00"), sku=f"SKU-{i}")
+            for i in range(3)
+        ]
+
+    def create_orders(self, count):
+        for _ in range(count):
+            order = Order.objects.create(
+                user=self.user,
+                full_name="Fleet Customer",
+                subtotal=Decimal("30.00"),
+                tax=Decimal("2.10"),
+            )
+            for product in self.products:
+                OrderItem.objects.create(
+                    order=order,
+                    product=product,
+                    quantity=1,
+                    price=product.price,
+                )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+
+class OrderListQueryCountTest(OrderListTestCase):
+    """
+    my_orders y admin_orders_list deben costar un número constante de queries,
+    sin importar cuántas órdenes o items haya en la página.
+    """
+
+    def test_my_orders_constant_queries(self):
+        self.client.force_authenticate(self.user)
+
+        self.create_orders(2)
+        few, data = self.count_queries("/api/my-orders/")
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["results"][0]["items_count"], 3)
+        self.assertEqual(data["results"][0]["user_email"], "fleet@example.com")
+        self.assertEqual(len(data["results"][0]["items"]), 3)
+
+        self.create_orders(10)
+        many, data = self.count_queries("/api/my-orders/")
+        self.assertEqual(data["count"], 12)
+        self.assertEqual(few, many)
+
+    def test_my_orders_is_paginated(self):
+        self.client.force_authenticate(self.user)
+        self.create_orders(30)
+
+        response = self.client.get("/api/my-orders/", {"page_size": 10})
+        data = response.json()
+        self.assertEqual(data["count"], 30)
+        self.assertEqual(len(data["results"]), 10)
+        self.assertIsNotNone(data["next"])
+
+    def test_admin_orders_list_constant_queries(self):
+        self.client.force_authenticate(self.admin)
+
+        self.create_orders(2)
+        few, data = self.count_queries("/api/admin/orders/")
+        self.assertEqual(data["count"], 2)
+
+        self.create_orders(10)
+        many, data = self.count_queries("/api/admin/orders/")
+        self.assertEqual(data["count"], 12)
+        self.assertEqual(few, many)
+
+
+class OrderListSparseFieldsetTest(OrderListTestCase):
+    """
+    Representación summary/detail y ?fields= en los listados de órdenes.
+    """
+
+    def test_admin_orders_list_defaults_to_summary(self):
+        self.client.force_authenticate(self.admin)
+        self.create_orders(1)
+
+        _, data = self.count_queries("/api/admin/orders/")
+        row = data["results"][0]
+        self.assertEqual(row["items_count"], 3)
+        self.assertNotIn("items", row)
+        self.assertNotIn("stripe_client_secret", row)
+        self.assertNotIn("qb_invoice_id", row)
+
+    def test_admin_orders_list_detail_view(self):
+        self.client.force_authenticate(self.admin)
+        self.create_orders(1)
+
+        _, data = self.count_queries("/api/admin/orders/?view=detail")
+        self.assertEqual(len(data["results"][0]["items"]), 3)
+
+    def test_fields_skip_unrequested_relations(self):
+        self.client.force_authenticate(self.user)
+        self.create_orders(3)
+
+        sparse, data = self.count_queries("/api/my-orders/?fields=id,status,total")
+        self.assertEqual(set(data["results"][0]), {"id", "status", "total"})
+
+        full, _ = self.count_queries("/api/my-orders/")
+        # Sin items no hay query de prefetch
+        self.assertLess(sparse, full)
+
+    def test_invalid_fields_are_rejected(self):
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.get("/api/admin/orders/", {"fields": "id,items"})
+        self.assertEqual(response.status_code, 400)
+
+
+class StripeEventTestCase(TestCase):
+    """
+    Datos comunes: una orden con tarjeta de 2 unidades y stock 5.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Filtro", price=Decimal("10.00"), sku="SKU-Q")
+        move_inventory(product=self.product, quantity_change=5, reason="Stock inicial")
+        self.order = Order.objects.create(
+            full_name="Cliente",
+            payment_method="card",
+            subtotal=Decimal("20.00"),
+            tax=Decimal("1.40"),
+        )
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=2, price=Decimal("10.00"))
+
+    def event(self, event_id, event_type="payment_intent.succeeded", created=1, **intent):
+        obj = {
+            "id": "pi_123",
+            "amount": int(self.order.total * 100),
+            "currency": "usd",
+            "metadata": {"order_id": str(self.order.id)},
+        }
+        obj.update(intent)
+        return {"id": event_id, "type": event_type, "created": created, "data": {"object": obj}}
+
+    def post(self, event):
+        with patch("orders.views.stripe.Webhook.construct_event", return_value=event):
+            return self.client.post(
+                "/api/stripe/webhook/",
+                data=json.dumps(event),
+                content_type="application/json",
+                HTTP_STRIPE_SIGNATURE="t=1,v1=test",
+            )
+
+
+class StripeWebhookQueueTest(StripeEventTestCase):
+    """
+    El webhook solo encola; el worker procesa con reintentos y en orden.
+    """
+
+    def test_webhook_only_enqueues(self):
+        response = self.post(self.event("evt_1"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "queued")
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "pending")
+        self.assertEqual(StripeEvent.objects.get(event_id="evt_1").status, "pending")
+
+        duplicate = self.post(self.event("evt_1"))
+        self.assertEqual(duplicate.json()["status"], "already_received")
+        self.assertEqual(StripeEvent.objects.count(), 1)
+
+    @patch("orders.stripe_events.create_sales_receipt", return_value="QB-1")
+    def test_worker_completes_order(self, _receipt):
+        self.post(self.event("evt_1"))
+
+        self.assertEqual(process_pending_events(), 1)
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "completed")
+        self.assertEqual(self.order.payment_status, "paid")
+        self.assertEqual(Inventory.objects.get(product=self.product).quantity, 3)
+
+        stripe_event = StripeEvent.objects.get(event_id="evt_1")
+        self.assertEqual(stripe_event.status, "processed")
+        self.assertEqual(stripe_event.result, "ok")
+
+    @patch("orders.stripe_events.create_sales_receipt", return_value="QB-1")
+    def test_events_for_same_order_keep_stripe_order(self, _receipt):
+        # El reembolso llega antes que el pago, pero Stripe lo creó después
+        self.post(self.event("evt_refund", "charge.refunded", created=2, payment_intent="pi_123", id="ch_1"))
+        self.post(self.event("evt_paid", created=1))
+
+        process_pending_events()
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "refunded")
+        self.assertEqual(Inventory.objects.get(product=self.product).quantity, 5)
+
+    def test_failures_are_retried_and_rejections_are_final(self):
+        self.post(self.event("evt_1"))
+        with patch("orders.stripe_events.handle_event", side_effect=RuntimeError("db caída")):
+            process_pending_events()
+
+        stripe_event = StripeEvent.objects.get(event_id="evt_1")
+        self.assertEqual(stripe_event.status, "pending")
+        self.assertEqual(stripe_event.attempts, 1)
+        self.assertIn("db caída", stripe_event.last_error)
+        # El reintento espera el backoff: la cola no lo vuelve a tomar aún
+        self.assertEqual(process_pending_events(), 0)
+
+        self.post(self.event("evt_2", amount=1))
+        process_pending_events()
+        self.assertEqual(StripeEvent.objects.get(event_id="evt_2").status, "failed")
+
+    @patch("orders.stripe_events.create_sales_receipt", return_value="QB-1")
+    def test_inventory_check_matches_exact_order_reference(self, _receipt):
+        # La venta de la orden #N2 (ej. #12 para la #1) no cuenta como descuento de la #N
+        other = Order.objects.create(id=int(f"{self.order.id}2"), full_name="Otro", payment_method="cod")
+        move_inventory(product=self.product, quantity_change=-1, reason="Venta COD", reference=f"Orden #{other.id}")
+
+        self.assertEqual(handle_event(self.event("evt_1")), "ok")
+        self.assertEqual(Inventory.objects.get(product=self.product).quantity, 2)
+
+    @patch("orders.stripe_events.create_sales_receipt", return_value="QB-1")
+    def test_replayed_event_sees_archived_movements(self, _receipt):
+        move_inventory(
+            product=self.product, quantity_change=-2, reason="Venta Stripe",
+            reference=f"Orden #{self.order.id} - PaymentIntent pi_123",
+        )
+        compact_ledger(timezone.now() + timedelta(seconds=1))
+        self.assertFalse(InventoryMovement.objects.exists())
+
+        self.assertEqual(handle_event(self.event("evt_late")), "inventory_already_deducted")
+        self.assertEqual(Inventory.objects.get(product=self.product).quantity, 3)
+
+
+class CorrelationIdTest(StripeEventTestCase):
+    """
+    Correlation id de los logs: por request (X-Request-ID) y por evento en el worker.
+    """
+
+    def test_request_id_is_echoed_or_generated(self):
+        response = self.client.get("/api/products/", HTTP_X_REQUEST_ID="req-123")
+        self.assertEqual(response["X-Request-ID"], "req-123")
+
+        generated = self.client.get("/api/products/")["X-Request-ID"]
+        self.assertEqual(len(generated), 32)
+
+    def test_worker_uses_event_id(self):
+        self.post(self.event("evt_log"))
+        seen = []
+        with patch("orders.stripe_events.handle_event", side_effect=lambda event: seen.append(get_request_id()) or "ok"):
+            process_pending_events()
+
+        self.assertEqual(seen, ["evt_log"])
+        self.assertEqual(get_request_id(), "-")
+
+
+class CheckoutQuoteTest(TestCase):
+    """
+    /api/checkout/quote/: mismos montos que checkout, sin escribir nada.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.filter = Product.objects.create(name="Filtro", price=Decimal("10.05"), sku="SKU-QF")
+        self.brake = Product.objects.create(name="Freno", price=Decimal("33.33"), sku="SKU-QB")
+        Inventory.objects.filter(product__in=[self.filter, self.brake]).update(quantity=4)
+
+    def test_quote_matches_checkout_without_writes(self):
+        items = [
+            {"product_id": self.filter.id, "quantity": 3},
+            {"product_id": self.brake.id, "quantity": 1},
+        ]
+        with self.assertNumQueries(1):
+            quote = self.client.post("/api/checkout/quote/", {"items": items}, format="json")
+        self.assertEqual(quote.status_code, 200)
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertEqual([line["total"] for line in quote.data["items"]], ["32.26", "35.66"])
+        self.assertTrue(quote.data["can_checkout"])
+
+        order = self.client.post("/api/checkout/", {
+            "items": items,
+            "full_name": "Invitado",
+            "guest_email": "guest@example.com",
+            "payment_method": "cod",
+        }, format="json")
+        self.assertEqual(order.status_code, 201)
+        self.assertEqual(quote.data["subtotal"], f"{order.data['subtotal']:.2f}")
+        self.assertEqual(quote.data["tax"], f"{order.data['tax']:.2f}")
+        self.assertEqual(quote.data["total"], f"{order.data['total']:.2f}")
+
+    def test_quote_reports_stock_problems(self):
+        response = self.client.post("/api/checkout/quote/", {"items": [
+            {"product_id": self.filter.id, "quantity": 5},
+            {"product_id": 999999, "quantity": 1},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(w["product_id"], w["code"]) for w in response.data["warnings"]],
+            [(self.filter.id, "insufficient_stock"), (999999, "not_found")],
+        )
+        self.assertFalse(response.data["can_checkout"])
+
+        response = self.client.post("/api/checkout/quote/", {"items": [{"product_id": self.filter.id}]}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_duplicate_products_are_rejected_like_checkout(self):
+        items = [
+            {"product_id": self.filter.id, "quantity": 1},
+            {"product_id": self.filter.id, "quantity": 2},
+        ]
+        quote = self.client.post("/api/checkout/quote/", {"items": items}, format="json")
+        order = self.client.post("/api/checkout/", {
+            "items": items,
+            "full_name": "Invitado",
+            "guest_email": "guest@example.com",
+            "payment_method": "cod",
+        }, format="json")
+
+        self.assertEqual((quote.status_code, order.status_code), (400, 400))
+        self.assertEqual(quote.data["items"], order.data["items"])
+        self.assertEqual(Order.objects.count(), 0)
+
+
+class CardCheckoutPhasesTest(TestCase):
+    """
+    El PaymentIntent se pide fuera de la transacción de checkout y se recupera si falla.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Filtro", price=Decimal("10.00"), sku="SKU-PI")
+        Inventory.objects.filter(product=self.product).update(quantity=5)
+
+    def checkout(self):
+        return self.client.post("/api/checkout/", {
+            "items": [{"product_id": self.product.id, "quantity": 2}],
+            "full_name": "Invitado",
+            "guest_email": "guest@example.com",
+            "payment_method": "card",
+        }, format="json")
+
+    def test_intent_created_after_commit_with_order_key(self):
+        # TestCase ya abre sus propias transacciones: se compara contra este nivel
+        depth = len(connection.atomic_blocks)
+        seen = {}
+
+        def create(**kwargs):
+            seen["depth"] = len(connection.atomic_blocks)
+            seen["key"] = kwargs["idempotency_key"]
+            return SimpleNamespace(id="pi_1", client_secret="secret_1")
+
+        with patch("orders.payment_intents.stripe.PaymentIntent.create", side_effect=create):
+            response = self.checkout()
+
+        self.assertEqual(response.status_code, 201)
+        order_id = response.data["order_id"]
+        self.assertEqual(seen, {"depth": depth, "key": f"tpop-order-{order_id}-payment-intent"})
+        order = Order.objects.get(id=order_id)
+        self.assertEqual((order.stripe_payment_intent, order.stripe_client_secret), ("pi_1", "secret_1"))
+
+    def test_stripe_errors_close_the_order(self):
+        cases = [
+            (stripe.APIConnectionError("timeout"), 502),
+            (stripe.RateLimitError("rate limit"), 502),
+            (stripe.CardError("declined", param=None, code="card_declined"), 400),
+            (stripe.InvalidRequestError("bad amount", param="amount"), 400),
+        ]
+        for error, expected in cases:
+            with patch("orders.payment_intents.stripe.PaymentIntent.create", side_effect=error):
+                response = self.checkout()
+            self.assertEqual(response.status_code, expected, type(error).__name__)
+            order = Order.objects.get(id=response.data["order_id"])
+            self.assertEqual((order.status, order.payment_status), ("failed", "failed"))
+            self.assertIsNone(order.stripe_payment_intent)
+
+    def test_order_left_without_intent_is_recovered_by_sweep(self):
+        # El proceso cayó entre las fases: la orden quedó pendiente sin intent
+        order = Order.objects.create(full_name="Invitado", payment_method="card", subtotal=Decimal("20.00"))
+        expired = Order.objects.create(full_name="Viejo", payment_method="card", subtotal=Decimal("5.00"))
+        Order.objects.filter(id=expired.id).update(created_at=timezone.now() - EXPIRE_AFTER - RECOVER_AFTER)
+
+        with patch("orders.payment_intents.stripe.PaymentIntent.create") as create:
+            # Recién creada: puede ser un checkout en curso
+            self.assertEqual(recover_payment_intents(), (0, 0, 1, 0))
+            self.assertFalse(create.called)
+
+            # Transitorio: sigue pendiente para la próxima pasada
+            Order.objects.filter(id=order.id).update(created_at=timezone.now() - RECOVER_AFTER)
+            create.side_effect = stripe.RateLimitError("rate limit")
+            self.assertEqual(recover_payment_intents(), (0, 1, 0, 0))
+
+            create.side_effect = None
+            create.return_value = SimpleNamespace(id="pi_2", client_secret="secret_2")
+            self.assertEqual(recover_payment_intents(), (1, 0, 0, 0))
+
+        self.assertEqual(create.call_args.kwargs["idempotency_key"], f"tpop-order-{order.id}-payment-intent")
+        order.refresh_from_db()
+        self.assertEqual(order.stripe_payment_intent, "pi_2")
+        expired.refresh_from_db()
+        self.assertEqual((expired.status, expired.payment_status), ("failed", "failed"))
+
+    def test_sweep_stops_retrying_permanent_errors(self):
+        order = Order.objects.create(full_name="Invitado", payment_method="card", subtotal=Decimal("20.00"))
+        Order.objects.filter(id=order.id).update(created_at=timezone.now() - RECOVER_AFTER)
+
+        error = stripe.InvalidRequestError("Amount must be at least $0.50", param="amount")
+        with patch("orders.payment_intents.stripe.PaymentIntent.create", side_effect=error) as create:
+            self.assertEqual(recover_payment_intents(), (0, 0, 0, 1))
+            self.assertEqual(recover_payment_intents(), (0, 0, 0, 0))
+        self.assertEqual(create.call_count, 1)
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.payment_status), ("failed", "failed"))
+
+
+class IdempotencyKeyTest(TestCase):
+    """
+    Idempotency-Key en checkout y pay_order: los reintentos reciben la respuesta guardada.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Filtro", price=Decimal("10.00"), sku="SKU-IK")
+        Inventory.objects.filter(product=self.product).update(quantity=5)
+        self.body = {
+            "items": [{"product_id": self.product.id, "quantity": 2}],
+            "full_name": "Invitado",
+            "guest_email": "guest@example.com",
+            "payment_method": "cod",
+        }
+
+    def test_retries_replay_the_stored_response(self):
+        first = self.client.post("/api/checkout/", self.body, format="json", HTTP_IDEMPOTENCY_KEY="k-1")
+        self.assertEqual(first.status_code, 201)
+
+        with patch("orders.views.validate_order_stock") as validate:
+            again = self.client.post("/api/checkout/", self.body, format="json", HTTP_IDEMPOTENCY_KEY="k-1")
+        self.assertFalse(validate.called)
+        self.assertEqual((again.status_code, again.json()), (201, first.json()))
+        self.assertEqual(again["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+
+        changed = self.client.post(
+            "/api/checkout/", {**self.body, "full_name": "Otro"}, format="json", HTTP_IDEMPOTENCY_KEY="k-1"
+        )
+        self.assertEqual(changed.status_code, 422)
+
+        # pay_order: el segundo intento no vuelve a descontar stock ni a facturar
+        order_id = first.json()["order_id"]
+        with patch("orders.views.create_invoice", return_value="INV-1") as invoice:
+            paid = [
+                self.client.post(f"/api/{order_id}/pay/", {"payment_method": "cod"}, format="json", HTTP_IDEMPOTENCY_KEY="p-1")
+                for _ in range(2)
+            ]
+        self.assertEqual([response.status_code for response in paid], [200, 200])
+        self.assertEqual(invoice.call_count, 1)
+        self.assertEqual(Inventory.objects.get(product=self.product).quantity, 3)
+
+    def test_server_errors_release_the_key_and_expired_keys_are_pruned(self):
+        with patch("orders.views.validate_order_stock", side_effect=RuntimeError("caída")):
+            with self.assertRaises(RuntimeError):
+                self.client.post("/api/checkout/", self.body, format="json", HTTP_IDEMPOTENCY_KEY="k-2")
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        response = self.client.post("/api/checkout/", self.body, format="json", HTTP_IDEMPOTENCY_KEY="k-2")
+        self.assertEqual(response.status_code, 201)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(prune_expired_keys(batch_size=1), 1)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_payment_failures_are_not_stored(self):
+        body = {**self.body, "payment_method": "card"}
+        errors = [
+            stripe.APIConnectionError("timeout"),
+            stripe.CardError("declined", param=None, code="card_declined"),
+        ]
+        for i, error in enumerate(errors):
+            key = f"k-card-{i}"
+            with patch("orders.payment_intents.stripe.PaymentIntent.create", side_effect=error):
+                failed = self.client.post("/api/checkout/", body, format="json", HTTP_IDEMPOTENCY_KEY=key)
+            self.assertIn(failed.status_code, (400, 502))
+            self.assertFalse(IdempotencyKey.objects.filter(key=key).exists())
+
+            with patch("orders.payment_intents.stripe.PaymentIntent.create") as create:
+                create.return_value = SimpleNamespace(id=f"pi_{i}", client_secret=f"secret_{i}")
+                retry = self.client.post("/api/checkout/", body, format="json", HTTP_IDEMPOTENCY_KEY=key)
+            self.assertEqual(retry.status_code, 201)
+            self.assertEqual(retry.data["client_secret"], f"secret_{i}")
+            self.assertFalse(retry.has_header("Idempotent-Replayed"))
+
+
+class IdempotencyCoalescingTest(TransactionTestCase):
+    """
+    Dos requests simultáneos con la misma key: el segundo espera al primero.
+    """
+
+    def test_concurrent_duplicate_waits_for_first_result(self):
+        product = Product.objects.create(name="Filtro", price=Decimal("10.00"), sku="SKU-IC")
+        Inventory.objects.filter(product=product).update(quantity=5)
+        body = {
+            "items": [{"product_id": product.id, "quantity": 1}],
+            "full_name": "Invitado",
+            "guest_email": "guest@example.com",
+            "payment_method": "cod",
+        }
+        started = threading.Event()
+        validate = orders_views.validate_order_stock
+
+        def slow_validate(items):
+            started.set()
+            time.sleep(0.3)
+            return validate(items)
+
+        responses = []
+
+        def post():
+            try:
+                responses.append(APIClient().post("/api/checkout/", body, format="json", HTTP_IDEMPOTENCY_KEY="k-3"))
+            finally:
+                connection.close()
+
+        with patch("orders.views.validate_order_stock", side_effect=slow_validate) as validate_mock:
+            first = threading.Thread(target=post)
+            first.start()
+            started.wait(5)
+            second = threading.Thread(target=post)
+            second.start()
+            first.join()
+            second.join()
+
+        self.assertEqual(validate_mock.call_count, 1)
+        self.assertEqual([response.status_code for response in responses], [201, 201])
+        self.assertEqual(responses[0].json(), responses[1].json())
+        self.assertEqual(Order.objects.count(), 1)
@@ -1,5 +1,5 @@
 # orders/views.py
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
@@ -7,24 +7,31 @@ from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
+import json
 import stripe
 from django.conf import settings
 
 from .models import Order, OrderItem
 from .serializers import (
     OrderCreateSerializer,
+    OrderQuoteSerializer,
     OrderSerializer,
     OrderUpdateSerializer,
     OrderPaymentSerializer,
-    OrderDetailSerializer
+    OrderDetailSerializer,
+    OrderSummarySerializer
 )
-from .services import validate_order_stock
+from .services import line_amounts, quote_order, validate_order_stock
 from inventory.services.inventory import move_inventory
 from products.models import Product
-from qb.services import create_sales_receipt, create_invoice
-from .models import StripeEvent
-from django.core.exceptions import ValidationError
-from inventory.models import InventoryMovement
+from qb.services import create_invoice
+from .idempotency import idempotent, release
+from .payment_intents import create_payment_intent, payment_error_status
+from .stripe_events import enqueue_event
+from products.pagination import StandardResultsSetPagination
+from reports.services import record_order_sale
+from TPOP.models import Cart
+from TPOP.services.cart import can_access, cart_session, cart_totals
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
@@ -32,10 +39,12 @@ from decimal import Decimal, ROUND_HALF_UP
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
+@idempotent
 def checkout(request):
     """
     Crear una nueva orden (checkout).
     Soporta usuarios autenticados e invitados.
+    Con header Idempotency-Key un reintento recibe la misma respuesta sin crear otra orden.
     """
     serializer = OrderCreateSerializer(
         data=request.data,
@@ -50,100 +59,171 @@ def checkout(request):
 
     data = serializer.validated_data
 
-    try:
-        with transaction.atomic():
-            items = data["items"]
-            payment_method = data["payment_method"]
+    cart = None
+    if data.get("cart_id"):
+        cart = Cart.objects.filter(id=data["cart_id"]).first()
+        if cart is None or not can_access(cart, request.user, cart_session(request)):
+            return Response(
+                {"error": "Carrito no encontrado"},
+                status=status.HTTP_404_NOT_FOUND
+            )
 
-            # 1️⃣ Validar stock
-            try:
-                validate_order_stock(items)
-            except ValueError as e:
+    # Fase 1: transacción corta con los locks de stock; Stripe queda afuera
+    with transaction.atomic():
+        payment_method = data["payment_method"]
+
+        # 🛒 Con carrito: líneas y precios ya validados (totales cacheados);
+        # solo se vuelve a chequear el stock, ahora con lock
+        totals = None
+        if cart is not None:
+            cart = Cart.objects.select_for_update().filter(id=cart.id).first()
+            if cart is None:
+                return Response(
+                    {"error": "Carrito no encontrado"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            totals = cart_totals(cart)
+            if not totals["can_checkout"]:
                 return Response(
-                    {"error": str(e)},
+                    {
+                        "error": "El carrito tiene productos sin stock o no disponibles",
+                        "warnings": totals["warnings"],
+                    },
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            items = [
+                {"product_id": line["product_id"], "quantity": line["quantity"]}
+                for line in totals["items"]
+            ]
+        else:
+            items = data["items"]
 
-            # 2️⃣ Crear la orden
-            order = Order.objects.create(
-                user=request.user if request.user.is_authenticated else None,
-                full_name=data["full_name"],
-                guest_email=data.get("guest_email"),
-                phone=data.get("phone", ""),
-                shipping_address=data.get("shipping_address", ""),
-                street=data.get("street", ""),
-                house_number=data.get("house_number", ""),
-                city=data.get("city", ""),
-                state=data.get("state", ""),
-                country=data.get("country", ""),
-                postal_code=data.get("postal_code", ""),
-                status="pending",
-                payment_method=payment_method
+        # 1️⃣ Validar stock
+        try:
+            validate_order_stock(items)
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-            # 3️⃣ Crear items y calcular total
-            subtotal = Decimal('0.00')
-            tax_total = Decimal('0.00')
-            tax_rate = Decimal('0.07')
-
-            for item in items:
-                product = Product.objects.get(id=item["product_id"])
-
-                item_subtotal = (product.price * item["quantity"]).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                item_tax = (item_subtotal * tax_rate).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        # 2️⃣ Crear la orden
+        order = Order.objects.create(
+            user_id=request.user.id if request.user.is_authenticated else None,
+            full_name=data["full_name"],
+            guest_email=data.get("guest_email"),
+            phone=data.get("phone", ""),
+            shipping_address=data.get("shipping_address", ""),
+            street=data.get("street", ""),
+            house_number=data.get("house_number", ""),
+            city=data.get("city", ""),
+            state=data.get("state", ""),
+            country=data.get("country", ""),
+            postal_code=data.get("postal_code", ""),
+            status="pending",
+            payment_method=payment_method
+        )
 
-                subtotal += item_subtotal
-                tax_total += item_tax
+        # 3️⃣ Crear items y calcular total
+        subtotal = Decimal('0.00')
+        tax_total = Decimal('0.00')
 
-                OrderItem.objects.create(
+        if totals is not None:
+            # Precios y montos que ya calculó el carrito (mismo redondeo)
+            OrderItem.objects.bulk_create([
+                OrderItem(
                     order=order,
-                    product=product,
-                    quantity=item["quantity"],
-                    price=product.price
+                    product_id=line["product_id"],
+                    quantity=line["quantity"],
+                    price=Decimal(line["unit_price"])
                 )
-            order.subtotal = subtotal.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            order.tax = tax_total
-            order.save()
+                for line in totals["items"]
+            ])
+            subtotal = Decimal(totals["subtotal"])
+            tax_total = Decimal(totals["tax"])
 
+        for item in ([] if totals is not None else items):
+            product = Product.objects.get(id=item["product_id"])
 
-            # 4️⃣ Si es tarjeta, crear PaymentIntent en Stripe
-            if payment_method == "card":
-                intent = stripe.PaymentIntent.create(
-                    amount = int(order.total * 100),
-                    currency="usd",
-                    metadata={"order_id": order.id},
-                    automatic_payment_methods={"enabled": True},
-                )
-                order.stripe_payment_intent = intent.id
-                order.stripe_client_secret = intent.client_secret
-                order.save()
-
-                return Response({
-                    "order_id": order.id,
-                    "client_secret": intent.client_secret,
-                    "status": "requires_payment",
-                    "subtotal": float(order.subtotal),
-                    "tax": float(order.tax),
-                    "total": float(order.total)
-                }, status=status.HTTP_201_CREATED)
-
-            # 5️⃣ Si es COD, respuesta simple
-            return Response(
-                {
-                    "order_id": order.id,
-                    "status": order.status,
-                    "subtotal": float(order.subtotal),
-                    "tax": float(order.tax),
-                    "total": float(order.total)
-                },
-                status=status.HTTP_201_CREATED
+            item_subtotal, item_tax = line_amounts(product.price, item["quantity"])
+
+            subtotal += item_subtotal
+            tax_total += item_tax
+
+            OrderItem.objects.create(
+                order=order,
+                product=product,
+                quantity=item["quantity"],
+                price=product.price
             )
+        order.subtotal = subtotal.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        order.tax = tax_total
+        order.save()
+
+    # 4️⃣ Si es COD, respuesta simple
+    if payment_method == "cod":
+        if totals is not None:
+            # El carrito se consumió
+            cart.delete()
+        return Response(
+            {
+                "order_id": order.id,
+                "status": order.status,
+                "subtotal": float(order.subtotal),
+                "tax": float(order.tax),
+                "total": float(order.total)
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+    # 5️⃣ Tarjeta: PaymentIntent sin locks (fase 2) y guardado con un UPDATE corto (fase 3)
+    try:
+        intent = create_payment_intent(order)
     except stripe.StripeError as e:
         # stripe.error.StripeError fue eliminado en stripe>=13.0 → usar stripe.StripeError
-        return Response(
-            {"error": f"Error al procesar el pago con tarjeta: {str(e)}"},
-            status=status.HTTP_400_BAD_REQUEST
+        # El cliente recibió el error y el carrito sigue intacto: reintenta el checkout
+        # con una orden nueva, así que esta se cierra en lugar de esperar al barrido
+        # (recover_payment_intents queda para los procesos que caen entre fases)
+        Order.objects.filter(pk=order.pk, stripe_payment_intent__isnull=True).update(
+            status="failed", payment_status="failed"
         )
+        # Sin guardar bajo la Idempotency-Key: el reintento vuelve a pedir el pago
+        return release(Response(
+            {
+                "error": f"Error al procesar el pago con tarjeta: {str(e)}",
+                "order_id": order.id,
+            },
+            status=payment_error_status(e)
+        ))
+
+    if totals is not None:
+        # El carrito se consume recién con el intent creado
+        Cart.objects.filter(id=cart.id).delete()
+
+    return Response({
+        "order_id": order.id,
+        "client_secret": intent.client_secret,
+        "status": "requires_payment",
+        "subtotal": float(order.subtotal),
+        "tax": float(order.tax),
+        "total": float(order.total)
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def checkout_quote(request):
+    """
+    Cotizar items sin crear la orden: subtotal, impuesto y total por línea y
+    de la orden (mismo redondeo que checkout) más avisos de stock.
+    Solo lectura: sin locks, sin Stripe y sin autenticación (no usa el usuario).
+    """
+    serializer = OrderQuoteSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(quote_order(serializer.validated_data["items"]))
 
 
 @api_view(["GET"])
@@ -151,10 +231,13 @@ def order_detail(request, order_id):
     """
     Obtener detalle de una orden específica
     """
-    order = get_object_or_404(Order, id=order_id)
+    order = get_object_or_404(
+        OrderSerializer.setup_eager_loading(Order.objects.all()),
+        id=order_id
+    )
     
     # Validar permisos
-    if order.user and order.user != request.user:
+    if order.user_id and order.user_id != request.user.id:
         if not request.user.is_staff:
             return Response(
                 {"error": "No tienes permiso para ver esta orden"},
@@ -170,36 +253,84 @@ def order_detail(request, order_id):
     return Response(serializer.data)
 
 
+ORDER_LIST_REPRESENTATIONS = {
+    "summary": OrderSummarySerializer,
+    "detail": OrderSerializer,
+}
+
+
+def _order_list_representation(request, default_view):
+    """
+    Resuelve el serializer y los campos de un listado de órdenes a partir de
+    ?view=summary|detail y ?fields=a,b,c (sparse fieldset).
+    Retorna (serializer_class, fields, error_response).
+    """
+    view_name = request.query_params.get("view", default_view)
+    serializer_class = ORDER_LIST_REPRESENTATIONS.get(view_name)
+    if serializer_class is None:
+        return None, None, Response(
+            {"error": f"view inválido. Opciones: {list(ORDER_LIST_REPRESENTATIONS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    fields = None
+    fields_param = request.query_params.get("fields")
+    if fields_param:
+        fields = [f.strip() for f in fields_param.split(",") if f.strip()]
+        invalid = [f for f in fields if f not in serializer_class.Meta.fields]
+        if invalid:
+            return None, None, Response(
+                {"error": f"Campos no válidos para view={view_name}: {invalid}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    return serializer_class, fields, None
+
+
 @api_view(["GET"])
 def my_orders(request):
     """
-    Listar órdenes del usuario autenticado
+    Listar órdenes del usuario autenticado.
+    Soporta ?view=summary|detail (default detail) y ?fields=a,b,c
     """
     if not request.user.is_authenticated:
         return Response(
             {"error": "Authentication required"},
             status=status.HTTP_401_UNAUTHORIZED
         )
+
+    serializer_class, fields, error = _order_list_representation(request, "detail")
+    if error:
+        return error
     
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
-    serializer = OrderSerializer(orders, many=True)
+    orders = serializer_class.setup_eager_loading(
+        Order.objects.filter(user_id=request.user.id),
+        fields
+    ).order_by('-created_at')
+
+    paginator = StandardResultsSetPagination()
+    page = paginator.paginate_queryset(orders, request)
+    serializer = serializer_class(page, many=True, fields=fields)
     
-    return Response({
-        "count": len(serializer.data),
-        "results": serializer.data
-    })
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(["GET"])
 def admin_orders_list(request):
     """
-    Listar todas las órdenes (solo admin)
+    Listar todas las órdenes (solo admin).
+    Por defecto usa la representación compacta (?view=summary);
+    ?view=detail devuelve el payload completo y ?fields=a,b,c limita los campos.
     """
     if not request.user.is_authenticated or not request.user.is_staff:
         return Response(
             {"error": "Admin access required"},
             status=status.HTTP_403_FORBIDDEN
         )
+
+    serializer_class, fields, error = _order_list_representation(request, "summary")
+    if error:
+        return error
     
     orders = Order.objects.all().order_by('-created_at')
     
@@ -213,14 +344,20 @@ def admin_orders_list(request):
         orders = orders.filter(payment_status=payment_status_filter)
     
     # Paginación simple
-    page = int(request.query_params.get("page", 1))
-    page_size = int(request.query_params.get("page_size", 20))
+    try:
+        page = max(int(request.query_params.get("page", 1)), 1)
+        page_size = min(max(int(request.query_params.get("page_size", 20)), 1), 100)
+    except ValueError:
+        return Response(
+            {"error": "'page' y 'page_size' deben ser números enteros"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     total = orders.count()
     start = (page - 1) * page_size
     end = start + page_size
-    orders = orders[start:end]
+    orders = serializer_class.setup_eager_loading(orders, fields)[start:end]
     
-    serializer = OrderSerializer(orders, many=True)
+    serializer = serializer_class(orders, many=True, fields=fields)
     
     return Response({
         "count": total,
@@ -241,7 +378,10 @@ def admin_order_detail(request, order_id):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    order = get_object_or_404(Order, id=order_id)
+    order = get_object_or_404(
+        OrderDetailSerializer.setup_eager_loading(Order.objects.all()),
+        id=order_id
+    )
     serializer = OrderDetailSerializer(order)
     
     return Response(serializer.data)
@@ -277,9 +417,10 @@ def admin_update_order_status(request, order_id):
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
+@idempotent
 def pay_order(request, order_id):
     """
-    Procesar pago de orden COD
+    Procesar pago de orden COD (acepta header Idempotency-Key)
     """
     order = get_object_or_404(Order, id=order_id)
     
@@ -303,8 +444,16 @@ def pay_order(request, order_id):
     
     try:
         with transaction.atomic():
+            # 🔒 Bloquear la orden y re-validar: dos pagos simultáneos no descuentan dos veces
+            order = Order.objects.select_for_update().get(id=order.id)
+            if order.status != "pending":
+                return Response(
+                    {"error": "La orden ya fue procesada"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
             # 1. Descontar stock
-            for item in order.items.all():
+            for item in order.items.select_related("product"):
                 move_inventory(
                     product=item.product,
                     quantity_change=-item.quantity,
@@ -320,6 +469,9 @@ def pay_order(request, order_id):
             order.status = "invoiced"
             order.payment_status = "pending"
             order.save()
+
+            # 4. Sumar la venta a los rollups de reportes
+            record_order_sale(order)
             
             return Response({
                 "order_id": order.id,
@@ -358,6 +510,11 @@ def products_list(request):
 
 @csrf_exempt
 def stripe_webhook(request):
+    """
+    Fast-ack: verifica la firma, guarda el evento en la cola durable (StripeEvent)
+    y responde 200 de inmediato. El procesamiento (inventario, QuickBooks, estado
+    de la orden) lo hace el worker: manage.py process_stripe_events
+    """
     payload = request.body
     sig_header = request.META.get("HTTP_STRIPE_SIGNATURE")
 
@@ -373,272 +530,10 @@ def stripe_webhook(request):
     except Exception as e:
         return JsonResponse({"error": "Invalid payload"}, status=400)
 
-    event_id = event.get("id")
-    event_type = event.get("type")
-
-    # 🔁 IDEMPOTENCIA con modelo actual
-    
-    # Verificar si ya procesamos este evento
-    if StripeEvent.objects.filter(event_id=event_id).exists():
-        return JsonResponse({"status": "already_processed"})
-
-    try:
-        if event_type == "payment_intent.succeeded":
-            intent = event["data"]["object"]
-            metadata = intent.get("metadata", {})
-            order_id = metadata.get("order_id")
-
-            if not order_id:
-                # Registrar evento ignorado
-                StripeEvent.objects.create(event_id=event_id)
-                return JsonResponse({"status": "ignored"})
-
-            with transaction.atomic():
-                try:
-                    order = Order.objects.select_for_update().get(id=order_id)
-                   
-                except Order.DoesNotExist:
-                    StripeEvent.objects.create(event_id=event_id)
-                    return JsonResponse({"status": "ignored"})
-
-                # 🔴 VALIDACIÓN 1: Solo tarjeta
-                if order.payment_method != "card":
-                    StripeEvent.objects.create(event_id=event_id)
-                    return JsonResponse({"status": "ignored", "reason": "not_card_payment"})
-
-                # 🔴 VALIDACIÓN 2: No procesar si ya está pagada
-                if order.payment_status == "paid":
-                    StripeEvent.objects.create(event_id=event_id)
-                    return JsonResponse({"status": "already_processed"})
-
-                # 🔴 VALIDACIÓN 3: Verificar si ya tiene inventario descontado
-                existing_movements = InventoryMovement.objects.filter(
-                    reference__icontains=f"Orden #{order.id}"
-                )
-                
-                if existing_movements.exists():
-                    print(f"\n   ⚠️ ⚠️ ⚠️ ALERTA CRÍTICA ⚠️ ⚠️ ⚠️")
-                    print(f"   YA EXISTEN MOVIMIENTOS DE INVENTARIO PARA ESTA ORDEN!")
-                    print(f"   Cantidad de movimientos: {existing_movements.count()}")
-                    for mov in existing_movements:
-                        print(f"      - {mov.created_at}: {mov.change} ({mov.reason})")
-                    print(f"\n   Saltando descuento de inventario para evitar doble descuento")
-                    print(f"   Actualizando estado de la orden...")
-                    
-                    # Solo actualizar estado si es necesario
-                    if order.status != "completed":
-                        order.status = "completed"
-                        order.payment_status = "paid"
-                        order.stripe_payment_intent = intent.get("id")
-                        order.save()
-                        print(f"   ✅ Orden #{order.id} actualizada a completed")
-                    
-                    StripeEvent.objects.create(event_id=event_id)
-                    return JsonResponse({"status": "inventory_already_deducted"})
-
-                # 💰 Validar monto
-                stripe_amount = intent.get("amount")
-                expected_amount = int(order.total * 100)
-
-                if stripe_amount != expected_amount:
-                    return JsonResponse({"status": "amount_mismatch"}, status=400)
-
-                # 💱 Validar moneda
-                if intent.get("currency") != "usd":
-                    print(f"   ❌ Moneda incorrecta: {intent.get('currency')}")
-                    return JsonResponse({"status": "currency_error"}, status=400)
-
-                # 📋 Obtener items de la orden
-                items_list = list(order.items.all())
-                print(f"\n📋 ITEMS DE LA ORDEN:")
-                print(f"   Total items en orden: {len(items_list)}")
-                for idx, item in enumerate(items_list, 1):
-                    print(f"\n   Item {idx}:")
-                    print(f"      - ID: {item.id}")
-                    print(f"      - Producto: {item.product.name}")
-                    print(f"      - Product ID: {item.product.id}")
-                    print(f"      - Cantidad: {item.quantity}")
-                    print(f"      - Precio: ${item.price}")
-
-                # 📦 DESCONTAR INVENTARIO
-                print(f"\n🔻 INICIANDO DESCUENTO DE INVENTARIO:")
-                print(f"{'='*80}")
-                
-                for idx, item in enumerate(items_list, 1):
-                    print(f"\n--- Procesando Item {idx}/{len(items_list)} ---")
-                    print(f"   Producto: {item.product.name}")
-                    print(f"   Cantidad a descontar: {item.quantity}")
-                    
-                    # Verificar stock actual antes de descontar
-                    from inventory.models import Inventory
-                    inventory = Inventory.objects.select_for_update().get(product=item.product)
-                    stock_before = inventory.quantity
-                    print(f"   Stock ANTES: {stock_before}")
-                    
-                    if stock_before < item.quantity:
-                        print(f"   ❌ ERROR: Stock insuficiente!")
-                        print(f"      - Disponible: {stock_before}")
-                        print(f"      - Solicitado: {item.quantity}")
-                        raise ValidationError(f"Stock insuficiente para {item.product.name}")
-                    
-                    # Descontar
-                    try:
-                        
-                        new_quantity = move_inventory(
-                            product=item.product,
-                            quantity_change=-item.quantity,
-                            reason="Venta Stripe",
-                            reference=f"Orden #{order.id} - PaymentIntent {intent.get('id')}"
-                        )
-                        print(f"   Stock DESPUÉS: {new_quantity}")
-                        print(f"   ✅ Descontado: {stock_before - new_quantity} unidades")
-                        
-                        # Verificar que se descontó la cantidad correcta
-                        if (stock_before - new_quantity) != item.quantity:
-                            print(f"   ⚠️ ADVERTENCIA: Se descontaron {stock_before - new_quantity} pero deberían ser {item.quantity}")
-                            
-                    except Exception as e:
-                        print(f"   ❌ Error al descontar: {e}")
-                        raise
-
-                print(f"\n{'='*80}")
-                print(f"✅ INVENTARIO DESCONTADO CORRECTAMENTE")
-                print(f"{'='*80}")
-
-                # 🧾 Integración con QuickBooks
-                print(f"\n📊 INTEGRACIÓN CON QUICKBOOKS:")
-                try:
-                    receipt_id = create_sales_receipt(order)
-                    print(f"   ✅ Sales Receipt creado: {receipt_id}")
-                except Exception as e:
-                    print(f"   ⚠️ Error en QuickBooks: {e}")
-                    receipt_id = None
-                    # Si QuickBooks es crítico, descomenta la siguiente línea:
-                    # raise e
-
-                # 🧾 Actualizar orden
-                print(f"\n💾 ACTUALIZANDO ORDEN EN BASE DE DATOS:")
-                order.qb_sales_receipt_id = receipt_id
-                order.status = "completed"
-                order.payment_status = "paid"
-                order.stripe_payment_intent = intent.get("id")
-                order.save()
-                print(f"   - status: {order.status}")
-                print(f"   - payment_status: {order.payment_status}")
-                print(f"   - stripe_payment_intent: {order.stripe_payment_intent}")
-                print(f"   - qb_sales_receipt_id: {order.qb_sales_receipt_id}")
-
-                # Registrar evento procesado
-                StripeEvent.objects.create(event_id=event_id)
-                
-                print(f"\n{'='*80}")
-                print(f"🎉 ORDEN #{order.id} COMPLETADA EXITOSAMENTE")
-                print(f"{'='*80}")
-                print(f"   Estado final: {order.status}")
-                print(f"   Payment status: {order.payment_status}")
-                print(f"   Total: ${order.total}")
-                print(f"   Items procesados: {len(items_list)}")
-                print(f"{'='*80}\n")
-
-        elif event_type == "payment_intent.payment_failed":
-            intent = event["data"]["object"]
-            metadata = intent.get("metadata", {})
-            order_id = metadata.get("order_id")
-            
-            print(f"\n{'='*80}")
-            print(f"❌ PAGO FALLIDO")
-            print(f"{'='*80}")
-            print(f"   Order ID: {order_id}")
-            print(f"   Error: {intent.get('last_payment_error', {}).get('message', 'Unknown error')}")
-            print(f"{'='*80}")
-
-            if not order_id:
-                print("⚠️ Sin order_id, evento ignorado")
-                StripeEvent.objects.create(event_id=event_id)
-                return JsonResponse({"status": "ignored"})
-
-            try:
-                with transaction.atomic():
-                    order = Order.objects.select_for_update().get(id=order_id)
-                    print(f"📦 Orden #{order.id} encontrada")
-                    print(f"   Estado actual: {order.status}")
-                    print(f"   Payment status: {order.payment_status}")
-                    
-                    if order.payment_status != "paid":
-                        order.status = "failed"
-                        order.payment_status = "failed"
-                        order.save()
-                        print(f"   ✅ Orden marcada como fallida")
-                    else:
-                        print(f"   ⚠️ Orden ya estaba pagada, no se modifica")
-                    
-                    StripeEvent.objects.create(event_id=event_id)
-            except Order.DoesNotExist:
-                print(f"❌ Orden #{order_id} no encontrada")
-                StripeEvent.objects.create(event_id=event_id)
-
-        elif event_type == "charge.refunded":
-            charge = event["data"]["object"]
-            payment_intent_id = charge.get("payment_intent")
-            
-            print(f"\n{'='*80}")
-            print(f"💸 REEMBOLSO PROCESADO")
-            print(f"{'='*80}")
-            print(f"   Payment Intent ID: {payment_intent_id}")
-            print(f"   Amount refunded: {charge.get('amount_refunded', 0) / 100}")
-            print(f"{'='*80}")
-
-            try:
-                with transaction.atomic():
-                    order = Order.objects.select_for_update().get(
-                        stripe_payment_intent=payment_intent_id
-                    )
-                    print(f"📦 Orden #{order.id} encontrada")
-                    print(f"   Estado actual: {order.status}")
-                    print(f"   Payment status: {order.payment_status}")
-                    
-                    if order.payment_status != "refunded":
-                        # Reponer inventario
-                        print(f"\n🔄 REPONIENDO INVENTARIO:")
-                        for item in order.items.all():
-                            print(f"   - {item.product.name}: +{item.quantity}")
-                            
-                            move_inventory(
-                                product=item.product,
-                                quantity_change=item.quantity,
-                                reason="Reembolso Stripe",
-                                reference=f"Orden #{order.id} - Refund"
-                            )
-                        
-                        order.status = "refunded"
-                        order.payment_status = "refunded"
-                        order.save()
-                        print(f"\n✅ Orden #{order.id} marcada como reembolsada")
-                    else:
-                        print(f"⚠️ Orden ya estaba reembolsada")
-                    
-                    StripeEvent.objects.create(event_id=event_id)
-            except Order.DoesNotExist:
-                print(f"❌ Orden con payment_intent {payment_intent_id} no encontrada")
-                StripeEvent.objects.create(event_id=event_id)
+    # 📥 2. Persistir el evento (event_id único = idempotencia ante reenvíos)
+    _, created = enqueue_event(json.loads(payload))
 
-        else:
-            print(f"\n{'='*80}")
-            print(f"ℹ️ EVENTO NO MANEJADO: {event_type}")
-            print(f"{'='*80}")
-            StripeEvent.objects.create(event_id=event_id)
+    if not created:
+        return JsonResponse({"status": "already_received"})
 
-    except Exception as e:
-        print(f"\n{'='*80}")
-        print(f"🔥 ERROR CRÍTICO EN WEBHOOK")
-        print(f"{'='*80}")
-        print(f"   Error: {str(e)}")
-        print(f"   Event ID: {event_id}")
-        print(f"   Event Type: {event_type}")
-        print(f"{'='*80}\n")
-        import traceback
-        traceback.print_exc()
-        return JsonResponse({"error": "Server error"}, status=500)
-
-    print(f"✅ Webhook procesado exitosamente: {event_id}")
-    return JsonResponse({"status": "ok"})
\ No newline at end of file
+    return JsonResponse({"status": "queued"})
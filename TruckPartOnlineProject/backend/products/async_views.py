@@ -0,0 +1,152 @@
+"""
+Lectura del catálogo en async (ORM async de Django), para servir bajo ASGI:
+
+    uvicorn backend.asgi:application --workers 4
+
+Mismos datos y mismo JSON que los endpoints DRF equivalentes; solo GET y
+sin el navegador de la API. Un worker ASGI atiende muchos clientes lentos a
+la vez mientras espera a la base, en vez de quedar bloqueado con uno solo.
+
+    /api/catalog/products/              ≈ /api/products/
+    /api/catalog/products/<id>/         ≈ /api/products/<id>/
+    /api/catalog/products/search/       ≈ /api/products/search/
+    /api/catalog/categories/tree/       ≈ /api/categories/tree/
+    /api/catalog/brands/                ≈ /api/brands/
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from backend.renderers import FastJSONRenderer
+from users.authentication import ClaimsJWTAuthentication
+from .models import Brand, Category, Product
+from .pagination import StandardResultsSetPagination
+from .queries import acategory_children, product_queryset
+from .serializers import BrandSerializer, CategorySerializer, ProductSearchSerializer, ProductSerializer
+
+_renderer = FastJSONRenderer()
+
+
+def _json(data, status=200):
+    # Mismo renderer que DRF: la respuesta es idéntica byte a byte
+    return HttpResponse(_renderer.render(data), status=status, content_type="application/json")
+
+
+async def _is_staff(request):
+    """
+    Solo el listado/detalle cambian para staff (ven inactivos). El token JWT
+    se valida como en DRF; sin header Authorization no hay query.
+    """
+    if "HTTP_AUTHORIZATION" not in request.META:
+        return False
+    result = await sync_to_async(ClaimsJWTAuthentication().authenticate)(request)
+    return bool(result and result[0].is_staff)
+
+
+def _auth_error(exc):
+    # Igual que el exception handler de DRF: un dict va tal cual
+    data = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+    response = _json(data, status=exc.status_code)
+    response["WWW-Authenticate"] = JWTAuthentication().authenticate_header(None)
+    return response
+
+
+def _page_size(request):
+    pagination = StandardResultsSetPagination
+    try:
+        size = int(request.GET[pagination.page_size_query_param])
+        if size > 0:
+            return min(size, pagination.max_page_size)
+    except (KeyError, ValueError):
+        pass
+    return pagination.page_size
+
+
+@require_GET
+async def product_list(request):
+    try:
+        is_staff = await _is_staff(request)
+    except AuthenticationFailed as exc:
+        return _auth_error(exc)
+
+    queryset = product_queryset(request.GET, is_staff)
+    size = _page_size(request)
+    count = await queryset.acount()
+    num_pages = max(1, -(-count // size))
+
+    raw_page = request.GET.get("page") or 1
+    try:
+        page = num_pages if raw_page == "last" else int(raw_page)
+        if not 1 <= page <= num_pages:
+            raise ValueError
+    except ValueError:
+        return _json({"detail": "Invalid page."}, status=404)
+
+    offset = (page - 1) * size
+    products = [product async for product in queryset[offset:offset + size]]
+    children = await acategory_children({p.category_id for p in products if p.category_id})
+
+    url = request.build_absolute_uri()
+    previous = None
+    if page > 1:
+        previous = remove_query_param(url, "page") if page == 2 else replace_query_param(url, "page", page - 1)
+
+    return _json({
+        "count": count,
+        "next": replace_query_param(url, "page", page + 1) if page < num_pages else None,
+        "previous": previous,
+        "results": ProductSerializer(
+            products, many=True,
+            context={"request": request, "category_children": children, "image_size": "card"},
+        ).data,
+    })
+
+
+@require_GET
+async def product_detail(request, pk):
+    try:
+        is_staff = await _is_staff(request)
+    except AuthenticationFailed as exc:
+        return _auth_error(exc)
+
+    product = await product_queryset({}, is_staff).filter(pk=pk).afirst()
+    if product is None:
+        return _json({"detail": "No Product matches the given query."}, status=404)
+
+    children = await acategory_children([product.category_id] if product.category_id else [])
+    return _json(ProductSerializer(
+        product, context={"request": request, "category_children": children, "image_size": "detail"}
+    ).data)
+
+
+@require_GET
+async def product_search(request):
+    query = request.GET.get("q", "")
+    if not query:
+        return _json([])
+
+    products = Product.objects.filter(
+        is_active=True,
+        name__icontains=query
+    ).order_by("name")[:10]
+    return _json(ProductSearchSerializer([p async for p in products], many=True).data)
+
+
+@require_GET
+async def category_tree(request):
+    roots = [c async for c in Category.objects.filter(parent=None).order_by("name")]
+    children = await acategory_children(c.id for c in roots)
+    return _json(CategorySerializer(roots, many=True, context={"category_children": children}).data)
+
+
+@require_GET
+async def brand_list(request):
+    queryset = Brand.objects.all().order_by("name")
+    if request.GET.get("all") != "true":
+        queryset = queryset.filter(products__is_active=True).distinct()
+
+    brands = [brand async for brand in queryset]
+    return _json(BrandSerializer(brands, many=True, context={"request": request}).data)
@@ -0,0 +1,133 @@
+# products/conditional.py
+"""
+GET condicional (ETag / Last-Modified) para el detalle de producto, marcas y categorías.
+
+El detalle de producto arma su validador con una sola query de columnas: el
+updated_at del producto y el de su inventario, más la versión de marcas y
+categorías que embebe. Si el cliente ya tiene esa versión se responde 304
+sin cargar ni serializar el producto. Las imágenes no tienen timestamps y
+al cambiar tocan el updated_at de su producto.
+
+Marcas y categorías tampoco tienen timestamps: cada sección lleva un contador
+(CatalogVersion) que incrementan las señales de products/signals.py, y sus
+endpoints usan un ETag débil por versión + ruta + query normalizada.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.db.models import F, Subquery
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from .models import CatalogVersion, Product
+
+BRANDS = "brands"
+CATEGORIES = "categories"
+
+# Subir cuando cambia la forma de las respuestas: después de un deploy no se
+# debe responder 304 a un cliente que tiene el JSON viejo en su cache
+REPRESENTATION = 1
+
+
+def bump(*names):
+    """
+    Incrementa la versión de las secciones (crea la fila la primera vez).
+    """
+    now = timezone.now()
+    for name in names:
+        if not CatalogVersion.objects.filter(name=name).update(version=F("version") + 1, updated_at=now):
+            CatalogVersion.objects.get_or_create(name=name, defaults={"version": 1, "updated_at": now})
+
+
+def touch_product(product_id):
+    """
+    Marca el producto como modificado sin save() (sin señales de cambio de precio ni de carritos).
+    """
+    Product.objects.filter(pk=product_id).update(updated_at=timezone.now())
+
+
+def _digest(request, *parts):
+    # Las URLs de las imágenes son absolutas: el host es parte de la respuesta
+    raw = ":".join(str(part) for part in (REPRESENTATION, request.scheme, request.get_host(), *parts))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _version(name, field):
+    return Subquery(CatalogVersion.objects.filter(name=name).values(field)[:1])
+
+
+def _product_validators(request, pk):
+    """
+    (etag, last_modified) del detalle, o (None, None) si el producto no existe
+    o no es visible para el usuario: la vista sigue y responde el 404.
+    """
+    cached = getattr(request, "_catalog_validators", None)
+    if cached is not None:
+        return cached
+
+    queryset = Product.objects.filter(pk=pk)
+    if not request.user.is_staff:
+        queryset = queryset.filter(is_active=True)
+    try:
+        row = queryset.annotate(
+            brands_version=_version(BRANDS, "version"),
+            brands_updated_at=_version(BRANDS, "updated_at"),
+            categories_version=_version(CATEGORIES, "version"),
+            categories_updated_at=_version(CATEGORIES, "updated_at"),
+        ).values_list(
+            "updated_at",
+            "inventory__updated_at",
+            "brands_updated_at",
+            "categories_updated_at",
+            "brands_version",
+            "categories_version",
+        ).first()
+    except ValueError:  # pk que no es un número
+        row = None
+
+    if row is None:
+        cached = (None, None)
+    else:
+        etag = f'"{_digest(request, "product", pk, *row)}"'
+        cached = (etag, max(value for value in row[:4] if value is not None))
+    request._catalog_validators = cached
+    return cached
+
+
+def _section_validators(request, name):
+    """
+    (etag débil, last_modified) de una sección según su versión y la query
+    normalizada (parámetros ordenados, sin vacíos).
+    """
+    cached = getattr(request, "_catalog_validators", None)
+    if cached is not None:
+        return cached
+
+    version, updated_at = (
+        CatalogVersion.objects.filter(name=name).values_list("version", "updated_at").first()
+        or (0, None)
+    )
+    query = urlencode(sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+        if value != ""
+    ))
+    cached = (f'W/"{_digest(request, name, version, request.path, query)}"', updated_at)
+    request._catalog_validators = cached
+    return cached
+
+
+# Para métodos de viewsets: corre después de la autenticación y los permisos de DRF
+product_condition = method_decorator(condition(
+    etag_func=lambda request, pk=None, **kwargs: _product_validators(request, pk)[0],
+    last_modified_func=lambda request, pk=None, **kwargs: _product_validators(request, pk)[1],
+))
+
+
+def section_condition(name):
+    return method_decorator(condition(
+        etag_func=lambda request, *args, **kwargs: _section_validators(request, name)[0],
+        last_modified_func=lambda request, *args, **kwargs: _section_validators(request, name)[1],
+    ))
@@ -0,0 +1,235 @@
+# products/listings.py
+"""
+Documentos JSON ya renderizados del catálogo (modelo ProductListing).
+
+Armar un producto en la respuesta cuesta joins con marca, inventario, cuatro
+niveles de categoría e imágenes, más los serializers anidados de DRF. Aquí
+cada producto guarda su JSON (card para el listado, detail para el detalle) y
+list/retrieve de ProductViewSet traen los documentos con una query por clave
+primaria y los pegan tal cual en la respuesta: el resultado es byte a byte el
+mismo que con ProductSerializer.
+
+Las URLs de imágenes son absolutas y dependen del host del request: el
+documento se guarda con ORIGIN en su lugar y se reemplaza al responder.
+
+Sincronización (products/signals.py): cualquier cambio de un producto, su
+inventario, sus imágenes, su marca o su categoría vacía los documentos
+afectados con invalidate_listings dentro de la misma transacción (nadie lee
+uno viejo después del commit). No se renderiza al escribir: los movimientos
+de stock son el camino caliente y muchos productos cambian varias veces antes
+de que alguien los mire. El documento que falta se renderiza y guarda en la
+primera lectura.
+
+Cada fila lleva un contador (version) que invalidate_listings incrementa, igual
+que Cart.totals_version: la lectura toma la versión antes de leer el producto
+y guarda solo si sigue igual. Una lectura que renderizó datos de antes de un
+cambio no pisa la invalidación aunque guarde después del commit.
+"""
+import json
+from urllib.parse import urlsplit
+
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from django.utils.encoding import iri_to_uri
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from backend.renderers import FastJSONRenderer
+
+from .models import Category, Product, ProductListing
+from .queries import category_children, product_queryset
+from .serializers import ProductSerializer
+
+SIZES = ("card", "detail")
+# Marcador del esquema+host en los documentos guardados (.invalid nunca resuelve)
+ORIGIN = "https://origin.tpop.invalid"
+
+_renderer = FastJSONRenderer()
+
+
+class _OriginRequest:
+    """
+    Lo único que usan los serializers del request: URLs absolutas, aquí con ORIGIN.
+    """
+
+    def build_absolute_uri(self, location):
+        bits = urlsplit(location)
+        if bits.scheme and bits.netloc:
+            return iri_to_uri(location)
+        return iri_to_uri(ORIGIN + location)
+
+
+def render(products):
+    """
+    {product_id: {"card": json, "detail": json}} de productos cargados con product_queryset.
+    """
+    context = {
+        "request": _OriginRequest(),
+        "category_children": category_children({p.category_id for p in products if p.category_id}),
+    }
+    documents = {product.id: {} for product in products}
+    for size in SIZES:
+        data = ProductSerializer(products, many=True, context={**context, "image_size": size}).data
+        for product, item in zip(products, data):
+            documents[product.id][size] = _renderer.render(item).decode()
+    return documents
+
+
+def create_listings(product_ids):
+    """
+    Filas sin documento para los productos que todavía no tienen una: el
+    UPDATE de invalidate_listings y el guardado de _store necesitan la fila.
+    """
+    ProductListing.objects.bulk_create(
+        [ProductListing(product_id=pk) for pk in product_ids], ignore_conflicts=True
+    )
+
+
+def _store(product_ids):
+    """
+    Renderiza y guarda los documentos, solo en las filas cuya versión no
+    cambió desde antes de leer los productos.
+    """
+    create_listings(product_ids)
+    versions = dict(
+        ProductListing.objects.filter(product_id__in=product_ids).values_list("product_id", "version")
+    )
+    products = list(product_queryset({}, is_staff=True).filter(id__in=product_ids))
+    documents = render(products)
+    if documents:
+        # Un solo UPDATE: cada fila con su documento y su condición de versión
+        current = Q()
+        for pk in documents:
+            current |= Q(product_id=pk, version=versions.get(pk))
+        ProductListing.objects.filter(current).update(
+            rendered_at=timezone.now(),
+            **{
+                size: Case(*(When(product_id=pk, then=Value(sizes[size])) for pk, sizes in documents.items()))
+                for size in SIZES
+            },
+        )
+    return documents
+
+
+def rebuild_listings(product_ids):
+    """
+    Regenera los documentos de esos productos (comando rebuild_product_listings).
+    """
+    return len(_store(list(product_ids)))
+
+
+def invalidate_listings(product_ids):
+    """
+    Vacía los documentos de esos productos e incrementa su versión; se
+    renderizan en la próxima lectura.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+
+    def clear(ids):
+        return ProductListing.objects.filter(product_id__in=ids).update(
+            card=None, detail=None, version=F("version") + 1
+        )
+
+    if clear(product_ids) < len(product_ids):
+        # Productos sin fila: se crea y se vuelve a invalidar, por si una
+        # lectura la creó (y tomó su versión) entre el UPDATE y el INSERT
+        missing = list(
+            Product.objects.filter(id__in=product_ids, listing__isnull=True).values_list("id", flat=True)
+        )
+        create_listings(missing)
+        clear(missing)
+
+
+def category_products(category_id, *parent_ids):
+    """
+    Ids de los productos que embeben la categoría: los suyos y los de sus
+    ancestros, que la llevan en children. parent_ids son los padres cuyo
+    subárbol cambió (el actual y el anterior si se movió).
+    """
+    category_ids = {category_id}
+    for parent_id in {pk for pk in parent_ids if pk is not None}:
+        row = Category.objects.filter(pk=parent_id).values_list(
+            "id", "parent_id", "parent__parent_id", "parent__parent__parent_id"
+        ).first()
+        category_ids.update(pk for pk in row or () if pk is not None)
+    return Product.objects.filter(category_id__in=category_ids).values_list("id", flat=True)
+
+
+def listing_documents(product_ids, size):
+    """
+    Documentos en el orden de product_ids, renderizando los que falten.
+    """
+    documents = {
+        pk: document
+        for pk, document in ProductListing.objects.filter(product_id__in=product_ids).values_list("product_id", size)
+        if document is not None
+    }
+    missing = [pk for pk in product_ids if pk not in documents]
+    if missing:
+        for pk, sizes in _store(missing).items():
+            documents[pk] = sizes[size]
+    return [documents[pk] for pk in product_ids if pk in documents]
+
+
+def product_document(pk, size, is_staff=False):
+    """
+    Documento de un producto visible para el usuario, o None (la vista responde el 404).
+    """
+    queryset = ProductListing.objects.filter(product_id=pk)
+    if not is_staff:
+        queryset = queryset.filter(product__is_active=True)
+    document = queryset.values_list(size, flat=True).first()
+    if document is None and product_queryset({}, is_staff).filter(pk=pk).exists():
+        document = _store([pk])[pk][size]
+    return document
+
+
+def can_splice(request):
+    """
+    Solo con el JSON compacto de DRF (no el navegador de la API ni ?indent).
+    """
+    renderer = getattr(request, "accepted_renderer", None)
+    return isinstance(renderer, JSONRenderer) and "indent" not in request.accepted_media_type
+
+
+class ListingResponse(Response):
+    """
+    Response de DRF con el cuerpo ya armado: no pasa por el renderer. data se
+    decodifica recién si alguien la pide (tests, logs).
+    """
+
+    def __init__(self, request, parts, **kwargs):
+        super().__init__(None, **kwargs)
+        origin = f"{request.scheme}://{request.get_host()}"
+        self._listing_content = "".join(parts).replace(ORIGIN, origin).encode()
+
+    @property
+    def data(self):
+        return json.loads(self._listing_content)
+
+    @data.setter
+    def data(self, value):
+        pass
+
+    @property
+    def rendered_content(self):
+        self["Content-Type"] = "application/json"
+        return self._listing_content
+
+
+def detail_response(request, document):
+    return ListingResponse(request, [document])
+
+
+def page_response(request, paginator, documents):
+    """
+    Mismo cuerpo que PageNumberPagination.get_paginated_response.
+    """
+    envelope = _renderer.render({
+        "count": paginator.page.paginator.count,
+        "next": paginator.get_next_link(),
+        "previous": paginator.get_previous_link(),
+    }).decode()
+    return ListingResponse(request, [envelope[:-1], ',"results":[', ",".join(documents), "]}"])
@@ -0,0 +1,277 @@
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.models import Product
+
+# (escenario, ruta WSGI/DRF, ruta ASGI/async)
+ENDPOINTS = (
+    ("products.list", "/api/products/", "/api/catalog/products/"),
+    ("products.detail", "/api/products/{id}/", "/api/catalog/products/{id}/"),
+    ("products.search", "/api/products/search/?q={word}", "/api/catalog/products/search/?q={word}"),
+    ("categories.tree", "/api/categories/tree/", "/api/catalog/categories/tree/"),
+    ("brands.list", "/api/brands/", "/api/catalog/brands/"),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el catálogo servido por gunicorn (WSGI, workers sync) contra "
+        "uvicorn (ASGI, vistas async) con la misma cantidad de workers: "
+        "p50/p99, requests por segundo y errores a distintas concurrencias"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument(
+            "--concurrency",
+            default="10,50,200",
+            help="Conexiones simultáneas a probar, separadas por coma",
+        )
+        parser.add_argument("--requests", type=int, default=500, help="Requests por escenario y concurrencia")
+        parser.add_argument(
+            "--slow-clients",
+            type=int,
+            default=0,
+            help="Conexiones que envían sus headers muy lento durante la prueba (ocupan un worker sync cada una)",
+        )
+        parser.add_argument("--only", help="Solo escenarios cuyo nombre contenga este texto")
+        parser.add_argument("--timeout", type=float, default=10.0, help="Segundos máximos por request")
+        parser.add_argument("--output", default="asgi_benchmark.json")
+
+    def handle(self, *args, **options):
+        sample = Product.objects.filter(is_active=True).order_by("id").first()
+        if sample is None:
+            raise CommandError("No hay productos: corre primero manage.py seed_benchmark_data")
+
+        try:
+            concurrency = [int(c) for c in options["concurrency"].split(",")]
+        except ValueError:
+            raise CommandError("--concurrency debe ser una lista de enteros, ej. 10,50,200")
+
+        # La línea del request va codificada (uvicorn rechaza "Válvula" sin escapar)
+        values = {"id": sample.id, "word": quote(sample.name.split()[0])}
+        endpoints = [
+            (name, wsgi.format(**values), asgi.format(**values))
+            for name, wsgi, asgi in ENDPOINTS
+            if not options["only"] or options["only"] in name
+        ]
+
+        servers = {
+            "wsgi": [
+                sys.executable, "-m", "gunicorn", "backend.wsgi:application",
+                "--workers", str(options["workers"]), "--log-level", "warning",
+            ],
+            "asgi": [
+                sys.executable, "-m", "uvicorn", "backend.asgi:application",
+                "--workers", str(options["workers"]), "--log-level", "warning", "--no-access-log",
+            ],
+        }
+
+        results = {}
+        for mode, command in servers.items():
+            port = self.free_port()
+            bind = ["--bind", f"127.0.0.1:{port}"] if mode == "wsgi" else ["--host", "127.0.0.1", "--port", str(port)]
+            self.stdout.write(f"\n▶ {mode}: {' '.join(command[2:4])} con {options['workers']} workers")
+
+            with self.server(command + bind, port):
+                for name, wsgi_path, asgi_path in endpoints:
+                    path = wsgi_path if mode == "wsgi" else asgi_path
+                    for level in concurrency:
+                        r = asyncio.run(self.load(port, path, level, options))
+                        results[f"{mode} {name} c={level}"] = r
+                        self.stdout.write(
+                            f"{mode} {name:18} c={level:<4} p50 {r['p50_ms']:8.2f} ms  p99 {r['p99_ms']:8.2f} ms  "
+                            f"{r['rps']:8.1f} req/s  errores {r['errors']}"
+                        )
+
+        report = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "workers": options["workers"],
+                "requests": options["requests"],
+                "slow_clients": options["slow_clients"],
+                "products": Product.objects.count(),
+            },
+            "results": results,
+        }
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+        self.summary(results, endpoints, concurrency)
+        self.stdout.write(self.style.SUCCESS(f"✅ Resultados guardados en {options['output']}"))
+
+    ########################################################################################
+    # SERVIDORES
+    ########################################################################################
+
+    def free_port(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            return s.getsockname()[1]
+
+    @contextmanager
+    def server(self, command, port):
+        # Mismo entorno (DATABASE_URL, settings) que este proceso
+        process = subprocess.Popen(command, env=os.environ.copy())
+        try:
+            self.wait_until_ready(process, port)
+            yield process
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def wait_until_ready(self, process, port, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"El servidor terminó al arrancar (código {process.returncode})")
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        process.kill()
+        raise CommandError("El servidor no empezó a escuchar a tiempo")
+
+    ########################################################################################
+    # CARGA
+    ########################################################################################
+
+    async def load(self, port, path, concurrency, options):
+        """
+        `concurrency` conexiones keep-alive hacen en total `--requests` GETs.
+        Si el servidor cierra la conexión (gunicorn sync no hace keep-alive)
+        se abre otra, y ese costo cuenta en la latencia como para un cliente real.
+        """
+        remaining = options["requests"]
+        latencies = []
+        errors = 0
+
+        async def client():
+            nonlocal remaining, errors
+            conn = None
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    if conn is None:
+                        conn = await asyncio.open_connection("127.0.0.1", port)
+                    status, keep_alive = await asyncio.wait_for(
+                        self.get(conn, path), options["timeout"]
+                    )
+                    if status != 200:
+                        errors += 1
+                    else:
+                        latencies.append(time.perf_counter() - start)
+                    if not keep_alive:
+                        conn[1].close()
+                        conn = None
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                    errors += 1
+                    if conn is not None:
+                        conn[1].close()
+                        conn = None
+            if conn is not None:
+                conn[1].close()
+
+        slow = [asyncio.create_task(self.slow_client(port, path)) for _ in range(options["slow_clients"])]
+        # Los clientes lentos ya ocupan su worker antes de empezar a medir
+        await asyncio.sleep(0.5 if slow else 0)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        for task in slow:
+            task.cancel()
+        await asyncio.gather(*slow, return_exceptions=True)
+
+        latencies.sort()
+        if not latencies:
+            return {"p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0, "rps": 0.0, "ok": 0, "errors": errors}
+        return {
+            "p50_ms": round(statistics.median(latencies) * 1000, 2),
+            "p99_ms": round(latencies[min(int(0.99 * len(latencies)), len(latencies) - 1)] * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2),
+            "rps": round(len(latencies) / elapsed, 1),
+            "ok": len(latencies),
+            "errors": errors,
+        }
+
+    async def get(self, conn, path):
+        reader, writer = conn
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: keep-alive\r\n\r\n".encode()
+        )
+        await writer.drain()
+
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split()[1])
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip().lower()
+
+        if "content-length" in headers:
+            await reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await reader.read()
+            return status, False
+
+        return status, headers.get("connection") != "close"
+
+    async def slow_client(self, port, path):
+        """
+        Cliente lento (red móvil mala): manda un header por segundo y nunca termina.
+        """
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n".encode())
+            await writer.drain()
+            i = 0
+            while True:
+                await asyncio.sleep(1)
+                writer.write(f"X-Slow-{i}: 1\r\n".encode())
+                await writer.drain()
+                i += 1
+        except OSError:
+            pass
+        finally:
+            if "writer" in locals():
+                writer.close()
+
+    def summary(self, results, endpoints, concurrency):
+        self.stdout.write("\nWSGI → ASGI (p99 y req/s):")
+        for name, _, _ in endpoints:
+            for level in concurrency:
+                wsgi = results.get(f"wsgi {name} c={level}")
+                asgi = results.get(f"asgi {name} c={level}")
+                if not wsgi or not asgi:
+                    continue
+                self.stdout.write(
+                    f"{name:18} c={level:<4} p99 {wsgi['p99_ms']:8.2f} → {asgi['p99_ms']:8.2f} ms   "
+                    f"{wsgi['rps']:8.1f} → {asgi['rps']:8.1f} req/s   "
+                    f"errores {wsgi['errors']} → {asgi['errors']}"
+                )
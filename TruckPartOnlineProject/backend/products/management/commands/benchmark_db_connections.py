@@ -0,0 +1,174 @@
+import importlib.util
+import json
+import logging
+import statistics
+import time
+from datetime import datetime, timezone
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from backend.metrics import registry
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide p50/p95 de lecturas chicas del catálogo abriendo una conexión por "
+        "request, con conexiones persistentes y (en Postgres con psycopg 3) con "
+        "el pool, para ver cuánto del p50 es solo conectarse a la base"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=200, help="Requests por escenario y modo")
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--max-age", type=int, default=600, help="CONN_MAX_AGE del modo persistente")
+        parser.add_argument("--output", default="db_connections_benchmark.json")
+
+    def handle(self, *args, **options):
+        sample = Product.objects.filter(is_active=True).order_by("id").first()
+        if sample is None:
+            raise CommandError("No hay productos: corre primero manage.py seed_benchmark_data")
+
+        scenarios = (
+            ("products.detail", f"/api/products/{sample.id}/"),
+            ("brands.list", "/api/brands/"),
+        )
+
+        try:
+            setup_test_environment()
+            own_environment = True
+        except RuntimeError:
+            own_environment = False
+
+        settings_dict = connection.settings_dict
+        original = {
+            "CONN_MAX_AGE": settings_dict["CONN_MAX_AGE"],
+            "CONN_HEALTH_CHECKS": settings_dict["CONN_HEALTH_CHECKS"],
+            "OPTIONS": dict(settings_dict["OPTIONS"]),
+        }
+
+        logging.disable(logging.WARNING)
+        results = {}
+        try:
+            for mode, overrides in self.modes(options):
+                self.stdout.write(f"\n▶ {mode}")
+                self.configure(settings_dict, overrides)
+                for name, url in scenarios:
+                    r = self.measure(url, options)
+                    results[f"{mode} {name}"] = r
+                    self.stdout.write(
+                        f"{name:16} p50 {r['p50_ms']:7.2f} ms  p95 {r['p95_ms']:7.2f} ms  "
+                        f"conexiones abiertas {r['connections_opened']:4}  "
+                        f"conectar {r['connect_ms_per_request']:.3f} ms/request"
+                    )
+        finally:
+            logging.disable(logging.NOTSET)
+            self.configure(settings_dict, original)
+            if own_environment:
+                teardown_test_environment()
+
+        report = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "database": connection.vendor,
+                "django": django.get_version(),
+                "repeat": options["repeat"],
+            },
+            "results": results,
+        }
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+        self.summary(results, scenarios)
+        self.stdout.write(self.style.SUCCESS(f"✅ Resultados guardados en {options['output']}"))
+
+    ########################################################################################
+    # MODOS
+    ########################################################################################
+
+    def modes(self, options):
+        options_without_pool = {k: v for k, v in connection.settings_dict["OPTIONS"].items() if k != "pool"}
+
+        modes = [
+            ("sin_persistencia", {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False, "OPTIONS": options_without_pool}),
+            ("persistente", {
+                "CONN_MAX_AGE": options["max_age"],
+                "CONN_HEALTH_CHECKS": True,
+                "OPTIONS": options_without_pool,
+            }),
+        ]
+
+        # El pool de Django solo existe para Postgres con psycopg 3
+        if connection.vendor == "postgresql" and importlib.util.find_spec("psycopg_pool"):
+            modes.append(("pool", {
+                "CONN_MAX_AGE": 0,
+                "CONN_HEALTH_CHECKS": True,
+                "OPTIONS": {**options_without_pool, "pool": {"min_size": 1, "max_size": 2}},
+            }))
+        else:
+            self.stdout.write("ℹ️ Modo pool omitido: requiere Postgres y psycopg[pool]")
+
+        return modes
+
+    def configure(self, settings_dict, overrides):
+        """
+        Cambia la configuración de la conexión 'default' de este proceso y
+        descarta la conexión (y el pool) actuales para que tome efecto.
+        """
+        connection.close()
+        if getattr(connection, "pool", None) is not None:
+            connection.close_pool()
+        settings_dict.update(overrides)
+
+    ########################################################################################
+    # MEDICIÓN
+    ########################################################################################
+
+    def measure(self, url, options):
+        """
+        Igual que el handler de Django: close_old_connections al empezar y al
+        terminar cada request (el test client desconecta esas señales, por eso
+        se llaman a mano). Con CONN_MAX_AGE=0 eso cierra la conexión siempre.
+        """
+        client = APIClient()
+
+        def request():
+            close_old_connections()
+            start = time.perf_counter()
+            response = client.get(url)
+            elapsed = time.perf_counter() - start
+            close_old_connections()
+            if response.status_code != 200:
+                raise CommandError(f"{url} respondió {response.status_code}")
+            return elapsed
+
+        for _ in range(options["warmup"]):
+            request()
+
+        before = dict(registry.connects[connection.alias])
+        timings = sorted(request() for _ in range(options["repeat"]))
+        after = registry.connects[connection.alias]
+
+        opened = after["count"] - before["count"]
+        return {
+            "p50_ms": round(statistics.median(timings) * 1000, 3),
+            "p95_ms": round(timings[min(int(0.95 * len(timings)), len(timings) - 1)] * 1000, 3),
+            "connections_opened": opened,
+            "connect_ms_per_request": round((after["seconds"] - before["seconds"]) * 1000 / len(timings), 3),
+        }
+
+    def summary(self, results, scenarios):
+        self.stdout.write("\np50 respecto a una conexión por request:")
+        for name, _ in scenarios:
+            base = results[f"sin_persistencia {name}"]["p50_ms"]
+            for mode in ("persistente", "pool"):
+                r = results.get(f"{mode} {name}")
+                if r is None:
+                    continue
+                self.stdout.write(
+                    f"{name:16} {mode:12} {base:7.2f} → {r['p50_ms']:7.2f} ms ({r['p50_ms'] - base:+.2f} ms)"
+                )
@@ -0,0 +1,74 @@
+import statistics
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from backend.renderers import FastJSONParser, FastJSONRenderer
+from orders.models import Order
+from orders.serializers import OrderSerializer
+from products.listings import _OriginRequest
+from products.models import Product
+from products.queries import category_children, product_queryset
+from products.serializers import ProductSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el renderer/parser JSON de DRF con los de backend/renderers.py "
+        "sobre una página de productos y una de órdenes (datos de seed_benchmark_data) "
+        "y verifica que los bytes sean idénticos"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=50, help="Mediciones por caso")
+        parser.add_argument("--page-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        if not Product.objects.exists():
+            raise CommandError("No hay productos: corre primero manage.py seed_benchmark_data")
+
+        size = options["page_size"]
+        products = list(product_queryset({}, is_staff=True)[:size])
+        orders = OrderSerializer.setup_eager_loading(Order.objects.order_by("-created_at"))[:size]
+        payloads = {
+            "products.list": ProductSerializer(products, many=True, context={
+                "request": _OriginRequest(),
+                "category_children": category_children({p.category_id for p in products if p.category_id}),
+                "image_size": "card",
+            }).data,
+            "orders.list": OrderSerializer(orders, many=True).data,
+        }
+
+        drf_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+        drf_parser, fast_parser = JSONParser(), FastJSONParser()
+
+        for name, data in payloads.items():
+            body = drf_renderer.render(data)
+            if fast_renderer.render(data) != body:
+                raise CommandError(f"{name}: FastJSONRenderer no produce los mismos bytes")
+            if fast_parser.parse(BytesIO(body)) != drf_parser.parse(BytesIO(body)):
+                raise CommandError(f"{name}: FastJSONParser no produce los mismos datos")
+
+            render = [self.measure(lambda r=r: r.render(data), options["repeat"]) for r in (drf_renderer, fast_renderer)]
+            parse = [
+                self.measure(lambda p=p: p.parse(BytesIO(body)), options["repeat"])
+                for p in (drf_parser, fast_parser)
+            ]
+            self.stdout.write(
+                f"{name} ({len(data)} items, {len(body) / 1024:.0f} KiB): "
+                f"render {render[0]:.2f} → {render[1]:.2f} ms (x{render[0] / render[1]:.1f}), "
+                f"parse {parse[0]:.2f} → {parse[1]:.2f} ms (x{parse[0] / parse[1]:.1f})"
+            )
+
+        self.stdout.write(self.style.SUCCESS("✅ Mismos bytes en todos los casos"))
+
+    def measure(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,103 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from inventory.models import Inventory, InventoryMovement
+from orders.models import Order
+from products.models import Product
+from products.views import ProductViewSet
+
+
+def _product_list_queryset(params):
+    """
+    Construye el queryset real de ProductViewSet.list para los parámetros dados,
+    así el plan refleja exactamente lo que ejecuta el endpoint.
+    """
+    view = ProductViewSet()
+    view.action = "list"
+    view.format_kwarg = None
+    django_request = APIRequestFactory().get("/api/products/", params)
+    django_request.user = AnonymousUser()
+    view.request = Request(django_request)
+    return view.get_queryset()
+
+
+class Command(BaseCommand):
+    help = "Imprime los planes EXPLAIN de las consultas de los endpoints más usados"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Ejecuta EXPLAIN ANALYZE (solo PostgreSQL)",
+        )
+        parser.add_argument(
+            "--only",
+            help="Nombre (o parte del nombre) de la consulta a explicar",
+        )
+
+    def get_hot_queries(self):
+        user_id = Order.objects.exclude(user=None).values_list("user_id", flat=True).first() or 1
+        intent = (
+            Order.objects.exclude(stripe_payment_intent=None)
+            .values_list("stripe_payment_intent", flat=True)
+            .first()
+            or "pi_missing"
+        )
+        inventory_id = Inventory.objects.values_list("id", flat=True).first() or 1
+
+        return [
+            ("products.list (default)", _product_list_queryset({})),
+            ("products.list ordering=price", _product_list_queryset({"ordering": "price"})),
+            ("products.list ordering=name", _product_list_queryset({"ordering": "name"})),
+            ("products.list search", _product_list_queryset({"search": "filtro"})),
+            (
+                "products.list brands+price",
+                _product_list_queryset({"brands": "1,2", "min_price": "10", "max_price": "500"}),
+            ),
+            (
+                "products.search",
+                Product.objects.filter(is_active=True, name__icontains="filtro").order_by("name")[:10],
+            ),
+            (
+                "orders.my_orders",
+                Order.objects.filter(user_id=user_id).order_by("-created_at"),
+            ),
+            (
+                "orders.admin_orders_list",
+                Order.objects.filter(status="pending", payment_status="pending").order_by("-created_at")[:20],
+            ),
+            (
+                "orders.stripe_webhook charge.refunded",
+                Order.objects.filter(stripe_payment_intent=intent),
+            ),
+            (
+                "inventory.movements",
+                InventoryMovement.objects.filter(inventory_id=inventory_id).order_by("-created_at")[:25],
+            ),
+            (
+                "inventory.list in_stock=true",
+                Inventory.objects.select_related("product").filter(quantity__gt=0),
+            ),
+        ]
+
+    def handle(self, *args, **options):
+        explain_options = {}
+        if options["analyze"]:
+            if connection.vendor != "postgresql":
+                self.stdout.write(self.style.WARNING("--analyze solo está soportado en PostgreSQL, se ignora"))
+            else:
+                explain_options = {"analyze": True, "buffers": True}
+
+        only = options.get("only")
+
+        for name, queryset in self.get_hot_queries():
+            if only and only not in name:
+                continue
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"=== {name} ==="))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write("")
@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.models import Brand, ProductImage
+from products.services.images import IMAGE_FIELDS, WORKERS, generate_many
+
+MODELS = {
+    "products": ProductImage,
+    "brands": Brand,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las versiones thumb/card/detail (WebP y JPEG) de las imágenes "
+        "que todavía no las tienen o cuyo archivo cambió, con un pool de hilos. "
+        "Las imágenes nuevas se generan solas al guardarse; correrlo como tarea "
+        "programada retoma las que fallaron o quedaron en cola al reiniciar"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=WORKERS)
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--only", choices=sorted(MODELS), help="Solo un tipo de imagen")
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenera todas (ej. después de cambiar tamaños o calidad)",
+        )
+
+    def handle(self, *args, **options):
+        models = [MODELS[options["only"]]] if options["only"] else list(MODELS.values())
+        started = time.monotonic()
+        done = errors = 0
+
+        for model in models:
+            pending = self.pending(model, options["force"])
+            self.stdout.write(f"▶ {model.__name__}: {len(pending)} pendiente(s)")
+
+            # Se leen de a lotes por id: los hilos escriben mientras tanto
+            for i in range(0, len(pending), options["batch_size"]):
+                batch = model.objects.filter(pk__in=pending[i:i + options["batch_size"]]).order_by("pk")
+                for instance, _, error in generate_many(list(batch), options["workers"], options["force"]):
+                    if error is None:
+                        done += 1
+                    else:
+                        errors += 1
+                        self.stderr.write(f"❌ {model.__name__} {instance.pk}: {error}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {done} imagen(es) procesadas, {errors} error(es) en {time.monotonic() - started:.1f}s"
+        ))
+
+    def pending(self, model, force):
+        """
+        Ids con imagen y sin versiones del archivo actual (se compara en Python:
+        solo lee nombre y JSON, no abre archivos).
+        """
+        image_field, _, derivatives_field = IMAGE_FIELDS[model]
+        rows = (
+            model.objects.exclude(**{image_field: ""})
+            .exclude(**{f"{image_field}__isnull": True})
+            .values_list("pk", image_field, derivatives_field)
+            .order_by("pk")
+        )
+        return [
+            pk for pk, name, derivatives in rows.iterator()
+            if force or (derivatives or {}).get("source") != name
+        ]
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.listings import rebuild_listings
+from products.models import Product, ProductListing
+
+
+class Command(BaseCommand):
+    help = (
+        "Regenera los documentos JSON de ProductListing (listado y detalle) de "
+        "todos los productos, por lotes. Útil después de un deploy que cambia "
+        "los serializers o de cargas masivas con bulk_create"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Solo los productos que todavía no tienen documento",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        products = Product.objects.order_by("id")
+        if options["missing"]:
+            products = products.exclude(
+                id__in=ProductListing.objects.filter(card__isnull=False).values("product_id")
+            )
+        ids = list(products.values_list("id", flat=True))
+
+        done = 0
+        for i in range(0, len(ids), options["batch_size"]):
+            done += rebuild_listings(ids[i:i + options["batch_size"]])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {done} documento(s) regenerados en {time.monotonic() - started:.1f}s"
+        ))
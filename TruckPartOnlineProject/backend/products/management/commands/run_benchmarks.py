@@ -0,0 +1,315 @@
+import itertools
+import json
+import logging
+import statistics
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from inventory.models import Inventory, InventoryMovement
+from orders.models import Order, OrderItem
+from orders.stripe_events import enqueue_event, process_event
+from products.models import Brand, Product
+
+User = get_user_model()
+
+ORDERINGS = ("price", "-price", "name", "-name")
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide p50/p95 y queries de los endpoints más usados sobre los datos de "
+        "seed_benchmark_data, guarda el resultado en JSON y lo compara con un baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="Mediciones por escenario")
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--only", help="Solo escenarios cuyo nombre contenga este texto")
+        parser.add_argument("--output", default="benchmark_results.json")
+        parser.add_argument("--baseline", help="JSON de una corrida anterior para comparar")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.20,
+            help="Regresión permitida en p95 respecto al baseline (0.20 = 20%%)",
+        )
+        parser.add_argument(
+            "--fail-on-regression",
+            action="store_true",
+            help="Termina con error si algún escenario empeora (útil en CI)",
+        )
+
+    def handle(self, *args, **options):
+        if not Product.objects.exists():
+            raise CommandError("No hay productos: corre primero manage.py seed_benchmark_data")
+
+        # Test client sin red: ALLOWED_HOSTS con testserver y email en memoria
+        try:
+            setup_test_environment()
+            own_environment = True
+        except RuntimeError:
+            # Ya estamos dentro del test runner
+            own_environment = False
+
+        # Los logs INFO/WARNING (ej. avisos de N+1) no se imprimen durante la medición
+        logging.disable(logging.WARNING)
+        try:
+            results = self.run(options)
+        finally:
+            logging.disable(logging.NOTSET)
+            if own_environment:
+                teardown_test_environment()
+
+        report = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "database": connection.vendor,
+                "django": django.get_version(),
+                "repeat": options["repeat"],
+                "products": Product.objects.count(),
+                "movements": InventoryMovement.objects.count(),
+                "orders": Order.objects.count(),
+            },
+            "results": results,
+        }
+
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        self.stdout.write(self.style.SUCCESS(f"✅ Resultados guardados en {options['output']}"))
+
+        if options["baseline"]:
+            regressions = self.compare(options["baseline"], results, options["tolerance"])
+            if regressions and options["fail_on_regression"]:
+                raise CommandError(f"{len(regressions)} escenario(s) con regresión")
+
+    ########################################################################################
+    # ESCENARIOS
+    ########################################################################################
+
+    def scenarios(self):
+        """
+        Lista de (nombre, función que hace un request) sobre datos reales de la base.
+        """
+        admin, _ = User.objects.get_or_create(
+            username="bench-admin",
+            defaults={"email": "bench-admin@example.com", "is_staff": True, "is_active": True},
+        )
+        anonymous = APIClient()
+        staff = APIClient()
+        staff.force_authenticate(admin)
+
+        sample = (
+            Product.objects.filter(is_active=True, category__level="piece", brand__isnull=False)
+            .select_related("category__parent__parent__parent")
+            .order_by("id")
+            .first()
+        )
+        if sample is None:
+            raise CommandError("Se necesitan productos con marca y categoría de nivel pieza")
+
+        piece = sample.category
+        # Filtros del listado: se combinan de a uno y de a dos, más todos juntos
+        filters = {
+            "search": {"search": sample.name.split()[0]},
+            "brands": {"brands": ",".join(str(i) for i in Brand.objects.values_list("id", flat=True)[:3])},
+            "piece": {"piece": str(piece.id)},
+            "system": {"system": str(piece.parent_id)},
+            "subcategory": {"subcategory": str(piece.parent.parent_id)},
+            "category": {"category": str(piece.parent.parent.parent_id)},
+            "min_price": {"min_price": "50"},
+            "max_price": {"max_price": "1500"},
+        }
+
+        def get(client, url, params=None):
+            return lambda: client.get(url, params or {})
+
+        scenarios = [("products.list", get(anonymous, "/api/products/"))]
+
+        for ordering in ORDERINGS:
+            scenarios.append((f"products.list ordering={ordering}", get(anonymous, "/api/products/", {"ordering": ordering})))
+
+        for size in (1, 2):
+            for combo in itertools.combinations(filters, size):
+                params = {k: v for name in combo for k, v in filters[name].items()}
+                scenarios.append((f"products.list {'+'.join(combo)}", get(anonymous, "/api/products/", params)))
+
+        all_filters = {k: v for params in filters.values() for k, v in params.items()}
+        scenarios.append(("products.list all_filters", get(anonymous, "/api/products/", all_filters)))
+
+        scenarios += [
+            ("products.search", get(anonymous, "/api/products/search/", {"q": sample.name.split()[0]})),
+            ("products.detail", get(anonymous, f"/api/products/{sample.id}/")),
+            ("brands.list", get(anonymous, "/api/brands/")),
+            ("categories.tree", get(anonymous, "/api/categories/tree/")),
+        ]
+
+        busiest_inventory = (
+            Inventory.objects.annotate(n=Count("movements")).order_by("-n").values_list("id", flat=True).first()
+        )
+        if busiest_inventory:
+            scenarios.append((
+                "inventory.movements",
+                get(staff, f"/api/inventory/{busiest_inventory}/movements/"),
+            ))
+
+        busiest_user = (
+            Order.objects.exclude(user=None).values("user_id")
+            .annotate(n=Count("id")).order_by("-n").values_list("user_id", flat=True).first()
+        )
+        if busiest_user:
+            customer = APIClient()
+            customer.force_authenticate(User.objects.get(id=busiest_user))
+            scenarios.append(("orders.my_orders", get(customer, "/api/my-orders/")))
+        scenarios.append(("orders.admin_list", get(staff, "/api/admin/orders/")))
+
+        # Escenarios que escriben: cada medición corre en una transacción que se revierte
+        in_stock = list(
+            Product.objects.filter(is_active=True, inventory__quantity__gte=50)
+            .order_by("id").values_list("id", flat=True)[:3]
+        )
+        if in_stock:
+            checkout_body = {
+                "full_name": "Benchmark",
+                "guest_email": "bench@example.com",
+                "items": [{"product_id": product_id, "quantity": 1} for product_id in in_stock],
+            }
+            scenarios += [
+                ("checkout.cod", self.rolled_back(lambda: anonymous.post(
+                    "/api/checkout/", {**checkout_body, "payment_method": "cod"}, format="json"
+                ))),
+                ("checkout.card", self.rolled_back(lambda: anonymous.post(
+                    "/api/checkout/", {**checkout_body, "payment_method": "card"}, format="json"
+                ))),
+                ("stripe.webhook_ack", self.rolled_back(self.webhook_ack(anonymous, in_stock))),
+                ("stripe.webhook_process", self.rolled_back(self.webhook_process(in_stock))),
+            ]
+
+        return scenarios
+
+    def rolled_back(self, func):
+        def run():
+            with transaction.atomic():
+                result = func()
+                transaction.set_rollback(True)
+            return result
+        return run
+
+    def card_order(self, product_ids):
+        products = list(Product.objects.filter(id__in=product_ids))
+        order = Order.objects.create(full_name="Benchmark", payment_method="card")
+        for product in products:
+            OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+        order.subtotal = sum(p.price for p in products)
+        order.save()
+        return order
+
+    def payment_event(self, order, event_id):
+        return {
+            "id": event_id,
+            "type": "payment_intent.succeeded",
+            "created": int(time.time()),
+            "data": {"object": {
+                "id": f"pi_{event_id}",
+                "amount": int(order.total * 100),
+                "currency": "usd",
+                "metadata": {"order_id": str(order.id)},
+            }},
+        }
+
+    def webhook_ack(self, client, product_ids):
+        def run():
+            order = self.card_order(product_ids)
+            event = self.payment_event(order, f"evt_bench_ack_{order.id}")
+            with patch("orders.views.stripe.Webhook.construct_event", return_value=event):
+                return client.post(
+                    "/api/stripe/webhook/", json.dumps(event),
+                    content_type="application/json", HTTP_STRIPE_SIGNATURE="bench",
+                )
+        return run
+
+    def webhook_process(self, product_ids):
+        def run():
+            order = self.card_order(product_ids)
+            stripe_event, _ = enqueue_event(self.payment_event(order, f"evt_bench_{order.id}"))
+            return process_event(stripe_event)
+        return run
+
+    ########################################################################################
+    # MEDICIÓN
+    ########################################################################################
+
+    def run(self, options):
+        fake_intent = SimpleNamespace(id="pi_bench", client_secret="pi_bench_secret")
+        results = {}
+
+        # Sin red: Stripe y QuickBooks se reemplazan por respuestas fijas
+        with patch("orders.views.stripe.PaymentIntent.create", return_value=fake_intent), \
+                patch("orders.stripe_events.create_sales_receipt", return_value=None):
+            for name, request in self.scenarios():
+                if options["only"] and options["only"] not in name:
+                    continue
+                results[name] = self.measure(request, options["repeat"], options["warmup"])
+                r = results[name]
+                self.stdout.write(
+                    f"{name:55} p50 {r['p50_ms']:8.2f} ms  p95 {r['p95_ms']:8.2f} ms  "
+                    f"{r['queries']:3} queries  [{r['status']}]"
+                )
+        return results
+
+    def measure(self, request, repeat, warmup):
+        for _ in range(warmup):
+            request()
+
+        # Las queries se cuentan en una corrida aparte para no sumar el costo de capturarlas
+        with CaptureQueriesContext(connection) as ctx:
+            response = request()
+        queries = len(ctx.captured_queries)
+
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            request()
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+
+        return {
+            "p50_ms": round(statistics.median(samples), 3),
+            "p95_ms": round(samples[min(int(0.95 * len(samples)), len(samples) - 1)], 3),
+            "mean_ms": round(statistics.fmean(samples), 3),
+            "queries": queries,
+            "status": getattr(response, "status_code", getattr(response, "status", None)),
+        }
+
+    def compare(self, baseline_path, results, tolerance):
+        with open(baseline_path) as f:
+            baseline = json.load(f)["results"]
+
+        regressions = []
+        self.stdout.write(f"\nComparación con {baseline_path} (tolerancia p95 {tolerance:.0%}):")
+        for name, current in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+
+            change = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] if previous["p95_ms"] else 0
+            worse = change > tolerance or current["queries"] > previous["queries"]
+            line = (
+                f"{name:55} p95 {previous['p95_ms']:8.2f} → {current['p95_ms']:8.2f} ms ({change:+.0%})  "
+                f"queries {previous['queries']} → {current['queries']}"
+            )
+            if worse:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        return regressions
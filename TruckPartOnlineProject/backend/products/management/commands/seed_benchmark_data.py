@@ -0,0 +1,227 @@
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from inventory.models import Inventory, InventoryMovement, movement_type_for
+from orders.models import Order, OrderItem
+from products.models import Brand, Category, Product
+
+User = get_user_model()
+
+# Prefijos para reconocer (y borrar con --reset) los datos del benchmark
+PREFIX = "BENCH"
+
+# Árbol completo: categoría → subcategoría → sistema → pieza
+TAXONOMY_SHAPE = (("category", 12), ("subcategory", 6), ("system", 5), ("piece", 8))
+
+WORDS = (
+    "Filtro", "Bomba", "Sensor", "Válvula", "Manguera", "Junta", "Correa", "Rodamiento",
+    "Soporte", "Kit", "Radiador", "Freno", "Embrague", "Turbo", "Inyector", "Alternador",
+)
+QUALIFIERS = ("aceite", "aire", "combustible", "agua", "hidráulico", "trasero", "delantero", "HD")
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera un catálogo grande y reproducible para los benchmarks "
+        "(default: 100k productos, 1M movimientos, 500k órdenes)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--movements", type=int, default=1_000_000)
+        parser.add_argument("--orders", type=int, default=500_000)
+        parser.add_argument("--brands", type=int, default=200)
+        parser.add_argument("--users", type=int, default=500)
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="Multiplica todos los volúmenes (ej. 0.01 para una corrida rápida)",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Borra los datos de benchmark existentes antes de generar",
+        )
+
+    def handle(self, *args, **options):
+        scale = options["scale"]
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+
+        if options["reset"]:
+            self.reset()
+
+        brands = self.create_brands(max(1, int(options["brands"] * scale)))
+        pieces = self.create_taxonomy()
+        users = self.create_users(max(1, int(options["users"] * scale)))
+        products, inventories = self.create_products(int(options["products"] * scale), brands, pieces)
+        self.create_movements(int(options["movements"] * scale), inventories)
+        self.create_orders(int(options["orders"] * scale), users, products)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(products)} productos, {len(inventories)} inventarios, "
+            f"{Order.objects.filter(full_name__startswith=PREFIX).count()} órdenes de benchmark"
+        ))
+
+    def chunks(self, objects):
+        for start in range(0, len(objects), self.batch_size):
+            yield objects[start:start + self.batch_size]
+
+    @transaction.atomic
+    def reset(self):
+        self.stdout.write(self.style.WARNING("Borrando datos de benchmark anteriores..."))
+        Order.objects.filter(full_name__startswith=PREFIX).delete()
+        Product.objects.filter(sku__startswith=f"{PREFIX}-").delete()
+        Category.objects.filter(name__startswith=PREFIX, parent=None).delete()
+        Brand.objects.filter(name__startswith=PREFIX).delete()
+        User.objects.filter(username__startswith=PREFIX.lower()).delete()
+
+    def create_brands(self, count):
+        brands = [Brand(name=f"{PREFIX} Marca {i}") for i in range(count)]
+        Brand.objects.bulk_create(brands, ignore_conflicts=True)
+        return list(Brand.objects.filter(name__startswith=PREFIX))
+
+    def create_taxonomy(self):
+        """
+        Crea el árbol nivel por nivel (un bulk_create por nivel) y retorna las piezas.
+        """
+        if Category.objects.filter(name__startswith=PREFIX, parent=None).exists():
+            return list(Category.objects.filter(level="piece", name__startswith=PREFIX))
+
+        parents = [None]
+        for level, per_parent in TAXONOMY_SHAPE:
+            nodes = [
+                Category(
+                    name=f"{PREFIX} {level} {parent.id if parent else 0}-{i}",
+                    level=level,
+                    parent=parent,
+                )
+                for parent in parents
+                for i in range(per_parent)
+            ]
+            parents = Category.objects.bulk_create(nodes, batch_size=self.batch_size)
+        return parents
+
+    def create_users(self, count):
+        users = [
+            User(username=f"{PREFIX.lower()}{i}", email=f"{PREFIX.lower()}{i}@example.com", is_active=True)
+            for i in range(count)
+        ]
+        User.objects.bulk_create(users, ignore_conflicts=True)
+        return list(User.objects.filter(username__startswith=PREFIX.lower()))
+
+    def create_products(self, count, brands, pieces):
+        start = Product.objects.filter(sku__startswith=f"{PREFIX}-").count()
+        products = [
+            Product(
+                name=f"{self.rng.choice(WORDS)} {self.rng.choice(QUALIFIERS)} {start + i}",
+                description="Producto generado para benchmarks",
+                price=Decimal(self.rng.randint(500, 500_000)) / 100,
+                brand=self.rng.choice(brands),
+                category=self.rng.choice(pieces),
+                sku=f"{PREFIX}-{start + i}",
+                is_active=self.rng.random() > 0.1,
+            )
+            for i in range(count)
+        ]
+
+        created = []
+        inventories = []
+        for chunk in self.chunks(products):
+            with transaction.atomic():
+                # bulk_create no dispara la señal que crea el Inventory
+                chunk = Product.objects.bulk_create(chunk)
+                inventories.extend(
+                    Inventory.objects.bulk_create([Inventory(product=p, quantity=0) for p in chunk])
+                )
+            created.extend(chunk)
+            self.stdout.write(f"   productos: {len(created)}/{count}")
+        return created, inventories
+
+    def create_movements(self, count, inventories):
+        """
+        Movimientos con el stock siempre >= 0; al final Inventory.quantity
+        queda igual a la suma de sus movimientos.
+        """
+        if not inventories:
+            return
+
+        stock = {inventory.id: inventory.quantity for inventory in inventories}
+        movements = []
+        created = 0
+
+        for _ in range(count):
+            inventory = self.rng.choice(inventories)
+            if stock[inventory.id] > 0 and self.rng.random() < 0.7:
+                change = -self.rng.randint(1, min(stock[inventory.id], 5))
+                reason = "Venta"
+            else:
+                change = self.rng.randint(5, 50)
+                reason = "Reabastecimiento"
+            stock[inventory.id] += change
+            movements.append(InventoryMovement(
+                inventory_id=inventory.id,
+                change=change,
+                movement_type=movement_type_for(change),
+                reason=reason,
+                reference=f"{PREFIX} {created}",
+            ))
+            created += 1
+
+            if len(movements) >= self.batch_size:
+                InventoryMovement.objects.bulk_create(movements)
+                movements = []
+                self.stdout.write(f"   movimientos: {created}/{count}")
+        InventoryMovement.objects.bulk_create(movements)
+
+        # bulk_create no dispara la señal que suma el movimiento al inventario
+        for inventory in inventories:
+            inventory.quantity = stock[inventory.id]
+        Inventory.objects.bulk_update(inventories, ["quantity"], batch_size=self.batch_size)
+
+    def create_orders(self, count, users, products):
+        active = [p for p in products if p.is_active] or products
+        statuses = ("pending", "invoiced", "completed", "completed", "completed", "failed")
+        done = 0
+
+        while done < count:
+            size = min(self.batch_size, count - done)
+            orders = []
+            lines = []
+            for _ in range(size):
+                user = self.rng.choice(users) if self.rng.random() < 0.7 else None
+                order_items = [
+                    (product, self.rng.randint(1, 4))
+                    for product in self.rng.sample(active, min(len(active), self.rng.randint(1, 4)))
+                ]
+                subtotal = sum((p.price * q for p, q in order_items), Decimal("0.00"))
+                orders.append(Order(
+                    user=user,
+                    full_name=f"{PREFIX} Cliente",
+                    guest_email=None if user else "guest@example.com",
+                    status=self.rng.choice(statuses),
+                    payment_method=self.rng.choice(("card", "cod")),
+                    subtotal=subtotal,
+                    tax=(subtotal * Decimal("0.07")).quantize(Decimal("0.01")),
+                ))
+                lines.append(order_items)
+
+            with transaction.atomic():
+                orders = Order.objects.bulk_create(orders)
+                OrderItem.objects.bulk_create(
+                    [
+                        OrderItem(order=order, product=product, quantity=quantity, price=product.price)
+                        for order, order_items in zip(orders, lines)
+                        for product, quantity in order_items
+                    ],
+                    batch_size=self.batch_size,
+                )
+            done += size
+            self.stdout.write(f"   órdenes: {done}/{count}")
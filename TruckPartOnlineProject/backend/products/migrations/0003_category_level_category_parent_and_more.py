@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-19 15:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_alter_product_price_alter_product_qb_item_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='level',
+            field=models.CharField(choices=[('category', 'Categoría'), ('subcategory', 'Subcategoría'), ('system', 'Sistema'), ('piece', 'Pieza')], default='category', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='products.category'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='clover_item_id',
+            field=models.CharField(blank=True, help_text='ID del Item en Clover', max_length=50, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='name',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='qb_id',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='category',
+            unique_together={('name', 'parent')},
+        ),
+        migrations.CreateModel(
+            name='CategoryImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(upload_to='categories/')),
+                ('is_main', models.BooleanField(default=False)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='products.category')),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-19 17:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_listing'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='categoryimage',
+            name='content_hash',
+        ),
+        migrations.RemoveField(
+            model_name='categoryimage',
+            name='derivatives',
+        ),
+    ]
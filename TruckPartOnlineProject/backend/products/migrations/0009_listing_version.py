@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-19 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_drop_category_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productlisting',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='productlisting',
+            name='card',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='productlisting',
+            name='detail',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 ########################################################################################
@@ -15,6 +16,9 @@ class Brand(models.Model):
         null=True,
         blank=True
     )
+    # Versiones redimensionadas del logo (products/services/images.py)
+    logo_hash = models.CharField(max_length=64, blank=True, default="")
+    logo_derivatives = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         return self.name
@@ -48,6 +52,13 @@ class Category(models.Model):
     class Meta:
         unique_together = ("name", "parent")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Padre tal como se leyó: si se mueve, cambian los documentos del padre anterior (products/signals.py)
+        instance._loaded_parent_id = instance.__dict__.get("parent_id")
+        return instance
+
     def __str__(self):
         return self.name
     
@@ -115,6 +126,36 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Listado de la tienda: siempre filtra is_active=True y ordena
+            # por created_at (default), price o name.
+            models.Index(
+                fields=["-created_at"],
+                name="product_active_created_idx",
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(
+                fields=["price"],
+                name="product_active_price_idx",
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(
+                fields=["name"],
+                name="product_active_name_idx",
+                condition=models.Q(is_active=True),
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Precio tal como se leyó, para detectar cambios al guardar (feed de cambios)
+        instance._loaded_price = instance.__dict__.get("price")
+        # Marca y estado tal como se leyeron: el listado de marcas depende de ellos (products/signals.py)
+        instance._loaded_listing = (instance.__dict__.get("brand_id"), instance.__dict__.get("is_active"))
+        return instance
+
     def __str__(self):
         return self.name
 
@@ -128,4 +169,44 @@ class ProductImage(models.Model):
     )
     image = models.ImageField(upload_to="products/")
     is_main = models.BooleanField(default=False)
+    # sha256 del original y sus versiones thumb/card/detail en WebP y JPEG
+    # (products/services/images.py)
+    content_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    derivatives = models.JSONField(default=dict, blank=True)
+
+#--------------------------------------------------------------------------------#
+
+class ProductListing(models.Model):
+    """
+    JSON ya renderizado de ProductSerializer para cada producto: card para el
+    listado y detail para el detalle (products/listings.py). Las señales de
+    products/signals.py lo invalidan y la lectura lo vuelve a renderizar;
+    manage.py rebuild_product_listings lo regenera completo.
+    """
+    product = models.OneToOneField(
+        Product,
+        primary_key=True,
+        related_name="listing",
+        on_delete=models.CASCADE
+    )
+    # None = hay que renderizar: cambió el producto, su inventario, imágenes, marca o categoría
+    card = models.TextField(null=True, blank=True)
+    detail = models.TextField(null=True, blank=True)
+    # Se incrementa al invalidar: un render que empezó antes no pisa la invalidación
+    version = models.PositiveBigIntegerField(default=0)
+    rendered_at = models.DateTimeField(auto_now=True)
+########################################################################################
+
+class CatalogVersion(models.Model):
+    """
+    Contador por sección del catálogo ("brands", "categories"), que no tienen
+    timestamps propios. Lo incrementan las señales de products/signals.py y
+    es el validador de los ETag de esas secciones (products/conditional.py).
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
 ########################################################################################
@@ -0,0 +1,125 @@
+from decimal import Decimal, InvalidOperation
+
+from .models import Category, Product
+
+ALLOWED_ORDERINGS = {
+    "price": "price",
+    "-price": "-price",
+    "name": "name",
+    "-name": "-name",
+    "-created_at": "-created_at",
+}
+
+
+def product_queryset(params, is_staff=False):
+    """
+    Queryset del catálogo con los filtros del listado. Lo comparten
+    ProductViewSet (WSGI) y las vistas async del catálogo (ASGI).
+    """
+    queryset = Product.objects.select_related(
+        "brand",
+        "category",
+        "inventory",
+        "category__parent",
+        "category__parent__parent",
+        "category__parent__parent__parent",
+    ).prefetch_related("images")
+
+    # Solo productos activos para usuarios no admin
+    if not is_staff:
+        queryset = queryset.filter(is_active=True)
+
+    # 🔍 BÚSQUEDA POR NOMBRE
+    if "search" in params:
+        queryset = queryset.filter(
+            name__icontains=params["search"]
+        )
+
+    # Filtro por Marca (soporta 'brands' o 'manufacturer')
+    brand_param = params.get("brands") or params.get("manufacturer")
+    if brand_param:
+        brand_ids = brand_param.split(",")
+        queryset = queryset.filter(brand_id__in=brand_ids)
+
+    # Filtro por Pieza (soporta múltiples IDs separados por coma)
+    if "piece" in params:
+        piece_ids = params["piece"].split(",")
+        queryset = queryset.filter(
+            category_id__in=piece_ids,
+            category__level="piece",
+        )
+
+    # Filtro por Sistema (soporta múltiples IDs separados por coma)
+    if "system" in params:
+        system_ids = params["system"].split(",")
+        queryset = queryset.filter(category__parent_id__in=system_ids)
+
+    # Filtro por Subcategoría (soporta múltiples IDs separados por coma)
+    if "subcategory" in params:
+        sub_ids = params["subcategory"].split(",")
+        queryset = queryset.filter(category__parent__parent_id__in=sub_ids)
+
+    # Filtro por Categoría principal (soporta múltiples IDs separados por coma)
+    if "category" in params:
+        cat_ids = params["category"].split(",")
+        queryset = queryset.filter(category__parent__parent__parent_id__in=cat_ids)
+
+    # Filtro por Precio mínimo
+    if "min_price" in params:
+        try:
+            queryset = queryset.filter(price__gte=Decimal(params["min_price"]))
+        except InvalidOperation:
+            pass
+
+    # Filtro por Precio máximo
+    if "max_price" in params:
+        try:
+            queryset = queryset.filter(price__lte=Decimal(params["max_price"]))
+        except InvalidOperation:
+            pass
+
+    # Ordenamiento (whitelist para evitar inyección de campos)
+    ordering_param = params.get("ordering")
+    if ordering_param and ordering_param in ALLOWED_ORDERINGS:
+        queryset = queryset.order_by(ALLOWED_ORDERINGS[ordering_param])
+    else:
+        queryset = queryset.order_by("-created_at")
+
+    return queryset.distinct()
+
+
+def _level_queryset(parent_ids):
+    return Category.objects.filter(parent_id__in=parent_ids).order_by("name")
+
+
+def _add_level(children, rows):
+    """
+    Agrega un nivel al mapa y retorna los ids del siguiente nivel.
+    """
+    for category in rows:
+        children.setdefault(category.parent_id, []).append(category)
+    return {category.id for category in rows} - children.keys()
+
+
+def category_children(parent_ids):
+    """
+    {parent_id: [hijos ordenados por nombre]} con todos los descendientes de
+    parent_ids, una query por nivel del árbol. Se pasa a CategorySerializer
+    como context["category_children"] para no hacer una query por nodo.
+    """
+    children = {}
+    level = set(parent_ids)
+    while level:
+        level = _add_level(children, list(_level_queryset(level)))
+    return children
+
+
+async def acategory_children(parent_ids):
+    """
+    Igual que category_children, con el ORM async.
+    """
+    children = {}
+    level = set(parent_ids)
+    while level:
+        level = _add_level(children, [category async for category in _level_queryset(level)])
+    return children
@@ -1,12 +1,20 @@
 from rest_framework import serializers
 from .models import Product, ProductImage, Brand, Category
+from .services.images import derivative_urls
 from inventory.serializers import InventorySerializer
 
 
 class BrandSerializer(serializers.ModelSerializer):
+    logo_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Brand
-        fields = ("id", "name", "logo")
+        fields = ("id", "name", "logo", "logo_variants")
+
+    def get_logo_variants(self, obj):
+        if not obj.logo:
+            return None
+        return derivative_urls(obj.logo_derivatives, obj.logo.name, obj.logo.storage, self.context.get("request"))
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -24,19 +32,53 @@ class CategorySerializer(serializers.ModelSerializer):
         ]
     
     def get_children(self, obj):
-        children = obj.children.all().order_by("name")
-        return CategorySerializer(children, many=True).data
+        # Con el mapa de products.queries.category_children no hay query por nodo
+        tree = self.context.get("category_children")
+        if tree is not None:
+            children = tree.get(obj.id, [])
+        else:
+            children = obj.children.all().order_by("name")
+        return CategorySerializer(children, many=True, context=self.context).data
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    """
+    image es el original. src es la versión JPEG del tamaño que usa la vista
+    (context["image_size"]: "card" en el listado, "detail" en el detalle) y
+    variants trae todas (thumb/card/detail en WebP y JPEG con sus medidas)
+    para armar <picture>/srcset. Sin versiones todavía, src es el original.
+    """
+    src = serializers.SerializerMethodField()
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductImage
         fields = [
             "id",
             "image",
+            "src",
+            "variants",
             "is_main",
         ]
 
+    def _variants(self, obj):
+        # src y variants comparten el cálculo
+        if not hasattr(obj, "_variant_urls"):
+            obj._variant_urls = derivative_urls(
+                obj.derivatives, obj.image.name, obj.image.storage, self.context.get("request")
+            )
+        return obj._variant_urls
+
+    def get_src(self, obj):
+        variants = self._variants(obj)
+        size = self.context.get("image_size", "card")
+        if variants and size in variants:
+            return variants[size]["jpeg"]
+        return self.fields["image"].to_representation(obj.image)
+
+    def get_variants(self, obj):
+        return self._variants(obj)
+
 
 class ProductSerializer(serializers.ModelSerializer):
     inventory = InventorySerializer(read_only=True)
@@ -0,0 +1,288 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from products.conditional import BRANDS, bump, touch_product
+from products.models import Brand, ProductImage
+
+logger = logging.getLogger(__name__)
+
+# Lado mayor (px) de cada versión. Nunca se agranda el original.
+SIZES = getattr(settings, "IMAGE_DERIVATIVE_SIZES", {"thumb": 160, "card": 480, "detail": 1200})
+
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+# Hilos del pool para generar versiones de imágenes existentes
+WORKERS = getattr(settings, "IMAGE_DERIVATIVE_WORKERS", 4)
+
+# Modelo -> (campo de la imagen, campo del hash, campo de las versiones).
+# Solo las imágenes que sirve la API (las de categorías no se exponen).
+IMAGE_FIELDS = {
+    ProductImage: ("image", "content_hash", "derivatives"),
+    Brand: ("logo", "logo_hash", "logo_derivatives"),
+}
+
+
+def content_hash(file):
+    """
+    sha256 del contenido, leído por chunks (sirve para uploads y FieldFile).
+    """
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def derivative_name(digest, size, fmt):
+    # Direccionado por contenido: la misma imagen subida dos veces comparte versiones
+    return f"derivatives/{digest[:2]}/{digest}/{size}.{EXTENSIONS[fmt]}"
+
+
+def _encode(image, fmt):
+    pil_format, options = FORMATS[fmt]
+    if fmt == "jpeg" and image.mode != "RGB":
+        # JPEG no tiene transparencia: fondo blanco, como se ve en la tienda
+        rgba = image.convert("RGBA")
+        image = Image.new("RGB", rgba.size, "white")
+        image.paste(rgba, mask=rgba.getchannel("A"))
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def render(file, digest, storage):
+    """
+    Genera todas las versiones del original y sube las que falten en el
+    storage (FileSystemStorage o S3). Retorna el dict que se guarda en el
+    modelo: {"thumb": {"width", "height", "webp", "jpeg"}, "card": ..., ...}
+    """
+    largest = max(SIZES.values())
+    derivatives = {}
+
+    with Image.open(file) as image:
+        # En JPEG decodifica directo a una escala cercana (mucho más rápido)
+        image.draft("RGB", (largest, largest))
+        current = ImageOps.exif_transpose(image)
+
+        # De la más grande a la más chica: cada una se reduce desde la anterior
+        for size, side in sorted(SIZES.items(), key=lambda item: -item[1]):
+            current = current.copy()
+            current.thumbnail((side, side), Image.Resampling.LANCZOS)
+
+            entry = {"width": current.width, "height": current.height}
+            for fmt in FORMATS:
+                name = derivative_name(digest, size, fmt)
+                if not storage.exists(name):
+                    name = storage.save(name, ContentFile(_encode(current, fmt)))
+                entry[fmt] = name
+            derivatives[size] = entry
+
+    return derivatives
+
+
+def _known_derivatives(digest):
+    """
+    Versiones ya generadas para el mismo contenido en cualquier modelo.
+    """
+    for model, (_, hash_field, derivatives_field) in IMAGE_FIELDS.items():
+        for derivatives in (
+            model.objects.filter(**{hash_field: digest})
+            .exclude(**{derivatives_field: {}})
+            .values_list(derivatives_field, flat=True)[:5]
+        ):
+            if all(size in derivatives for size in SIZES):
+                return {size: derivatives[size] for size in SIZES}
+    return None
+
+
+def generate(instance, force=False):
+    """
+    Calcula el hash del original y le asigna sus versiones, reutilizando
+    las de otra fila con el mismo contenido salvo que force=True. Se guarda
+    con un UPDATE (sin señales ni auto_now), así que invalida aquí el ETag y
+    los documentos de su producto o de las marcas. Retorna las versiones ({} sin imagen).
+    """
+    image_field, hash_field, derivatives_field = IMAGE_FIELDS[type(instance)]
+    file = getattr(instance, image_field)
+    if not file:
+        return {}
+
+    with file.open("rb"):
+        digest = content_hash(file)
+        derivatives = None if force else _known_derivatives(digest)
+        if derivatives is None:
+            derivatives = render(file, digest, file.storage)
+
+    # Con qué archivo se generaron: si después cambia la imagen, se ignoran
+    derivatives = {**derivatives, "source": file.name}
+    type(instance).objects.filter(pk=instance.pk).update(
+        **{hash_field: digest, derivatives_field: derivatives}
+    )
+    setattr(instance, hash_field, digest)
+    setattr(instance, derivatives_field, derivatives)
+
+    # products.listings importa los serializers, que importan este módulo
+    from products.listings import invalidate_listings
+
+    if isinstance(instance, ProductImage):
+        touch_product(instance.product_id)
+        invalidate_listings([instance.product_id])
+    elif isinstance(instance, Brand):
+        bump(BRANDS)
+        invalidate_listings(instance.products.values_list("id", flat=True))
+    return derivatives
+
+
+def save_product_image(serializer, product):
+    """
+    Guarda una imagen subida a upload_image y genera sus versiones. Si el
+    mismo archivo ya estaba subido se reutiliza (ni se sube ni se procesa de nuevo).
+    """
+    upload = serializer.validated_data["image"]
+    digest = content_hash(upload)
+
+    existing = (
+        ProductImage.objects.filter(content_hash=digest)
+        .exclude(derivatives={})
+        .order_by("id")
+        .first()
+    )
+    if existing is not None and existing.image.storage.exists(existing.image.name):
+        return serializer.save(
+            product=product,
+            image=existing.image.name,
+            content_hash=digest,
+            derivatives=existing.derivatives,
+        )
+
+    image = serializer.save(product=product)
+    try:
+        generate(image)
+    except Exception:
+        # La imagen ya quedó guardada y se sirve el original;
+        # generate_image_derivatives la reintenta después
+        logger.exception("No se pudieron generar las versiones de ProductImage %s", image.pk)
+    return image
+
+
+def _generate_safely(instance, force):
+    try:
+        return instance, generate(instance, force=force), None
+    except Exception as exc:  # un archivo roto o faltante no frena el resto
+        return instance, None, exc
+
+
+def _in_pool_thread(function, *args):
+    try:
+        return function(*args)
+    finally:
+        # Cada hilo del pool tiene su propia conexión
+        connection.close()
+
+
+def generate_many(instances, workers=WORKERS, force=False):
+    """
+    Genera versiones con un pool de hilos (Pillow suelta el GIL al decodificar
+    y redimensionar, y S3 es I/O). Produce (instancia, versiones, error) en el
+    orden de entrada. Con workers=1 corre en el hilo actual.
+    """
+    if workers <= 1:
+        for instance in instances:
+            yield _generate_safely(instance, force)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-derivatives") as pool:
+        yield from pool.map(lambda instance: _in_pool_thread(_generate_safely, instance, force), instances)
+
+
+def needs_derivatives(instance):
+    """
+    True si tiene imagen y sus versiones no son del archivo actual.
+    """
+    image_field, _, derivatives_field = IMAGE_FIELDS[type(instance)]
+    file = getattr(instance, image_field)
+    return bool(file) and (getattr(instance, derivatives_field) or {}).get("source") != file.name
+
+
+def _generate_pending(model, pk):
+    instance = model.objects.filter(pk=pk).first()
+    # Borrada, o upload_image ya las generó mientras tanto
+    if instance is None or not needs_derivatives(instance):
+        return
+    _, _, error = _generate_safely(instance, force=False)
+    if error is not None:
+        logger.error(
+            "No se pudieron generar las versiones de %s %s", model.__name__, pk, exc_info=error
+        )
+
+
+_background = None
+_background_lock = threading.Lock()
+
+
+def _background_pool():
+    global _background
+    with _background_lock:
+        if _background is None:
+            _background = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="image-derivatives")
+        return _background
+
+
+def schedule_derivatives(instance):
+    """
+    Para imágenes guardadas sin pasar por upload_image (admin, shell): genera
+    sus versiones al confirmar la transacción, en un pool en segundo plano
+    (IMAGE_DERIVATIVES_IN_BACKGROUND=False las genera en el mismo hilo).
+    Si el proceso termina antes o falla, generate_image_derivatives las
+    retoma: conviene correrlo como tarea programada (ej. cada hora).
+    """
+    if not needs_derivatives(instance):
+        return
+    model, pk = type(instance), instance.pk
+
+    def submit():
+        if getattr(settings, "IMAGE_DERIVATIVES_IN_BACKGROUND", True):
+            _background_pool().submit(_in_pool_thread, _generate_pending, model, pk)
+        else:
+            _generate_pending(model, pk)
+
+    transaction.on_commit(submit)
+
+
+def derivative_urls(derivatives, current_name, storage, request=None):
+    """
+    URLs de cada versión para el serializer, o None si todavía no se generaron
+    o son de un archivo anterior (el serializer usa entonces el original).
+    """
+    if not derivatives or derivatives.get("source") != current_name:
+        return None
+
+    def url(name):
+        value = storage.url(name)
+        # Igual que ImageField de DRF: absoluta si hay request
+        return request.build_absolute_uri(value) if request is not None else value
+
+    return {
+        size: {
+            "width": derivatives[size]["width"],
+            "height": derivatives[size]["height"],
+            **{fmt: url(derivatives[size][fmt]) for fmt in FORMATS},
+        }
+        for size in SIZES
+        if size in derivatives
+    }
@@ -0,0 +1,98 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from inventory.models import Inventory
+from inventory.signals import stock_bulk_updated
+from .conditional import BRANDS, CATEGORIES, bump, touch_product
+from .listings import category_products, create_listings, invalidate_listings
+from .models import Brand, Category, Product, ProductImage
+from .services.images import schedule_derivatives
+
+
+# Versiones del catálogo para los ETag (products/conditional.py).
+# Los .update() sobre querysets no pasan por aquí: quien los usa invalida por su cuenta.
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def bump_brands(sender, **kwargs):
+    bump(BRANDS)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_categories(sender, **kwargs):
+    bump(CATEGORIES)
+
+
+@receiver(post_save, sender=Product)
+def bump_brands_on_product_change(sender, instance, created, **kwargs):
+    # El listado de marcas solo muestra las que tienen productos activos
+    listing = (instance.brand_id, instance.is_active)
+    if created or listing != getattr(instance, "_loaded_listing", None):
+        bump(BRANDS)
+        instance._loaded_listing = listing
+
+
+@receiver(post_delete, sender=Product)
+def bump_brands_on_product_delete(sender, **kwargs):
+    bump(BRANDS)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def touch_product_on_image_change(sender, instance, **kwargs):
+    touch_product(instance.product_id)
+
+
+# Documentos de ProductListing (products/listings.py): se vacían y se renderizan al leerlos
+@receiver(post_save, sender=Product)
+def invalidate_listing_on_product_change(sender, instance, created, **kwargs):
+    if created:
+        # Nadie pudo leerlo todavía: alcanza con la fila vacía
+        create_listings([instance.id])
+    else:
+        invalidate_listings([instance.id])
+
+
+@receiver(post_save, sender=Inventory)
+def invalidate_listing_on_stock_change(sender, instance, **kwargs):
+    invalidate_listings([instance.product_id])
+
+
+@receiver(stock_bulk_updated)
+def invalidate_listings_on_bulk_stock_change(sender, product_ids, **kwargs):
+    invalidate_listings(product_ids)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_listing_on_image_change(sender, instance, **kwargs):
+    invalidate_listings([instance.product_id])
+
+
+@receiver(post_save, sender=Brand)
+@receiver(pre_delete, sender=Brand)
+def invalidate_listings_on_brand_change(sender, instance, **kwargs):
+    # pre_delete: después del borrado los productos ya quedaron con brand=NULL
+    invalidate_listings(Product.objects.filter(brand_id=instance.id).values_list("id", flat=True))
+
+
+@receiver(post_save, sender=Category)
+def invalidate_listings_on_category_change(sender, instance, created, **kwargs):
+    # Sus productos y los de sus ancestros; si se movió, también los del padre anterior
+    loaded_parent_id = None if created else getattr(instance, "_loaded_parent_id", None)
+    invalidate_listings(category_products(instance.id, instance.parent_id, loaded_parent_id))
+    instance._loaded_parent_id = instance.parent_id
+
+
+@receiver(pre_delete, sender=Category)
+def invalidate_listings_on_category_delete(sender, instance, **kwargs):
+    # pre_delete: después del borrado los productos ya quedaron con category=NULL.
+    # Las subcategorías que caen en cascada reciben su propio pre_delete.
+    invalidate_listings(category_products(instance.id, instance.parent_id))
+
+
+# Versiones de imágenes guardadas por fuera de upload_image (products/services/images.py)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=Brand)
+def generate_derivatives_on_save(sender, instance, **kwargs):
+    schedule_derivatives(instance)
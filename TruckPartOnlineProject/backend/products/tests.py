@@ -1,3 +1,585 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.utils.serializer_helpers import ReturnDict
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.metrics import registry
+from backend.renderers import FastJSONParser, FastJSONRenderer
+from inventory.models import Inventory
+from products.models import Brand, Category, Product, ProductImage, ProductListing
+from products.services import images
+
+User = get_user_model()
+
+
+class PerformanceMetricsTest(TestCase):
+    """
+    Server-Timing por request y /api/metrics/ en formato Prometheus.
+    """
+
+    def setUp(self):
+        registry.reset()
+        self.client = APIClient()
+        for i in range(3):
+            Product.objects.create(name=f"Filtro {i}", price=Decimal("10.00"), sku=f"SKU-{i}")
+
+    def test_server_timing_header(self):
+        response = self.client.get("/api/products/")
+        self.assertEqual(response.status_code, 200)
+
+        timing = response["Server-Timing"]
+        self.assertIn("db;dur=", timing)
+        self.assertIn("serialize;dur=", timing)
+        self.assertIn("total;dur=", timing)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.get("/api/products/")
+
+        self.assertIn(self.client.get("/api/metrics/").status_code, (401, 403))
+
+        admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="password", is_staff=True
+        )
+        self.client.force_authenticate(admin)
+        response = self.client.get("/api/metrics/")
+        self.assertEqual(response.status_code, 200)
+
+        body = response.content.decode()
+        self.assertIn('tpop_request_seconds{method="GET",endpoint="api/products/",quantile="0.95"}', body)
+        self.assertIn('tpop_db_queries_count{method="GET",endpoint="api/products/"} 1', body)
+
+    def test_connection_metrics(self):
+        # Persistentes con health check por defecto
+        self.assertGreater(connection.settings_dict["CONN_MAX_AGE"], 0)
+        self.assertTrue(connection.settings_dict["CONN_HEALTH_CHECKS"])
+
+        registry.record_connect("default", 0.004)
+        registry.record_connect("default", 0.002)
+
+        body = registry.render()
+        self.assertIn('tpop_db_connections_opened_total{alias="default"} 2', body)
+        self.assertIn('tpop_db_connect_seconds_total{alias="default"} 0.006', body)
+
+
+class BenchmarkSuiteTest(TestCase):
+    """
+    Smoke test de seed_benchmark_data + run_benchmarks a escala mínima.
+    """
+
+    def test_seed_is_consistent_and_runner_writes_json(self):
+        call_command(
+            "seed_benchmark_data",
+            products=40, movements=400, orders=20, brands=3, users=3,
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(Product.objects.count(), 40)
+        # El stock es la suma de los movimientos y nunca negativo
+        for inventory in Inventory.objects.annotate(total=Sum("movements__change")):
+            self.assertEqual(inventory.quantity, inventory.total or 0)
+            self.assertGreaterEqual(inventory.quantity, 0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "results.json")
+            call_command(
+                "run_benchmarks", repeat=2, warmup=0, only="ordering=price",
+                output=output, stdout=StringIO(),
+            )
+            with open(output) as f:
+                results = json.load(f)["results"]
+
+        self.assertEqual(set(results), {"products.list ordering=price"})
+        self.assertEqual(results["products.list ordering=price"]["status"], 200)
+
+
+class FastJSONTest(TestCase):
+    """
+    backend/renderers.py: mismos bytes y mismos datos que el JSON de DRF.
+    """
+
+    def test_same_bytes_as_drf(self):
+        moment = datetime(2026, 3, 1, 12, 30, 5, 120000, tzinfo=dt_timezone.utc)
+        data = ReturnDict({
+            "price": Decimal("10.50"),
+            "created_at": moment,
+            "local": moment.astimezone(dt_timezone(timedelta(hours=-5))),
+            "day": moment.date(),
+            "naive": time(8, 15),
+            "elapsed": timedelta(minutes=90),
+            "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "label": gettext_lazy("Pieza"),
+            "text": "línea\u2028separada \"comillas\" \x00",
+            "by_id": {1: "uno", 2: None},
+            "items": [{"n": i, "f": i / 3} for i in range(3)],
+        }, serializer=None)
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+        # Con indent (navegador de la API), enteros de más de 64 bits y errores, se comporta como DRF
+        self.assertEqual(FastJSONRenderer().render({"huge": 2 ** 70}), b'{"huge":1180591620717411303424}')
+        self.assertEqual(
+            FastJSONRenderer().render(data, "application/json; indent=2"),
+            JSONRenderer().render(data, "application/json; indent=2"),
+        )
+        aware = time(8, 15, tzinfo=dt_timezone.utc)
+        with self.assertRaisesMessage(ValueError, "timezone-aware times"):
+            FastJSONRenderer().render({"time": aware})
+
+        # NaN/Infinity: orjson escribiría null, DRF falla
+        for bad in ({"a": float("nan")}, {"items": [{"f": float("-inf")}]}, {"price": Decimal("NaN")}):
+            with self.assertRaisesMessage(ValueError, "Out of range float values are not JSON compliant"):
+                FastJSONRenderer().render(bad)
+
+    def test_parser_matches_drf(self):
+        for body in (
+            b'{"items": [{"product_id": 1, "quantity": 2}], "price": 10.5, "name": "Pi\xc3\xb1\xc3\xb3n"}',
+            b'{"big": 123456789012345678901234567890}',
+            b'{"broken": ',
+            b'{"value": NaN}',
+        ):
+            try:
+                expected = JSONParser().parse(BytesIO(body))
+            except ParseError as exc:
+                with self.assertRaisesMessage(ParseError, str(exc.detail)):
+                    FastJSONParser().parse(BytesIO(body))
+            else:
+                self.assertEqual(FastJSONParser().parse(BytesIO(body)), expected)
+
+    def test_benchmark_command(self):
+        brand = Brand.objects.create(name="Volvo")
+        for i in range(3):
+            Product.objects.create(name=f"Filtro {i}", price=Decimal("9.99") + i, sku=f"JSON-{i}", brand=brand)
+        out = StringIO()
+        call_command("benchmark_json", repeat=2, stdout=out)
+        self.assertIn("products.list (3 items", out.getvalue())
+        self.assertIn("Mismos bytes", out.getvalue())
+
+
+class AsyncCatalogTest(TestCase):
+    """
+    Las vistas async de /api/catalog/ responden lo mismo que las de DRF.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name="Cummins")
+        Brand.objects.create(name="Sin productos")
+        root = Category.objects.create(name="Motor", level="category")
+        sub = Category.objects.create(name="Enfriamiento", level="subcategory", parent=root)
+        system = Category.objects.create(name="Radiador", level="system", parent=sub)
+        pieces = [
+            Category.objects.create(name=name, level="piece", parent=system)
+            for name in ("Tapa", "Manguera", "Bomba")
+        ]
+        Category.objects.create(name="Frenos", level="category")
+
+        for i in range(30):
+            product = Product.objects.create(
+                name=f"Pieza {i:02}",
+                price=Decimal("10.50") + i,
+                sku=f"ASYNC-{i}",
+                brand=brand,
+                category=pieces[i % 3] if i % 5 else system,
+                is_active=i != 7,
+            )
+            if i % 4 == 0:
+                ProductImage.objects.create(product=product, image=f"products/{i}.jpg", is_main=True)
+
+        cls.staff = User.objects.create_user(username="admin", password="x", is_staff=True, is_active=True)
+
+    def assertSameResponse(self, sync_url, async_url, **headers):
+        expected = self.client.get(sync_url, headers=headers)
+        actual = self.client.get(async_url, headers=headers)
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual["Content-Type"], "application/json")
+        # Solo cambian los links de paginación, que apuntan a su propia ruta
+        self.assertEqual(actual.content.replace(b"/api/catalog/", b"/api/"), expected.content)
+
+    def test_same_json_as_drf(self):
+        product = Product.objects.filter(is_active=True, category__level="system").first()
+        for query in ("", "?page=2", "?page=last&ordering=price", "?page_size=7&brands=1&min_price=15",
+                      "?search=pieza 1", "?page=9"):
+            self.assertSameResponse(f"/api/products/{query}", f"/api/catalog/products/{query}")
+
+        self.assertSameResponse(f"/api/products/{product.id}/", f"/api/catalog/products/{product.id}/")
+        self.assertSameResponse("/api/products/search/?q=pieza 2", "/api/catalog/products/search/?q=pieza 2")
+        self.assertSameResponse("/api/categories/tree/", "/api/catalog/categories/tree/")
+        self.assertSameResponse("/api/brands/", "/api/catalog/brands/")
+        self.assertSameResponse("/api/brands/?all=true", "/api/catalog/brands/?all=true")
+
+    def test_staff_sees_inactive_products(self):
+        inactive = Product.objects.get(is_active=False)
+        self.assertEqual(self.client.get(f"/api/catalog/products/{inactive.id}/").status_code, 404)
+
+        token = f"Bearer {AccessToken.for_user(self.staff)}"
+        self.assertSameResponse(
+            f"/api/products/{inactive.id}/", f"/api/catalog/products/{inactive.id}/", authorization=token
+        )
+        self.assertEqual(
+            self.client.get("/api/catalog/products/", headers={"authorization": "Bearer nope"}).status_code, 401
+        )
+
+    def test_category_tree_queries_per_level(self):
+        # Una query por nivel del árbol, no una por categoría (+1 del ETag en DRF)
+        with self.assertNumQueries(6):
+            self.client.get("/api/categories/tree/")
+        with self.assertNumQueries(5):
+            self.client.get("/api/catalog/categories/tree/")
+
+
+class ConditionalGetTest(TestCase):
+    """
+    ETag / Last-Modified del detalle de producto, marcas y categorías.
+    """
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name="Detroit")
+        self.category = Category.objects.create(name="Motor", level="category")
+        self.product = Product.objects.create(
+            name="Bomba de agua", price=Decimal("80.00"), sku="COND-1", brand=self.brand, category=self.category
+        )
+        self.url = f"/api/products/{self.product.id}/"
+
+    def assertNotModified(self, url, etag):
+        response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+        return response
+
+    def assertChanged(self, url, etag):
+        response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        return response["ETag"]
+
+    def test_product_detail_304_without_serializing(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        self.assertFalse(etag.startswith("W/"))
+        self.assertIn("Last-Modified", response)
+
+        # Solo la query del validador: ni imágenes ni árbol de categorías
+        with CaptureQueriesContext(connection) as queries:
+            self.assertNotModified(self.url, etag)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            self.client.get(self.url, headers={"if-modified-since": response["Last-Modified"]}).status_code, 304
+        )
+
+        # Stock, imágenes, marca y categorías cambian la respuesta
+        inventory = Inventory.objects.get(product=self.product)
+        inventory.quantity = 4
+        inventory.save()
+        etag = self.assertChanged(self.url, etag)
+
+        image = ProductImage.objects.create(product=self.product, image="products/bomba.jpg")
+        etag = self.assertChanged(self.url, etag)
+        image.delete()
+        etag = self.assertChanged(self.url, etag)
+
+        self.brand.name = "Detroit Diesel"
+        self.brand.save()
+        etag = self.assertChanged(self.url, etag)
+
+        Category.objects.create(name="Culata", level="subcategory", parent=self.category)
+        etag = self.assertChanged(self.url, etag)
+        self.assertNotModified(self.url, etag)
+
+        # Inactivo: 404 para el público aunque mande un ETag viejo
+        self.product.is_active = False
+        self.product.save()
+        self.assertEqual(self.client.get(self.url, headers={"if-none-match": etag}).status_code, 404)
+
+    def test_weak_etag_per_normalized_query(self):
+        etag = self.client.get("/api/brands/?all=true&page=1")["ETag"]
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertNotModified("/api/brands/?page=1&all=true", etag)
+        self.assertChanged("/api/brands/", etag)
+
+        # El listado de marcas depende de qué productos están activos
+        etag = self.client.get("/api/brands/")["ETag"]
+        self.product.is_active = False
+        self.product.save()
+        self.assertChanged("/api/brands/", etag)
+        self.assertEqual(self.client.get("/api/brands/").data, [])
+
+        # Un cambio de precio no toca marcas ni categorías
+        etag = self.client.get("/api/brands/")["ETag"]
+        tree_etag = self.client.get("/api/categories/tree/")["ETag"]
+        self.product.price = Decimal("85.00")
+        self.product.save()
+        self.assertNotModified("/api/brands/", etag)
+        self.assertNotModified("/api/categories/tree/", tree_etag)
+
+        Category.objects.create(name="Frenos", level="category")
+        self.assertChanged("/api/categories/tree/", tree_etag)
+
+
+class ProductListingTest(TestCase):
+    """
+    Documentos ya renderizados: sincronización, lectura y rebuild.
+    """
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name="Mack")
+        self.category = Category.objects.create(name="Frenos", level="category")
+        self.products = [
+            Product.objects.create(
+                name=f"Zapata {i}", price=Decimal("20.00") + i, sku=f"LIST-{i}",
+                brand=self.brand, category=self.category,
+            )
+            for i in range(3)
+        ]
+
+    def document(self, product):
+        return json.loads(ProductListing.objects.get(product=product).detail)
+
+    def rendered(self):
+        return set(ProductListing.objects.filter(card__isnull=False).values_list("product_id", flat=True))
+
+    def test_documents_follow_catalog_changes(self):
+        product = self.products[0]
+        # Se renderizan en la primera lectura, no al guardar
+        self.assertEqual(self.rendered(), set())
+        self.client.get("/api/products/")
+        self.assertEqual(self.rendered(), {p.id for p in self.products})
+
+        # Listado y detalle: ni imágenes, ni marcas, ni categorías
+        with CaptureQueriesContext(connection) as queries:
+            listed = self.client.get("/api/products/?ordering=price")
+            detail = self.client.get(f"/api/products/{product.id}/")
+        tables = " ".join(q["sql"] for q in queries.captured_queries)
+        for table in ("products_productimage", "products_brand", "products_category"):
+            self.assertNotIn(table, tables)
+        self.assertEqual([p["id"] for p in listed.data["results"]], [p.id for p in self.products])
+        self.assertEqual(detail.data["brand"]["name"], "Mack")
+
+        # Stock e imágenes solo vacían el documento: ningún render al escribir
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            inventory = Inventory.objects.get(product=product)
+            inventory.quantity = 9
+            inventory.save()
+        self.assertEqual(callbacks, [])
+        self.assertNotIn(product.id, self.rendered())
+        self.client.get(f"/api/products/{product.id}/")
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.create(product=product, image="products/zapata.jpg", is_main=True)
+        self.assertNotIn(product.id, self.rendered())
+        self.client.get(f"/api/products/{product.id}/")
+        document = self.document(product)
+        self.assertEqual(document["inventory"]["quantity"], 9)
+        self.assertEqual(document["images"][0]["src"], "https://origin.tpop.invalid/media/products/zapata.jpg")
+        # En la respuesta va el host del request
+        self.assertEqual(
+            self.client.get(f"/api/products/{product.id}/").data["images"][0]["src"],
+            "http://testserver/media/products/zapata.jpg",
+        )
+
+        # Marca y categoría invalidan; el documento se renderiza al leerlo
+        self.brand.name = "Mack Trucks"
+        self.brand.save()
+        Category.objects.create(name="Tambor", level="subcategory", parent=self.category)
+        self.assertEqual(self.rendered(), set())
+        data = self.client.get(f"/api/products/{product.id}/").data
+        self.assertEqual(data["brand"]["name"], "Mack Trucks")
+        self.assertEqual(data["category"]["children"][0]["name"], "Tambor")
+        self.assertEqual(self.document(product)["brand"]["name"], "Mack Trucks")
+
+        # Inactivo: 404 para el público
+        product.is_active = False
+        product.save()
+        self.assertEqual(self.client.get(f"/api/products/{product.id}/").status_code, 404)
+        self.assertEqual(self.client.get("/api/products/").data["count"], 2)
+
+    def test_category_changes_only_invalidate_products_that_embed_it(self):
+        drum = Category.objects.create(name="Tambor", level="subcategory", parent=self.category)
+        engine = Category.objects.create(name="Motor", level="category")
+        in_drum = Product.objects.create(name="Tambor 1", price=Decimal("50.00"), category=drum)
+        in_engine = Product.objects.create(name="Pistón", price=Decimal("80.00"), category=engine)
+        self.client.get("/api/products/")
+
+        # Tambor está en el subárbol de Frenos: cambian Tambor y Frenos, no Motor
+        drum.name = "Tambores"
+        drum.save()
+        self.assertEqual(self.rendered(), {in_engine.id})
+
+        # Moverla cambia también el padre anterior
+        self.client.get("/api/products/")
+        drum = Category.objects.get(id=drum.id)
+        drum.parent = engine
+        drum.save()
+        self.assertEqual(self.rendered(), set())
+        self.client.get("/api/products/")
+        self.assertEqual(self.document(in_engine)["category"]["children"][0]["name"], "Tambores")
+        self.assertEqual(self.document(self.products[0])["category"]["children"], [])
+
+        # Al borrarla, sus productos quedan sin categoría
+        drum.delete()
+        self.assertEqual(self.rendered(), {p.id for p in self.products})
+        self.assertIsNone(self.client.get(f"/api/products/{in_drum.id}/").data["category"])
+
+    def test_change_committed_during_a_render_is_not_overwritten(self):
+        from products import listings
+
+        product = self.products[0]
+        render = listings.render
+
+        def render_then_change(products):
+            documents = render(products)
+            # Un cambio se confirma después de que esta lectura leyó el producto
+            Product.objects.filter(id=product.id).update(name="Zapata nueva")
+            listings.invalidate_listings([product.id])
+            return documents
+
+        with patch("products.listings.render", side_effect=render_then_change):
+            self.assertEqual(self.client.get(f"/api/products/{product.id}/").data["name"], "Zapata 0")
+        self.assertNotIn(product.id, self.rendered())
+        self.assertEqual(self.client.get(f"/api/products/{product.id}/").data["name"], "Zapata nueva")
+        self.assertEqual(self.document(product)["name"], "Zapata nueva")
+
+    def test_rebuild_command(self):
+        ProductListing.objects.all().delete()
+        out = StringIO()
+        call_command("rebuild_product_listings", batch_size=2, stdout=out)
+        self.assertIn("3 documento(s) regenerados", out.getvalue())
+        self.assertEqual(self.document(self.products[2])["name"], "Zapata 2")
+
+
+def image_bytes(size=(2000, 1000), fmt="JPEG", color=(200, 30, 30)):
+    mode = "RGBA" if fmt == "PNG" else "RGB"
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+class ImageDerivativesTest(TestCase):
+    """
+    Versiones thumb/card/detail en WebP y JPEG, dedupe por hash y backfill.
+    """
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.admin = User.objects.create_user(
+            username="admin", password="x", is_staff=True, is_active=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.product = Product.objects.create(name="Radiador", price=Decimal("99.00"), sku="IMG-1")
+
+    def upload(self, product, content):
+        return self.client.post(
+            f"/api/products/{product.id}/upload_image/",
+            {"image": SimpleUploadedFile("foto.jpg", content, content_type="image/jpeg"), "is_main": True},
+            format="multipart",
+        )
+
+    def test_upload_generates_derivatives(self):
+        response = self.upload(self.product, image_bytes())
+        self.assertEqual(response.status_code, 201)
+
+        variants = response.data["variants"]
+        self.assertEqual(
+            {size: (v["width"], v["height"]) for size, v in variants.items()},
+            {"thumb": (160, 80), "card": (480, 240), "detail": (1200, 600)},
+        )
+        self.assertTrue(variants["card"]["webp"].endswith("/card.webp"))
+        self.assertTrue(response.data["src"].endswith("/detail.jpg"))
+
+        image = ProductImage.objects.get()
+        self.assertEqual(len(image.content_hash), 64)
+        for size in variants:
+            for fmt in ("webp", "jpeg"):
+                path = os.path.join(self.media_root, image.derivatives[size][fmt])
+                with Image.open(path) as derivative:
+                    self.assertEqual(derivative.format, fmt.upper())
+                    self.assertEqual(derivative.width, variants[size]["width"])
+
+        # En el listado cada imagen trae la versión card
+        listed = self.client.get("/api/products/").data["results"][0]["images"][0]
+        self.assertTrue(listed["src"].endswith("/card.jpg"))
+
+    def test_same_content_is_reused(self):
+        content = image_bytes()
+        self.upload(self.product, content)
+        other = Product.objects.create(name="Tapa", price=Decimal("5.00"), sku="IMG-2")
+        self.upload(other, content)
+
+        first, second = ProductImage.objects.order_by("id")
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.derivatives, second.derivatives)
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, "products"))), 1)
+
+    def test_backfill_command_and_stale_derivatives(self):
+        image = ProductImage(product=self.product)
+        image.image.save("vieja.jpg", ContentFile(image_bytes((300, 600))))
+        brand = Brand.objects.create(name="Volvo")
+        brand.logo.save("volvo.png", ContentFile(image_bytes((800, 400), "PNG", (0, 0, 0, 0))))
+
+        self.assertIsNone(self.client.get(f"/api/products/{self.product.id}/").data["images"][0]["variants"])
+
+        out = StringIO()
+        call_command("generate_image_derivatives", workers=1, stdout=out)
+        self.assertIn("2 imagen(es) procesadas, 0 error(es)", out.getvalue())
+
+        image.refresh_from_db()
+        brand.refresh_from_db()
+        # Nunca se agranda: el original de 300x600 queda igual en detail
+        self.assertEqual((image.derivatives["detail"]["width"], image.derivatives["detail"]["height"]), (300, 600))
+        self.assertEqual(image.derivatives["card"]["height"], 480)
+        self.assertEqual(brand.logo_derivatives["thumb"]["width"], 160)
+
+        # Nada pendiente: la segunda corrida no procesa nada
+        out = StringIO()
+        call_command("generate_image_derivatives", workers=1, stdout=out)
+        self.assertIn("0 imagen(es) procesadas", out.getvalue())
+
+        # Si el archivo cambia, las versiones anteriores se ignoran hasta regenerar
+        ProductImage.objects.filter(pk=image.pk).update(image="products/otra.jpg")
+        data = self.client.get(f"/api/products/{self.product.id}/").data["images"][0]
+        self.assertIsNone(data["variants"])
+        self.assertTrue(data["src"].endswith("/media/products/otra.jpg"))
+
+    def test_images_saved_outside_upload_get_derivatives_on_commit(self):
+        # Admin o shell: la señal las genera al confirmar la transacción
+        with self.settings(IMAGE_DERIVATIVES_IN_BACKGROUND=False), self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage(product=self.product)
+            image.image.save("admin.jpg", ContentFile(image_bytes()))
+            brand = Brand(name="Mack")
+            brand.logo.save("mack.png", ContentFile(image_bytes((800, 400), "PNG")))
+
+        image.refresh_from_db()
+        brand.refresh_from_db()
+        self.assertEqual(image.derivatives["source"], image.image.name)
+        self.assertEqual(brand.logo_derivatives["source"], brand.logo.name)
+
+        # upload_image ya las genera: la señal no las vuelve a renderizar
+        with self.settings(IMAGE_DERIVATIVES_IN_BACKGROUND=False), \
+                patch("products.services.images.render", wraps=images.render) as render, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.upload(self.product, image_bytes((640, 480)))
+        self.assertEqual(render.call_count, 1)
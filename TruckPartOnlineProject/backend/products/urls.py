@@ -1,12 +1,23 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import ProductViewSet, BrandViewSet, CategoryViewSet
+from . import async_views
 
 router = DefaultRouter()
 router.register(r"products", ProductViewSet, basename="product")
 router.register(r"brands", BrandViewSet)
 router.register(r"categories", CategoryViewSet, basename="category")
 
+# Lectura del catálogo en async (para servir bajo ASGI)
+catalog_urls = [
+    path("products/", async_views.product_list, name="catalog-product-list"),
+    path("products/search/", async_views.product_search, name="catalog-product-search"),
+    path("products/<int:pk>/", async_views.product_detail, name="catalog-product-detail"),
+    path("categories/tree/", async_views.category_tree, name="catalog-category-tree"),
+    path("brands/", async_views.brand_list, name="catalog-brand-list"),
+]
+
 urlpatterns = [
     path("", include(router.urls)),
+    path("catalog/", include(catalog_urls)),
 ]
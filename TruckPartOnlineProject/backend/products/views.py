@@ -1,27 +1,21 @@
 
-from decimal import Decimal, InvalidOperation
-
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser, FormParser
 
+from .conditional import BRANDS, CATEGORIES, product_condition, section_condition
+from .listings import can_splice, detail_response, listing_documents, page_response, product_document
 from .models import Product, ProductImage, Brand, Category
 from .serializers import ProductSerializer, ProductImageSerializer, ProductSearchSerializer, BrandSerializer, CategorySerializer
 from products.pagination import StandardResultsSetPagination
+from products.queries import category_children, product_queryset
+from products.services.images import save_product_image
 
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-ALLOWED_ORDERINGS = {
-    "price": "price",
-    "-price": "-price",
-    "name": "name",
-    "-name": "-name",
-    "-created_at": "-created_at",
-}
-
 
 class ProductViewSet(ModelViewSet):
     """
@@ -33,81 +27,24 @@ class ProductViewSet(ModelViewSet):
     pagination_class = StandardResultsSetPagination
 
     def get_queryset(self):
-        queryset = Product.objects.select_related(
-            "brand",
-            "category",
-            "inventory",
-            "category__parent",
-            "category__parent__parent",
-            "category__parent__parent__parent",
-        )
-
-        # Solo productos activos para usuarios no admin
-        if not self.request.user.is_staff:
-            queryset = queryset.filter(is_active=True)
-
-        params = self.request.query_params
-        
-         # 🔍 BÚSQUEDA POR NOMBRE
-        if "search" in params:
-          queryset = queryset.filter(
-            name__icontains=params["search"]
-        )
-          
-
-        # Filtro por Marca (soporta 'brands' o 'manufacturer')
-        brand_param = params.get("brands") or params.get("manufacturer")
-        if brand_param:
-            brand_ids = brand_param.split(",")
-            queryset = queryset.filter(brand_id__in=brand_ids)
-
-            
-
-        # Filtro por Pieza (soporta múltiples IDs separados por coma)
-        if "piece" in params:
-            piece_ids = params["piece"].split(",")
-            queryset = queryset.filter(
-                category_id__in=piece_ids,
-                category__level="piece",
-            )
-
-        # Filtro por Sistema (soporta múltiples IDs separados por coma)
-        if "system" in params:
-            system_ids = params["system"].split(",")
-            queryset = queryset.filter(category__parent_id__in=system_ids)
-
-        # Filtro por Subcategoría (soporta múltiples IDs separados por coma)
-        if "subcategory" in params:
-            sub_ids = params["subcategory"].split(",")
-            queryset = queryset.filter(category__parent__parent_id__in=sub_ids)
-
-        # Filtro por Categoría principal (soporta múltiples IDs separados por coma)
-        if "category" in params:
-            cat_ids = params["category"].split(",")
-            queryset = queryset.filter(category__parent__parent__parent_id__in=cat_ids)
-
-        # Filtro por Precio mínimo
-        if "min_price" in params:
-            try:
-                queryset = queryset.filter(price__gte=Decimal(params["min_price"]))
-            except InvalidOperation:
-                pass
-
-        # Filtro por Precio máximo
-        if "max_price" in params:
-            try:
-                queryset = queryset.filter(price__lte=Decimal(params["max_price"]))
-            except InvalidOperation:
-                pass
-
-        # Ordenamiento (whitelist para evitar inyección de campos)
-        ordering_param = params.get("ordering")
-        if ordering_param and ordering_param in ALLOWED_ORDERINGS:
-            queryset = queryset.order_by(ALLOWED_ORDERINGS[ordering_param])
-        else:
-            queryset = queryset.order_by("-created_at")
+        return product_queryset(self.request.query_params, self.request.user.is_staff)
 
-        return queryset.distinct()
+    def get_serializer(self, *args, **kwargs):
+        """
+        En list/retrieve el árbol de hijos de las categorías se carga una
+        vez para toda la página (una query por nivel), no por producto, y
+        las imágenes usan la versión card en el listado y detail en el detalle.
+        """
+        if self.action in ("list", "retrieve") and args:
+            products = args[0] if kwargs.get("many") else [args[0]]
+            kwargs["context"] = {
+                **self.get_serializer_context(),
+                "category_children": category_children(
+                    {product.category_id for product in products if product.category_id}
+                ),
+                "image_size": "card" if self.action == "list" else "detail",
+            }
+        return super().get_serializer(*args, **kwargs)
 
     def get_permissions(self):
         """
@@ -164,13 +101,17 @@ class ProductViewSet(ModelViewSet):
     @action(detail=True, methods=["post"], permission_classes=[IsAdminUser])
     def upload_image(self, request, pk=None):
         """
-        Sube una imagen para un producto específico.
+        Sube una imagen para un producto específico y genera sus versiones
+        (thumb, card, detail en WebP y JPEG).
         """
         product = self.get_object()
-        serializer = ProductImageSerializer(data=request.data)
+        serializer = ProductImageSerializer(
+            data=request.data,
+            context={"request": request, "image_size": "detail"},
+        )
 
         if serializer.is_valid():
-            serializer.save(product=product)
+            save_product_image(serializer, product)
             return Response(serializer.data, status=201)
 
         return Response(serializer.errors, status=400)
@@ -218,7 +159,30 @@ class ProductViewSet(ModelViewSet):
    ]
    )
     def list(self, request, *args, **kwargs):
-       return super().list(request, *args, **kwargs)
+        """
+        En JSON la página sale de los documentos de ProductListing: los
+        filtros solo buscan los ids (products/listings.py).
+        """
+        if not can_splice(request):
+            return super().list(request, *args, **kwargs)
+
+        ids = self.get_queryset().select_related(None).prefetch_related(None).values_list("id", flat=True)
+        page = self.paginate_queryset(ids)
+        return page_response(request, self.paginator, listing_documents(list(page), "card"))
+
+    @product_condition
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Con If-None-Match / If-Modified-Since vigentes responde 304 sin
+        cargar ni serializar el producto (products/conditional.py); si no,
+        en JSON responde el documento de ProductListing.
+        """
+        if can_splice(request) and str(kwargs.get("pk", "")).isdigit():
+            document = product_document(int(kwargs["pk"]), "detail", request.user.is_staff)
+            if document is not None:
+                return detail_response(request, document)
+        # Browsable API, pk inválido o 404
+        return super().retrieve(request, *args, **kwargs)
 
 
 class BrandViewSet(ReadOnlyModelViewSet):
@@ -240,6 +204,14 @@ class BrandViewSet(ReadOnlyModelViewSet):
         
         return queryset
 
+    @section_condition(BRANDS)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @section_condition(BRANDS)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class CategoryViewSet(ModelViewSet):
     """
@@ -263,16 +235,27 @@ class CategoryViewSet(ModelViewSet):
         if self.action in ["create", "update", "partial_update", "destroy"]:
             return [IsAdminUser()]
         return [AllowAny()]
-    
+
+    @section_condition(CATEGORIES)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @section_condition(CATEGORIES)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(detail=False, methods=["get"], permission_classes=[AllowAny])
+    @section_condition(CATEGORIES)
     def tree(self, request):
         """
         Retorna la estructura de categorías en formato de árbol jerárquico completo.
         """
-        categories = Category.objects.filter(parent=None).prefetch_related(
-            "children__children__children__children"
-        ).order_by("name")
-        serializer = CategorySerializer(categories, many=True)
+        categories = list(Category.objects.filter(parent=None).order_by("name"))
+        serializer = CategorySerializer(
+            categories,
+            many=True,
+            context={"category_children": category_children(c.id for c in categories)},
+        )
         return Response(serializer.data)
 
 ######################################################################################################
@@ -1,3 +1,4 @@
+import logging
 import requests
 from django.conf import settings
 from django.utils import timezone
@@ -8,6 +9,8 @@ import re
 from typing import Optional, Dict, List
 import requests
 
+logger = logging.getLogger(__name__)
+
 
 # =====================================================================================================================
 # TOKEN
@@ -110,30 +113,27 @@ def find_customer_by_phone(token, phone):
     if not phone:
         return None
     
-    print(f"🔍 Buscando teléfono: '{phone}'")
-    
     # Limpiar teléfono de búsqueda
     phone_clean = re.sub(r'\D', '', phone)
-    print(f"   Limpio: '{phone_clean}'")
+    logger.debug("Buscando cliente QB por teléfono %s", phone_clean)
     
     url = f"https://sandbox-quickbooks.api.intuit.com/v3/company/{token.realm_id}/query"
     headers = qb_headers_query()
     
     # 1. Obtener TODOS los clientes (sin filtro)
     query = "SELECT * FROM Customer"
-    print(f"\n📞 Obteniendo todos los clientes...")
     
     try:
         response = requests.post(url, data=query, headers=headers)
         
         if response.status_code != 200:
-            print(f"❌ Error obteniendo clientes: {response.status_code}")
+            logger.warning("Error obteniendo clientes de QB: %s", response.status_code)
             return None
         
         data = response.json()
         all_customers = data.get("QueryResponse", {}).get("Customer", [])
         
-        print(f"📊 Total clientes en QuickBooks: {len(all_customers)}")
+        logger.debug("Total clientes en QuickBooks: %s", len(all_customers))
         
         # 2. Filtrar manualmente por teléfono en Python
         matching_customers = []
@@ -152,40 +152,33 @@ def find_customer_by_phone(token, phone):
             # Comparar
             if phone_clean == customer_phone_clean:
                 matching_customers.append(customer)
-                print(f"\n   ✅ Coincidencia encontrada:")
-                print(f"      ID: {customer['Id']}")
-                print(f"      Nombre: {customer.get('DisplayName', 'N/A')}")
-                print(f"      Tel en QB: '{customer_phone}'")
-                print(f"      Tel limpio: '{customer_phone_clean}'")
         
         # 3. Seleccionar el mejor cliente
         if not matching_customers:
-            print(f"\n❌ No se encontraron clientes con teléfono {phone}")
             return None
         
         if len(matching_customers) == 1:
-            print(f"\n✅ Cliente único encontrado")
             return matching_customers[0]
         
         # Múltiples coincidencias
-        print(f"\n⚠️ Se encontraron {len(matching_customers)} clientes:")
-        for c in matching_customers:
-            print(f"   - ID: {c['Id']} - {c.get('DisplayName', 'N/A')} - Balance: ${c.get('Balance', 0)}")
+        logger.info(
+            "%s clientes QB con el mismo teléfono: %s",
+            len(matching_customers), [c['Id'] for c in matching_customers],
+        )
         
         # Priorizar el cliente original (sin sufijo)
         for c in matching_customers:
             name = c.get('DisplayName', '')
             if name == "Jorge Antonio Ramirez":
-                print(f"\n✅ SELECCIONADO (original): {name}")
                 return c
         
         # Si no, elegir el de menor balance (el original suele tener balance 0)
         best = min(matching_customers, key=lambda x: float(x.get('Balance', 0)))
-        print(f"\n⚠️ SELECCIONADO (menor balance): {best.get('DisplayName')}")
+        logger.info("Seleccionado cliente QB %s (menor balance)", best['Id'])
         return best
         
-    except Exception as e:
-        print(f"\n❌ Error: {e}")
+    except Exception:
+        logger.exception("Error buscando cliente QB por teléfono")
         return None
 
 
@@ -201,30 +194,27 @@ def find_customer_by_email(token, email):
     if not email:
         return None
     
-    print(f"🔍 Buscando email: '{email}'")
-    
     # Limpiar email (minúsculas, sin espacios)
     email_clean = email.strip().lower()
-    print(f"   Limpio: '{email_clean}'")
+    logger.debug("Buscando cliente QB por email %s", email_clean)
     
     url = f"https://sandbox-quickbooks.api.intuit.com/v3/company/{token.realm_id}/query"
     headers = qb_headers_query()
     
     # 1. Obtener TODOS los clientes
     query = "SELECT * FROM Customer"
-    print(f"\n📧 Obteniendo todos los clientes...")
     
     try:
         response = requests.post(url, data=query, headers=headers)
         
         if response.status_code != 200:
-            print(f"❌ Error obteniendo clientes: {response.status_code}")
+            logger.warning("Error obteniendo clientes de QB: %s", response.status_code)
             return None
         
         data = response.json()
         all_customers = data.get("QueryResponse", {}).get("Customer", [])
         
-        print(f"📊 Total clientes en QuickBooks: {len(all_customers)}")
+        logger.debug("Total clientes en QuickBooks: %s", len(all_customers))
         
         # 2. Filtrar manualmente por email en Python
         matching_customers = []
@@ -243,49 +233,38 @@ def find_customer_by_email(token, email):
             # Comparación exacta primero
             if email_clean == customer_email_clean:
                 matching_customers.append(customer)
-                print(f"\n   ✅ Coincidencia EXACTA encontrada:")
-                print(f"      ID: {customer['Id']}")
-                print(f"      Nombre: {customer.get('DisplayName', 'N/A')}")
-                print(f"      Email en QB: '{customer_email}'")
                 return customer  # Si hay coincidencia exacta, retornar inmediatamente
             
             # Si no es exacta, guardar para posible coincidencia parcial después
             if email_clean in customer_email_clean:
                 matching_customers.append(customer)
-                print(f"\n   📌 Coincidencia PARCIAL encontrada:")
-                print(f"      ID: {customer['Id']}")
-                print(f"      Nombre: {customer.get('DisplayName', 'N/A')}")
-                print(f"      Email en QB: '{customer_email}'")
         
         # 3. Si no hubo coincidencia exacta, analizar coincidencias parciales
         if not matching_customers:
-            print(f"\n❌ No se encontraron clientes con email {email}")
             return None
         
         if len(matching_customers) == 1:
-            print(f"\n✅ Cliente único encontrado (coincidencia parcial)")
             return matching_customers[0]
         
         # Múltiples coincidencias parciales
-        print(f"\n⚠️ Se encontraron {len(matching_customers)} clientes con email similar:")
-        for idx, c in enumerate(matching_customers, 1):
-            email_mostrar = c.get('PrimaryEmailAddr', {}).get('Address', 'N/A')
-            print(f"   {idx}. ID: {c['Id']} - {c.get('DisplayName', 'N/A')} - Email: '{email_mostrar}' - Balance: ${c.get('Balance', 0)}")
+        logger.info(
+            "%s clientes QB con email similar: %s",
+            len(matching_customers), [c['Id'] for c in matching_customers],
+        )
         
         # Priorizar el cliente original (sin sufijo)
         for c in matching_customers:
             name = c.get('DisplayName', '')
             if 'Jorge Antonio Ramirez' in name and '-' not in name:
-                print(f"\n✅ SELECCIONADO (original por nombre): {c.get('DisplayName')} (ID: {c['Id']})")
                 return c
         
         # Si no, elegir el de menor balance
         best = min(matching_customers, key=lambda x: float(x.get('Balance', 0)))
-        print(f"\n⚠️ SELECCIONADO (menor balance): {best.get('DisplayName')} (ID: {best['Id']})")
+        logger.info("Seleccionado cliente QB %s (menor balance)", best['Id'])
         return best
         
-    except Exception as e:
-        print(f"\n❌ Error: {e}")
+    except Exception:
+        logger.exception("Error buscando cliente QB por email")
         return None
 
 
@@ -319,8 +298,8 @@ def create_customer(token, order):
         headers=qb_headers_json()
     )
 
-    print("CREATE CUSTOMER:", response.status_code)
-    print(response.text)
+    logger.info("QB create customer: %s", response.status_code)
+    logger.debug("QB create customer response: %s", response.text)
 
     response.raise_for_status()
 
@@ -341,21 +320,17 @@ def get_or_create_customer(token, order):
     customer = None
     if order.phone:
         customer = find_customer_by_phone(token, order.phone)  # Usa la nueva función
-        if customer:
-            print(f"✅ Cliente encontrado por teléfono: {customer['DisplayName']} (ID: {customer['Id']})")
     
     # Si no encuentra, buscar por email (también necesitará actualización similar)
     if not customer and order.guest_email:
         customer = find_customer_by_email(token, order.guest_email)
-        if customer:
-            print(f"✅ Cliente encontrado por email: {customer['DisplayName']}")
     
     # Si no existe, crear nuevo
     if not customer:
-        print(f"🆕 Creando NUEVO cliente para orden {order.id}")
+        logger.info("Creando cliente QB para orden #%s", order.id)
         customer = create_customer(token, order)
     else:
-        print(f"✅ Usando cliente EXISTENTE")
+        logger.info("Orden #%s usa cliente QB existente %s", order.id, customer["Id"])
     
     # Guardar en la orden
     order.qb_customer_id = customer["Id"]
@@ -373,7 +348,7 @@ def create_sales_receipt(order):
     token = QuickBooksToken.objects.first()
 
     if order.qb_sales_receipt_id:
-        print("⚠️ SalesReceipt ya existe:", order.qb_sales_receipt_id)
+        logger.debug("SalesReceipt ya existe: %s", order.qb_sales_receipt_id)
         return order.qb_sales_receipt_id
 
     customer_id = get_or_create_customer(token, order)
@@ -406,8 +381,8 @@ def create_sales_receipt(order):
 
     r = requests.post(url, json=payload, headers=qb_headers_json())
 
-    print("CREATE SALES RECEIPT:", r.status_code)
-    print(r.text)
+    logger.info("QB create sales receipt: %s", r.status_code)
+    logger.debug("QB create sales receipt response: %s", r.text)
 
     r.raise_for_status()
 
@@ -416,7 +391,7 @@ def create_sales_receipt(order):
     order.qb_sales_receipt_id = receipt_id
     order.save(update_fields=["qb_sales_receipt_id"])
 
-    print("✅ SalesReceipt creado:", receipt_id)
+    logger.info("SalesReceipt %s creado para orden #%s", receipt_id, order.id)
 
     return receipt_id
 
@@ -430,7 +405,7 @@ def create_invoice(order):
     token = QuickBooksToken.objects.first()
 
     if order.qb_invoice_id:
-        print("⚠️ Invoice ya existe:", order.qb_invoice_id)
+        logger.debug("Invoice ya existe: %s", order.qb_invoice_id)
         return order.qb_invoice_id
 
     customer_id = get_or_create_customer(token, order)
@@ -463,8 +438,8 @@ def create_invoice(order):
 
     r = requests.post(url, json=payload, headers=qb_headers_json())
 
-    print("CREATE INVOICE:", r.status_code)
-    print(r.text)
+    logger.info("QB create invoice: %s", r.status_code)
+    logger.debug("QB create invoice response: %s", r.text)
 
     r.raise_for_status()
 
@@ -473,7 +448,7 @@ def create_invoice(order):
     order.qb_invoice_id = invoice_id
     order.save(update_fields=["qb_invoice_id"])
 
-    print("✅ Invoice creada:", invoice_id)
+    logger.info("Invoice %s creada para orden #%s", invoice_id, order.id)
 
     return invoice_id
 
@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import SalesRollup
+
+
+@admin.register(SalesRollup)
+class SalesRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        "period",
+        "bucket_start",
+        "dimension",
+        "key",
+        "orders_count",
+        "units",
+        "total",
+        "refunded_total",
+    )
+
+    list_filter = ("period", "dimension")
+    search_fields = ("key",)
+    ordering = ("-bucket_start",)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from reports.services import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los rollups de ventas (hora/día) desde las órdenes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Órdenes leídas por bloque",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("Reconstruyendo rollups de ventas..."))
+
+        count = rebuild_sales_rollups(chunk_size=options["chunk_size"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ {count} filas de rollup generadas")
+        )
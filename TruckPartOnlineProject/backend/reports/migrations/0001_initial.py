@@ -0,0 +1,51 @@
+# Generated by Django 6.0 on 2026-10-19 15:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('orders', '0007_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hora'), ('day', 'Día')], max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('product', 'Producto'), ('brand', 'Marca'), ('category', 'Categoría'), ('payment_method', 'Método de pago')], max_length=20)),
+                ('key', models.CharField(max_length=50)),
+                ('orders_count', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('tax', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('refunds_count', models.IntegerField(default=0)),
+                ('refunded_units', models.IntegerField(default=0)),
+                ('refunded_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'dimension', 'bucket_start'], name='salesrollup_period_dim_idx')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'dimension', 'key', 'bucket_start'), name='salesrollup_unique_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesRollupEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sale', 'Venta'), ('refund', 'Reembolso')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollup_entries', to='orders.order')),
+            ],
+            options={
+                'unique_together': {('order', 'kind')},
+            },
+        ),
+    ]
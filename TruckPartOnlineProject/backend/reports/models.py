@@ -0,0 +1,88 @@
+from django.db import models
+from orders.models import Order
+
+
+class SalesRollup(models.Model):
+    """
+    Agregado incremental de ventas por periodo (hora/día) y dimensión.
+
+    Los buckets se calculan sobre Order.created_at, así el rollup incremental
+    y el reconstruido (rebuild_sales_rollups) siempre coinciden.
+    Para product/brand/category los importes son el subtotal de línea (sin impuestos).
+    """
+    PERIOD_CHOICES = (
+        ("hour", "Hora"),
+        ("day", "Día"),
+    )
+
+    DIMENSION_CHOICES = (
+        ("total", "Total"),
+        ("product", "Producto"),
+        ("brand", "Marca"),
+        ("category", "Categoría"),
+        ("payment_method", "Método de pago"),
+    )
+
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    bucket_start = models.DateTimeField()
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    # ID del producto/marca/categoría, método de pago o "all" para total
+    key = models.CharField(max_length=50)
+
+    orders_count = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tax = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    refunds_count = models.IntegerField(default=0)
+    refunded_units = models.IntegerField(default=0)
+    refunded_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["period", "dimension", "key", "bucket_start"],
+                name="salesrollup_unique_bucket",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["period", "dimension", "bucket_start"],
+                name="salesrollup_period_dim_idx",
+            ),
+        ]
+
+    @property
+    def net_total(self):
+        return self.total - self.refunded_total
+
+    def __str__(self):
+        return f"{self.period} {self.bucket_start:%Y-%m-%d %H:%M} {self.dimension}={self.key}"
+
+
+class SalesRollupEntry(models.Model):
+    """
+    Registro de qué órdenes ya se sumaron al rollup (venta o reembolso),
+    para que reintentos del webhook o dobles llamadas no cuenten dos veces.
+    """
+    KIND_CHOICES = (
+        ("sale", "Venta"),
+        ("refund", "Reembolso"),
+    )
+
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name="rollup_entries"
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("order", "kind")
+
+    def __str__(self):
+        return f"Order #{self.order_id} ({self.kind})"
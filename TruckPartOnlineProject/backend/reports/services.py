@@ -0,0 +1,232 @@
+# reports/services.py
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch
+
+from orders.models import Order, OrderItem
+from .models import SalesRollup, SalesRollupEntry
+
+PERIODS = ("hour", "day")
+
+# Estados en los que una orden cuenta como venta
+SALE_STATUSES = ("invoiced", "completed", "refunded")
+
+SALE_FIELDS = ("orders_count", "units", "subtotal", "tax", "total")
+
+
+def bucket_start(value, period):
+    """
+    Trunca un datetime al inicio de su hora o día.
+    """
+    if period == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def rollup_queryset(queryset):
+    """
+    Carga todo lo que order_contributions necesita en un número constante de queries.
+    """
+    return queryset.prefetch_related(
+        Prefetch(
+            "items",
+            queryset=OrderItem.objects.select_related(
+                "product__category__parent__parent__parent",
+            ),
+        )
+    )
+
+
+def _category_keys(category):
+    """
+    La categoría del producto y todos sus ancestros, así un reporte
+    de cualquier nivel del árbol lee sus filas directamente.
+    """
+    keys = []
+    while category is not None:
+        keys.append(str(category.id))
+        category = category.parent
+    return keys
+
+
+def order_contributions(order):
+    """
+    Calcula lo que una orden aporta a cada (dimensión, key) del rollup.
+    Es la única fuente de verdad: la usan tanto la actualización incremental
+    como la reconstrucción completa.
+    """
+    contributions = {
+        ("total", "all"): {
+            "orders_count": 1,
+            "units": 0,
+            "subtotal": order.subtotal,
+            "tax": order.tax,
+            "total": order.total,
+        },
+        ("payment_method", order.payment_method): {
+            "orders_count": 1,
+            "units": 0,
+            "subtotal": order.subtotal,
+            "tax": order.tax,
+            "total": order.total,
+        },
+    }
+
+    for item in order.items.all():
+        amount = (item.price * item.quantity).quantize(Decimal("0.01"))
+        product = item.product
+
+        keys = [("product", str(product.id))]
+        if product.brand_id:
+            keys.append(("brand", str(product.brand_id)))
+        keys.extend(("category", key) for key in _category_keys(product.category))
+
+        contributions["total", "all"]["units"] += item.quantity
+        contributions["payment_method", order.payment_method]["units"] += item.quantity
+
+        for key in keys:
+            values = contributions.setdefault(key, {
+                "orders_count": 1,
+                "units": 0,
+                "subtotal": Decimal("0.00"),
+                "tax": Decimal("0.00"),
+                "total": Decimal("0.00"),
+            })
+            values["units"] += item.quantity
+            values["subtotal"] += amount
+            values["total"] += amount
+
+    return contributions
+
+
+def _as_refund(values):
+    return {
+        "refunds_count": values["orders_count"],
+        "refunded_units": values["units"],
+        "refunded_total": values["total"],
+    }
+
+
+def _apply(order, deltas_for):
+    """
+    Suma los deltas de la orden en cada bucket con UPDATE ... SET x = x + delta,
+    creando la fila si todavía no existe.
+    """
+    order = rollup_queryset(Order.objects.filter(pk=order.pk)).get()
+
+    for (dimension, key), values in order_contributions(order).items():
+        deltas = deltas_for(values)
+
+        for period in PERIODS:
+            lookup = {
+                "period": period,
+                "bucket_start": bucket_start(order.created_at, period),
+                "dimension": dimension,
+                "key": key,
+            }
+            updates = {field: F(field) + value for field, value in deltas.items()}
+
+            if SalesRollup.objects.filter(**lookup).update(**updates):
+                continue
+
+            try:
+                with transaction.atomic():
+                    SalesRollup.objects.create(**lookup, **deltas)
+            except IntegrityError:
+                # Otro proceso creó la fila entre el UPDATE y el INSERT
+                SalesRollup.objects.filter(**lookup).update(**updates)
+
+
+def _register(order, kind):
+    """
+    Marca la orden como sumada al rollup. Retorna False si ya lo estaba.
+    """
+    try:
+        with transaction.atomic():
+            SalesRollupEntry.objects.create(order=order, kind=kind)
+    except IntegrityError:
+        return False
+    return True
+
+
+@transaction.atomic
+def record_order_sale(order):
+    """
+    Suma una orden pagada/facturada a los rollups (idempotente).
+    Debe llamarse en la misma transacción que cambia el estado de la orden.
+    """
+    if not _register(order, "sale"):
+        return False
+
+    _apply(order, lambda values: {field: values[field] for field in SALE_FIELDS})
+    return True
+
+
+@transaction.atomic
+def record_order_refund(order):
+    """
+    Registra el reembolso de una orden en los rollups (idempotente).
+    """
+    if not _register(order, "refund"):
+        return False
+
+    _apply(order, _as_refund)
+    return True
+
+
+@transaction.atomic
+def rebuild_sales_rollups(chunk_size=2000):
+    """
+    Reconstruye todos los rollups desde Order/OrderItem.
+    Agrega en memoria (O(buckets), no O(órdenes)) y escribe con bulk_create.
+    """
+    SalesRollup.objects.all().delete()
+    SalesRollupEntry.objects.all().delete()
+
+    totals = defaultdict(lambda: defaultdict(int))
+    entries = []
+
+    orders = rollup_queryset(
+        Order.objects.filter(status__in=SALE_STATUSES).order_by("id")
+    )
+
+    for order in orders.iterator(chunk_size=chunk_size):
+        contributions = order_contributions(order)
+        refunded = order.status == "refunded"
+
+        entries.append(SalesRollupEntry(order=order, kind="sale"))
+        if refunded:
+            entries.append(SalesRollupEntry(order=order, kind="refund"))
+
+        for (dimension, key), values in contributions.items():
+            deltas = {field: values[field] for field in SALE_FIELDS}
+            if refunded:
+                deltas.update(_as_refund(values))
+
+            for period in PERIODS:
+                bucket = totals[period, bucket_start(order.created_at, period), dimension, key]
+                for field, value in deltas.items():
+                    bucket[field] += value
+
+        if len(entries) >= chunk_size:
+            SalesRollupEntry.objects.bulk_create(entries)
+            entries = []
+
+    SalesRollupEntry.objects.bulk_create(entries)
+
+    rollups = [
+        SalesRollup(
+            period=period,
+            bucket_start=bucket,
+            dimension=dimension,
+            key=key,
+            **values
+        )
+        for (period, bucket, dimension, key), values in totals.items()
+    ]
+    SalesRollup.objects.bulk_create(rollups, batch_size=chunk_size)
+
+    return len(rollups)
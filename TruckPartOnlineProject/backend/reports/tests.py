@@ -0,0 +1,105 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from orders.models import Order, OrderItem
+from products.models import Brand, Category, Product
+from reports.models import SalesRollup
+from reports.services import rebuild_sales_rollups, record_order_refund, record_order_sale
+
+User = get_user_model()
+
+
+class SalesRollupTest(TestCase):
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name="Fleetguard")
+        root = Category.objects.create(name="Motor", level="category")
+        self.piece = Category.objects.create(name="Filtros", level="piece", parent=root)
+        self.product = Product.objects.create(
+            name="Filtro de aceite",
+            price=Decimal("10.00"),
+            brand=self.brand,
+            category=self.piece,
+        )
+
+    def create_order(self, quantity=2, payment_method="card", status="completed"):
+        order = Order.objects.create(
+            full_name="Cliente",
+            payment_method=payment_method,
+            status=status,
+            subtotal=Decimal("10.00") * quantity,
+            tax=Decimal("0.70") * quantity,
+        )
+        OrderItem.objects.create(order=order, product=self.product, quantity=quantity, price=Decimal("10.00"))
+        return order
+
+    def rollup(self, dimension, key, period="day"):
+        return SalesRollup.objects.get(period=period, dimension=dimension, key=str(key))
+
+    def snapshot(self):
+        return sorted(
+            SalesRollup.objects.values_list(
+                "period", "bucket_start", "dimension", "key",
+                "orders_count", "units", "subtotal", "tax", "total",
+                "refunds_count", "refunded_units", "refunded_total",
+            )
+        )
+
+    def test_record_sale_updates_every_dimension(self):
+        record_order_sale(self.create_order(quantity=2))
+        record_order_sale(self.create_order(quantity=1))
+
+        total = self.rollup("total", "all")
+        self.assertEqual(total.orders_count, 2)
+        self.assertEqual(total.units, 3)
+        self.assertEqual(total.total, Decimal("32.10"))
+
+        self.assertEqual(self.rollup("product", self.product.id).units, 3)
+        self.assertEqual(self.rollup("brand", self.brand.id).subtotal, Decimal("30.00"))
+        # La categoría padre también recibe la venta
+        self.assertEqual(self.rollup("category", self.piece.parent_id).orders_count, 2)
+        self.assertEqual(self.rollup("payment_method", "card", period="hour").orders_count, 2)
+
+    def test_record_sale_is_idempotent(self):
+        order = self.create_order()
+        self.assertTrue(record_order_sale(order))
+        self.assertFalse(record_order_sale(order))
+
+        self.assertEqual(self.rollup("total", "all").orders_count, 1)
+
+    def test_refund_and_rebuild_match_incremental(self):
+        first = self.create_order(quantity=2)
+        record_order_sale(first)
+        record_order_sale(self.create_order(quantity=1, payment_method="cod", status="invoiced"))
+
+        first.status = "refunded"
+        first.save()
+        record_order_refund(first)
+
+        total = self.rollup("total", "all")
+        self.assertEqual(total.refunds_count, 1)
+        self.assertEqual(total.net_total, Decimal("10.70"))
+
+        incremental = self.snapshot()
+        rebuild_sales_rollups()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_sales_report_endpoint(self):
+        record_order_sale(self.create_order())
+        admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="password", is_staff=True
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.get("/api/reports/sales/", {"dimension": "product"})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["key"], str(self.product.id))
+        self.assertEqual(results[0]["units"], 2)
+
+        self.assertEqual(client.get("/api/reports/sales/", {"period": "week"}).status_code, 400)
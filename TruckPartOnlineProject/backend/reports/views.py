@@ -0,0 +1,91 @@
+# reports/views.py
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .models import SalesRollup
+
+
+def _parse_date(value, default):
+    if not value:
+        return default
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def sales_report(request):
+    """
+    Reporte de ventas leído de los rollups precalculados (O(días), no O(órdenes)).
+
+    Parámetros:
+    - period: hour | day (default day)
+    - dimension: total | product | brand | category | payment_method (default total)
+    - key: IDs o métodos de pago separados por coma (opcional)
+    - start / end: YYYY-MM-DD, ambos inclusivos (default últimos 30 días)
+    """
+    params = request.query_params
+
+    period = params.get("period", "day")
+    dimension = params.get("dimension", "total")
+
+    if period not in dict(SalesRollup.PERIOD_CHOICES):
+        return Response(
+            {"error": f"period inválido. Opciones: {list(dict(SalesRollup.PERIOD_CHOICES))}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if dimension not in dict(SalesRollup.DIMENSION_CHOICES):
+        return Response(
+            {"error": f"dimension inválida. Opciones: {list(dict(SalesRollup.DIMENSION_CHOICES))}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    today = timezone.now().date()
+    try:
+        end = _parse_date(params.get("end"), today)
+        start = _parse_date(params.get("start"), end - timedelta(days=30))
+    except ValueError:
+        return Response(
+            {"error": "Las fechas deben tener formato YYYY-MM-DD"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    tz = timezone.get_current_timezone()
+    rollups = SalesRollup.objects.filter(
+        period=period,
+        dimension=dimension,
+        bucket_start__gte=datetime.combine(start, time.min, tzinfo=tz),
+        bucket_start__lt=datetime.combine(end + timedelta(days=1), time.min, tzinfo=tz),
+    ).order_by("bucket_start", "key")
+
+    if params.get("key"):
+        rollups = rollups.filter(key__in=params["key"].split(","))
+
+    results = [
+        {
+            "bucket_start": rollup.bucket_start,
+            "key": rollup.key,
+            "orders_count": rollup.orders_count,
+            "units": rollup.units,
+            "subtotal": rollup.subtotal,
+            "tax": rollup.tax,
+            "total": rollup.total,
+            "refunds_count": rollup.refunds_count,
+            "refunded_units": rollup.refunded_units,
+            "refunded_total": rollup.refunded_total,
+            "net_total": rollup.net_total,
+        }
+        for rollup in rollups
+    ]
+
+    return Response({
+        "period": period,
+        "dimension": dimension,
+        "start": start,
+        "end": end,
+        "results": results,
+    })
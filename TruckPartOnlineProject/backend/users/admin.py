@@ -1,9 +1,10 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
 # Register your models here.
 
 from django.contrib.auth.admin import UserAdmin
-from .models import User
+from .email_outbox import replay_messages
+from .models import EmailOutbox, User
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -81,3 +82,30 @@ class CustomUserAdmin(UserAdmin):
             ),
         }),
     )
+
+
+# =========================
+# EMAIL OUTBOX (cola de emails)
+# =========================
+def replay_email_messages(modeladmin, request, queryset):
+    count = replay_messages(queryset)
+    messages.success(request, f"{count} email(s) re-encolado(s)")
+
+
+replay_email_messages.short_description = "🔁 Reenviar emails"
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = (
+        "template",
+        "to",
+        "status",
+        "attempts",
+        "created_at",
+        "sent_at",
+    )
+
+    list_filter = ("status", "template")
+    actions = [replay_email_messages]
+    readonly_fields = ("text_body", "html_body", "last_error", "created_at", "sent_at")
@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class UsersConfig(AppConfig):
     name = 'users'
+
+    def ready(self):
+        from backend.metrics import registry
+        from .email_outbox import metric_lines
+
+        # Profundidad de la cola y latencia de envío en /api/metrics/
+        registry.collectors.append(metric_lines)
+
+        import users.signals
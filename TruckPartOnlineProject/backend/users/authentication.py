@@ -0,0 +1,104 @@
+# users/authentication.py
+"""
+Autenticación JWT sin leer el User en cada request.
+
+JWTAuthentication de simplejwt hace un SELECT del usuario por request, aunque
+la vista solo mire request.user.id o is_staff. ClaimsJWTAuthentication arma
+request.user con los claims firmados del token (user_id, is_staff, is_active)
+y solo consulta un estado mínimo (is_active, is_staff) guardado en la cache
+de Django por JWT_USER_CACHE_SECONDS: desactivar a un usuario o quitarle
+staff corta sus tokens a más tardar en ese tiempo (al instante en el proceso
+que guarda el cambio, o en todos con una cache compartida).
+
+El User completo se carga recién si la vista lo necesita (email, full_name,
+usarlo como instancia en el ORM...), una sola vez por request.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+User = get_user_model()
+
+# Estado de un user_id que no existe (None en la cache es "no está")
+_MISSING = "missing"
+
+
+def cache_seconds():
+    return getattr(settings, "JWT_USER_CACHE_SECONDS", 60)
+
+
+def _state_key(user_id):
+    return f"users:auth-state:{user_id}"
+
+
+def user_state(user_id):
+    """
+    (is_active, is_staff) del usuario, o None si no existe. Cacheado.
+    """
+    key = _state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        row = User.objects.filter(pk=user_id).values_list("is_active", "is_staff").first()
+        state = tuple(row) if row else _MISSING
+        cache.set(key, state, cache_seconds())
+    return None if state == _MISSING else state
+
+
+def forget_user_state(user_id):
+    cache.delete(_state_key(user_id))
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    request.user armado con los claims: id/pk, is_staff, is_active e
+    is_authenticated no tocan la base. Cualquier otro atributo, compararlo o
+    asignarlo como User en el ORM carga la fila (una vez).
+    """
+
+    def __init__(self, user_id, is_staff):
+        super().__init__(lambda: User.objects.get(pk=user_id))
+        self.__dict__.update(
+            id=user_id,
+            pk=user_id,
+            is_staff=is_staff,
+            is_active=True,
+            is_authenticated=True,
+            is_anonymous=False,
+        )
+
+    def __bool__(self):
+        # IsAuthenticated/IsAdminUser hacen `request.user and ...`
+        return True
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Mismos tokens y mismos errores que JWTAuthentication; request.user es un ClaimsUser.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Necesita el hash de la contraseña: no hay atajo
+            return super().get_user(validated_token)
+
+        try:
+            user_id = User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        state = user_state(user_id)
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        is_active, is_staff = state
+        if api_settings.CHECK_USER_IS_ACTIVE and not (is_active and validated_token.get("is_active", True)):
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        # Quitar staff corta al instante; darlo vale desde el próximo token.
+        # Tokens sin el claim (emitidos antes o con for_user) usan el estado.
+        return ClaimsUser(user_id, is_staff=is_staff and validated_token.get("is_staff", is_staff))
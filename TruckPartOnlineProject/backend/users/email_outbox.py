@@ -0,0 +1,307 @@
+# users/email_outbox.py
+"""
+Cola durable de emails salientes.
+
+enqueue_email renderiza el template (compilado una vez por template e idioma) y guarda
+el mensaje en EmailOutbox; al hacer commit despierta el pool fijo de hilos del
+proceso (EMAIL_OUTBOX_WORKERS). Cada hilo reclama un lote, lo envía por una sola
+conexión SMTP y reintenta con backoff lo que falle. Lo que un reinicio deje a
+medias lo retoman los hilos de cualquier proceso o manage.py process_email_outbox.
+"""
+import logging
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count
+from django.template.loader import get_template
+from django.utils import timezone, translation
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 6
+# Un mensaje en "sending" más tiempo que esto se considera abandonado (proceso caído)
+STALE_AFTER = timedelta(minutes=10)
+# Muestras para los percentiles de /api/metrics/
+WINDOW = 1000
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(30 * 2 ** (attempts - 1), 3600))
+
+
+########################################################################################
+# TEMPLATES
+########################################################################################
+
+# (template, idioma) -> Template ya compilado
+_templates = {}
+
+
+def render_cached(template_name, context):
+    """
+    Renderiza con el Template compilado de ese template e idioma: get_template
+    (loader cacheado) se resuelve una vez y cada email solo hace el render.
+    """
+    key = (template_name, translation.get_language())
+    template = _templates.get(key)
+    if template is None:
+        template = _templates[key] = get_template(template_name)
+        stats.count("template_misses")
+    else:
+        stats.count("template_hits")
+    return template.render(context)
+
+
+########################################################################################
+# COLA
+########################################################################################
+
+def enqueue_email(template, context, subject, to):
+    """
+    Guarda el email (emails/<template>.txt y .html) y despierta a los workers
+    cuando la transacción actual hace commit.
+    """
+    message = EmailOutbox.objects.create(
+        template=template,
+        to=list(to),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        subject=subject,
+        text_body=render_cached(f"emails/{template}.txt", context),
+        html_body=render_cached(f"emails/{template}.html", context),
+    )
+    transaction.on_commit(workers.wake)
+    return message
+
+
+def requeue_stale_messages():
+    return EmailOutbox.objects.filter(
+        status="sending",
+        locked_at__lt=timezone.now() - STALE_AFTER,
+    ).update(status="pending", locked_at=None)
+
+
+def claim_batch(limit):
+    """
+    Reclama hasta `limit` mensajes listos para enviar.
+    """
+    now = timezone.now()
+    claimed = []
+    # Sin SELECT FOR UPDATE (SQLite) leer y escribir en una misma transacción
+    # solo agrega deadlocks entre workers: se reclama en autocommit
+    locking = connection.features.has_select_for_update
+    with transaction.atomic() if locking else nullcontext():
+        candidates = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status="pending", available_at__lte=now)
+            .order_by("available_at", "id")[:limit]
+        )
+        for message in candidates:
+            # Update condicional: si dos workers leyeron el mismo mensaje solo uno lo reclama
+            if EmailOutbox.objects.filter(pk=message.pk, status="pending").update(
+                status="sending", locked_at=now, attempts=message.attempts + 1,
+            ):
+                message.attempts += 1
+                claimed.append(message)
+    return claimed
+
+
+def _failed(message, error):
+    logger.warning(
+        "Error enviando email %s a %s (intento %s/%s): %s",
+        message.template, message.to, message.attempts, MAX_ATTEMPTS, error,
+    )
+    fields = {"locked_at": None, "last_error": "".join(traceback.format_exception(error))}
+    if message.attempts >= MAX_ATTEMPTS:
+        fields["status"] = "failed"
+        stats.count("failed")
+    else:
+        fields["status"] = "pending"
+        fields["available_at"] = timezone.now() + backoff(message.attempts)
+        stats.count("retried")
+    EmailOutbox.objects.filter(pk=message.pk).update(**fields)
+
+
+def send_batch(batch):
+    """
+    Envía el lote por una sola conexión SMTP. El error de un mensaje no corta
+    el lote: ese mensaje se reintenta y la conexión se reabre para el siguiente.
+    """
+    smtp = get_connection(fail_silently=False)
+    is_open = False
+    sent = []
+    try:
+        for message in batch:
+            start = time.perf_counter()
+            try:
+                if not is_open:
+                    smtp.open()
+                    is_open = True
+                email = EmailMultiAlternatives(
+                    subject=message.subject,
+                    body=message.text_body,
+                    from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+                    to=message.to,
+                    connection=smtp,
+                )
+                if message.html_body:
+                    email.attach_alternative(message.html_body, "text/html")
+                email.send()
+            except Exception as exc:
+                _failed(message, exc)
+                smtp.close()
+                is_open = False
+            else:
+                stats.sample("send_seconds", time.perf_counter() - start)
+                stats.sample("delivery_seconds", (timezone.now() - message.created_at).total_seconds())
+                sent.append(message.pk)
+    finally:
+        smtp.close()
+
+    if sent:
+        EmailOutbox.objects.filter(pk__in=sent).update(
+            status="sent", sent_at=timezone.now(), locked_at=None, last_error="",
+        )
+        stats.count("sent", len(sent))
+    return len(sent)
+
+
+def process_outbox(limit=None, batch_size=None):
+    """
+    Envía mensajes hasta vaciar la cola (o hasta `limit`). Retorna cuántos reclamó.
+    """
+    batch_size = batch_size or getattr(settings, "EMAIL_OUTBOX_BATCH_SIZE", 20)
+    requeue_stale_messages()
+
+    processed = 0
+    while limit is None or processed < limit:
+        batch = claim_batch(batch_size if limit is None else min(batch_size, limit - processed))
+        if not batch:
+            break
+        send_batch(batch)
+        processed += len(batch)
+    return processed
+
+
+def replay_messages(queryset):
+    """
+    Vuelve a encolar mensajes (ej. fallidos) para que los workers los envíen.
+    """
+    return queryset.update(
+        status="pending", attempts=0, available_at=timezone.now(), locked_at=None, last_error="",
+    )
+
+
+########################################################################################
+# WORKERS
+########################################################################################
+
+class OutboxWorkers:
+    """
+    EMAIL_OUTBOX_WORKERS hilos por proceso (0 = solo el comando). Se crean la
+    primera vez que se encola algo; después esperan a wake() o revisan la cola
+    cada EMAIL_OUTBOX_POLL_SECONDS (reintentos y mensajes de otros procesos).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.threads = []
+        self.wakeup = threading.Event()
+
+    def wake(self):
+        self.start()
+        self.wakeup.set()
+
+    def start(self):
+        size = getattr(settings, "EMAIL_OUTBOX_WORKERS", 2)
+        with self.lock:
+            self.threads = [thread for thread in self.threads if thread.is_alive()]
+            while len(self.threads) < size:
+                thread = threading.Thread(
+                    target=self.run, name=f"email-outbox-{len(self.threads)}", daemon=True
+                )
+                thread.start()
+                self.threads.append(thread)
+
+    def run(self):
+        while True:
+            processed = 0
+            try:
+                close_old_connections()
+                processed = process_outbox(limit=getattr(settings, "EMAIL_OUTBOX_BATCH_SIZE", 20))
+            except Exception:
+                logger.exception("Error en el worker de emails")
+            if not processed:
+                self.wakeup.wait(getattr(settings, "EMAIL_OUTBOX_POLL_SECONDS", 30))
+                self.wakeup.clear()
+
+
+workers = OutboxWorkers()
+
+
+########################################################################################
+# MÉTRICAS
+########################################################################################
+
+class OutboxStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.samples = {}
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def sample(self, name, value):
+        with self.lock:
+            self.samples.setdefault(name, deque(maxlen=WINDOW)).append(value)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.samples.clear()
+
+
+stats = OutboxStats()
+
+
+def metric_lines():
+    """
+    Profundidad de la cola (toda la base) y latencias/contadores de este
+    proceso, en formato Prometheus para /api/metrics/.
+    """
+    depth = dict(
+        EmailOutbox.objects.filter(status__in=["pending", "sending", "failed"])
+        .values_list("status").annotate(n=Count("id"))
+    )
+    with stats.lock:
+        counters = dict(stats.counters)
+        samples = {name: sorted(values) for name, values in stats.samples.items()}
+
+    lines = ["# TYPE tpop_email_outbox_depth gauge"]
+    for status in ("pending", "sending", "failed"):
+        lines.append(f'tpop_email_outbox_depth{{status="{status}"}} {depth.get(status, 0)}')
+
+    for name in ("sent", "retried", "failed", "template_hits", "template_misses"):
+        lines.append(f"# TYPE tpop_email_{name}_total counter")
+        lines.append(f"tpop_email_{name}_total {counters.get(name, 0)}")
+
+    for name in ("send_seconds", "delivery_seconds"):
+        values = samples.get(name)
+        if not values:
+            continue
+        lines.append(f"# TYPE tpop_email_{name} summary")
+        for q in (0.5, 0.9, 0.99):
+            lines.append(f'tpop_email_{name}{{quantile="{q}"}} {values[min(int(q * len(values)), len(values) - 1)]:.6g}')
+        lines.append(f"tpop_email_{name}_sum {sum(values):.6g}")
+        lines.append(f"tpop_email_{name}_count {len(values)}")
+    return lines
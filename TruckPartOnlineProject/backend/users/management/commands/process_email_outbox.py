@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.email_outbox import process_outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de emails: envía los mensajes pendientes por lotes "
+        "sobre una conexión SMTP, con reintentos"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Vacía la cola una vez y termina (útil en cron)",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=5.0,
+            help="Segundos de espera cuando la cola está vacía",
+        )
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_outbox(batch_size=options["batch_size"])
+
+            if processed:
+                self.stdout.write(f"{processed} email(s) procesado(s)")
+
+            if options["once"]:
+                break
+
+            if not processed:
+                time.sleep(options["sleep"])
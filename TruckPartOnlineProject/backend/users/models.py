@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth import get_user_model
@@ -32,4 +33,45 @@ class PasswordResetRequest(models.Model):
     is_used = models.BooleanField(default=False)
 
     def __str__(self):
-        return f"Reset for {self.user.email}"    
\ No newline at end of file
+        return f"Reset for {self.user.email}"    
+
+class EmailOutbox(models.Model):
+    """
+    Cola durable de emails salientes (users/email_outbox.py).
+
+    Las vistas solo guardan el mensaje ya renderizado; un pool fijo de hilos
+    (o manage.py process_email_outbox) lo envía por una conexión SMTP
+    reutilizada, con reintentos. Un reinicio no pierde mensajes.
+    """
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    )
+
+    template = models.CharField(max_length=100)
+    to = models.JSONField(default=list)
+    from_email = models.CharField(max_length=255, blank=True, default="")
+    subject = models.CharField(max_length=255)
+    text_body = models.TextField()
+    html_body = models.TextField(blank=True, default="")
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # Reclamo de mensajes por los workers
+            models.Index(fields=["status", "available_at"], name="emailoutbox_queue_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.template} -> {', '.join(self.to)} ({self.status})"
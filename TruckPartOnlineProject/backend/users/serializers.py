@@ -33,6 +33,14 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        # Claims que usa ClaimsJWTAuthentication para no leer el User por request
+        token["is_staff"] = user.is_staff
+        token["is_active"] = user.is_active
+        return token
+
     def validate(self, attrs):
         # Aceptar tanto 'email' como 'username'
         username = attrs.get('username')
@@ -1,3 +1,192 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.template.loader import render_to_string
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .email_outbox import (
+    MAX_ATTEMPTS,
+    metric_lines,
+    process_outbox,
+    render_cached,
+    stats,
+    workers,
+)
+from TPOP.models import Cart
+from .authentication import forget_user_state
+from .models import EmailOutbox
+
+User = get_user_model()
+
+
+class FlakyBackend(EmailBackend):
+    """
+    locmem que falla para un destinatario y cuenta las conexiones abiertas.
+    """
+    opened = 0
+
+    def open(self):
+        FlakyBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        if any("rebota@example.com" in message.to for message in messages):
+            raise ConnectionError("SMTP caído")
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_OUTBOX_WORKERS=0)
+class EmailOutboxTest(TestCase):
+    """
+    Cola de emails: encolado desde las vistas, envío por lotes y reintentos.
+    """
+
+    def setUp(self):
+        stats.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="cliente", email="cliente@example.com", password="x")
+
+    def test_resend_verification_enqueues_instead_of_sending(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/users/resend-verification/", {"email": self.user.email})
+        self.assertEqual(response.status_code, 200)
+
+        # Nada se envía en el request y no hay hilos con EMAIL_OUTBOX_WORKERS=0
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(workers.threads, [])
+
+        message = EmailOutbox.objects.get()
+        self.assertEqual(message.status, "pending")
+        self.assertEqual(message.to, ["cliente@example.com"])
+        self.assertIn("/verify-email/", message.text_body)
+        self.assertIn("/verify-email/", message.html_body)
+
+        self.assertEqual(process_outbox(), 1)
+        message.refresh_from_db()
+        self.assertEqual(message.status, "sent")
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, "Verifica tu cuenta - TruckPartOnline")
+        self.assertEqual(mail.outbox[0].alternatives[0][1], "text/html")
+
+    @patch.dict("users.email_outbox._templates", clear=True)
+    def test_template_cache_matches_full_render(self):
+        context = {"verification_url": "https://tonytruckpart.com/verify-email/a&b/<x>"}
+        for template in ("emails/verification_email.html", "emails/verification_email.txt"):
+            self.assertEqual(render_cached(template, context), render_to_string(template, context))
+            self.assertEqual(render_cached(template, context), render_to_string(template, context))
+        self.assertEqual(stats.counters["template_misses"], 2)
+        self.assertEqual(stats.counters["template_hits"], 2)
+
+    @override_settings(EMAIL_BACKEND="users.tests.FlakyBackend")
+    def test_batch_reuses_connection_and_retries_failures(self):
+        FlakyBackend.opened = 0
+        for email in ("a@example.com", "rebota@example.com", "b@example.com"):
+            EmailOutbox.objects.create(template="verification_email", to=[email], subject="Hola", text_body="x")
+
+        process_outbox(batch_size=10)
+
+        by_email = {message.to[0]: message for message in EmailOutbox.objects.all()}
+        self.assertEqual(by_email["a@example.com"].status, "sent")
+        self.assertEqual(by_email["b@example.com"].status, "sent")
+        failed = by_email["rebota@example.com"]
+        self.assertEqual((failed.status, failed.attempts), ("pending", 1))
+        self.assertGreater(failed.available_at, timezone.now())
+        self.assertIn("SMTP caído", failed.last_error)
+
+        # Una conexión para el lote, más la que se reabre después del error
+        self.assertEqual(FlakyBackend.opened, 2)
+        self.assertEqual(len(mail.outbox), 2)
+
+        # Agotados los intentos queda como failed
+        EmailOutbox.objects.filter(pk=failed.pk).update(
+            attempts=MAX_ATTEMPTS - 1, available_at=timezone.now() - timedelta(seconds=1)
+        )
+        process_outbox()
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, "failed")
+
+        lines = "\n".join(metric_lines())
+        self.assertIn('tpop_email_outbox_depth{status="failed"} 1', lines)
+        self.assertIn("tpop_email_sent_total 2", lines)
+        self.assertIn("tpop_email_retried_total 1", lines)
+        self.assertIn('tpop_email_send_seconds{quantile="0.5"}', lines)
+
+    def test_stale_sending_messages_are_requeued(self):
+        message = EmailOutbox.objects.create(
+            template="verification_email", to=["c@example.com"], subject="Hola", text_body="x",
+            status="sending", locked_at=timezone.now() - timedelta(hours=1), attempts=1,
+        )
+        with patch("users.email_outbox.send_batch", return_value=1) as send_batch:
+            self.assertEqual(process_outbox(), 1)
+        self.assertEqual(send_batch.call_args[0][0][0].pk, message.pk)
+
+
+class ClaimsJWTAuthenticationTest(TestCase):
+    """
+    JWT con request.user armado de los claims: sin SELECT del User por request.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="taller", email="taller@example.com", password="clave-segura", is_active=True, is_staff=True
+        )
+        response = self.client.post("/api/users/login/", {"email": "taller@example.com", "password": "clave-segura"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [q["sql"] for q in queries.captured_queries if '"users_user"' in q["sql"]]
+
+    def test_claims_user_without_user_query(self):
+        self.assertTrue(AccessToken(self.client._credentials["HTTP_AUTHORIZATION"].split()[1])["is_staff"])
+
+        # La primera vez se cachea el estado (solo is_active/is_staff); después no hay queries
+        response, queries = self.user_queries("/api/products/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"users_user"."email"', queries[0])
+        response, queries = self.user_queries("/api/products/")
+        self.assertEqual((response.status_code, queries), (200, []))
+
+        # El carrito se asocia por id, sin cargar el User
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/cart/")
+        self.assertEqual(Cart.objects.get(pk=response.data["id"]).user_id, self.user.id)
+        self.assertFalse([q for q in queries.captured_queries if '"users_user"' in q["sql"]])
+
+        # La vista que necesita el User completo lo carga una vez
+        response, queries = self.user_queries("/api/users/me/")
+        self.assertEqual(response.data["email"], "taller@example.com")
+        self.assertEqual(len(queries), 1)
+
+    def test_revocation(self):
+        self.assertEqual(self.client.get("/api/admin/orders/").status_code, 200)
+
+        # Quitar staff corta el acceso de admin sin esperar la cache
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get("/api/admin/orders/").status_code, 403)
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get("/api/users/me/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["code"], "user_inactive")
+
+        # En otro proceso (sin la señal) vale el TTL de la cache
+        User.objects.filter(pk=self.user.pk).update(is_active=True)
+        self.assertEqual(self.client.get("/api/users/me/").status_code, 401)
+        forget_user_state(self.user.pk)
+        self.assertEqual(self.client.get("/api/users/me/").status_code, 200)
@@ -1,12 +1,12 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
+from .serializers import CustomTokenObtainPairSerializer
 from .views import RegisterView, MeView, verify_email, resend_verification, check_account_status, password_reset_request, password_reset_confirm
 from . import views
 
-# Serializer personalizado que acepta email
-class EmailTokenObtainPairSerializer(TokenObtainPairSerializer):
+# Serializer personalizado que acepta email (con los claims de CustomTokenObtainPairSerializer)
+class EmailTokenObtainPairSerializer(CustomTokenObtainPairSerializer):
     def validate(self, attrs):
         # Si viene 'email' pero no 'username', usar email como username
         if 'email' in attrs and 'username' not in attrs: